@@ -1,15 +1,34 @@
-from fastapi import Depends, HTTPException, status
+import math
+import secrets
+from typing import Optional
+from fastapi import Depends, Header, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core import config, security
+from app.core import admission, config, ratelimit, security, tokens
+from app.core.cache import TTLCache
 from app.db.session import get_db
 from app.models.sql import User
 from app.schemas.auth import TokenData
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
+oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl="auth/token", auto_error=False)
+
+# username -> detached User snapshot. Keeps the hot polling path free of the
+# users lookup; call invalidate_user() whenever a user row changes.
+user_cache: TTLCache[str, User] = TTLCache(
+    name="user",
+    maxsize=config.settings.USER_CACHE_MAX_SIZE,
+    ttl=config.settings.USER_CACHE_TTL_SECONDS,
+)
+
+def invalidate_user(username: str) -> None:
+    user_cache.invalidate(username)
+
+def clear_user_cache() -> None:
+    user_cache.clear()
 
 async def get_current_user(
     token: str = Depends(oauth2_scheme), 
@@ -27,15 +46,84 @@ async def get_current_user(
             algorithms=[config.settings.ALGORITHM]
         )
         username: str = payload.get("sub")
-        if username is None:
+        if username is None or payload.get("typ", "access") != "access":
             raise credentials_exception
-        token_data = TokenData(username=username)
+        token_data = TokenData(username=username, user_id=payload.get("uid"))
     except JWTError:
         raise credentials_exception
+
+    family_id = payload.get("fam")
+    if family_id and tokens.revoked_families.is_revoked(family_id):
+        raise credentials_exception
+
+    # Tokens from /auth/token and /auth/refresh carry the user id: no lookup
+    if token_data.user_id is not None:
+        return User(id=token_data.user_id, username=token_data.username, role=payload.get("role", "user"))
+
+    # Tokens issued before the uid claim existed
+    cached = user_cache.get(token_data.username)
+    if cached is not None:
+        return cached
         
     result = await db.execute(select(User).where(User.username == token_data.username))
     user = result.scalars().first()
     
     if user is None:
         raise credentials_exception
+    
+    # Cache a transient copy so it is not tied to this request's session
+    user_cache.set(
+        user.username,
+        User(id=user.id, username=user.username, hashed_password=user.hashed_password, role=user.role),
+    )
     return user
+
+async def get_current_user_for_stream(
+    header_token: Optional[str] = Depends(oauth2_scheme_optional),
+    token: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_db)
+) -> User:
+    """
+    Same as get_current_user, but also accepts the JWT as a `token` query
+    parameter: browsers' EventSource cannot send an Authorization header.
+    """
+    if not (header_token or token):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return await get_current_user(token=header_token or token, db=db)
+
+def verify_internal_token(x_internal_token: Optional[str] = Header(None)) -> None:
+    """Guards /internal endpoints: the caller must send INTERNAL_API_TOKEN as X-Internal-Token."""
+    expected = config.settings.INTERNAL_API_TOKEN
+    if not expected:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Internal API is disabled")
+    if not x_internal_token or not secrets.compare_digest(x_internal_token, expected):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid internal token")
+
+def rate_limit(route: str):
+    """
+    Dependency: per-user token bucket for `route` (settings.RATE_LIMITS).
+    429 with Retry-After once the user's bucket is empty.
+    """
+    async def check_rate_limit(current_user: User = Depends(get_current_user)) -> None:
+        retry_after = await ratelimit.acquire(route, current_user.id)
+        if retry_after > 0:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Rate limit exceeded, retry later",
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
+    return check_rate_limit
+
+async def admission_control(db: AsyncSession = Depends(get_db)) -> None:
+    """Dependency for routes that create inference work: 503 while the backlog is over its limits."""
+    reason = await admission.check(db)
+    if reason is not None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Inference backlog is full, retry later",
+            headers={"Retry-After": str(config.settings.ADMISSION_RETRY_AFTER_SECONDS)},
+        )
@@ -1,17 +1,24 @@
-from datetime import timedelta
 from typing import Any
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
-from app.core import security, config
+from app.api import deps
+from app.core import security, tokens
 from app.db.session import get_db
-from app.models.sql import User
-from app.schemas.auth import Token, UserCreate, UserResponse
+from app.models.sql import RefreshTokenRevocation, User
+from app.schemas.auth import RefreshRequest, Token, UserCreate, UserResponse
 
 router = APIRouter()
 
+def _hashing_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many concurrent logins, retry shortly",
+        headers={"Retry-After": "1"},
+    )
+
 @router.post("/token", response_model=Token)
 async def login_access_token(
     db: AsyncSession = Depends(get_db), 
@@ -19,28 +26,67 @@ async def login_access_token(
 ) -> Any:
     """
     OAuth2 compatible token login, get an access token for future requests
+    and a refresh token to renew it (POST /auth/refresh) without logging in again
     """
     # Find user
     result = await db.execute(select(User).where(User.username == form_data.username))
     user = result.scalars().first()
     
     # Authenticate
-    if not user or not security.verify_password(form_data.password, user.hashed_password):
+    valid, new_hash = False, None
+    if user:
+        try:
+            valid, new_hash = await security.verify_and_update_password(form_data.password, user.hashed_password)
+        except security.PasswordHashingBusy:
+            raise _hashing_busy()
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-        
-    access_token_expires = timedelta(minutes=config.settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = security.create_access_token(
-        subject=user.username, expires_delta=access_token_expires
-    )
-    
-    return {
-        "access_token": access_token,
-        "token_type": "bearer",
-    }
+
+    # Stored hash used outdated cost parameters
+    if new_hash:
+        user.hashed_password = new_hash
+        deps.invalidate_user(user.username)
+
+    token = tokens.create_token_pair(db, user)
+    await db.commit()
+    return token
+
+@router.post("/refresh", response_model=Token)
+async def refresh_access_token(
+    body: RefreshRequest,
+    db: AsyncSession = Depends(get_db),
+) -> Any:
+    """
+    Exchanges a refresh token for a new access + refresh token pair. Refresh
+    tokens are single use; reusing one revokes every token from that login.
+    """
+    try:
+        return await tokens.rotate_refresh_token(db, body.refresh_token)
+    except tokens.InvalidRefreshToken:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    body: RefreshRequest,
+    db: AsyncSession = Depends(get_db),
+) -> None:
+    """
+    Revokes the refresh token's login: its refresh tokens and the access
+    tokens issued with them.
+    """
+    try:
+        payload = tokens.decode_refresh_token(body.refresh_token)
+    except tokens.InvalidRefreshToken:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
+    await tokens.revoke_family(db, payload["fam"], RefreshTokenRevocation.LOGOUT)
 
 @router.post("/users", response_model=UserResponse)
 async def create_user(
@@ -60,11 +106,17 @@ async def create_user(
             detail="The user with this username already exists in the system.",
         )
         
+    try:
+        hashed_password = await security.hash_password(user_in.password)
+    except security.PasswordHashingBusy:
+        raise _hashing_busy()
+
     user = User(
         username=user_in.username,
-        hashed_password=security.get_password_hash(user_in.password),
+        hashed_password=hashed_password,
     )
     db.add(user)
     await db.commit()
     await db.refresh(user)
+    deps.invalidate_user(user.username)
     return user
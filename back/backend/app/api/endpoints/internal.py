@@ -0,0 +1,33 @@
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api import deps
+from app.core import results
+from app.core.config import settings
+from app.db.session import get_db
+from app.schemas.inference import InferenceResultBatch, InferenceResultsApplied
+
+router = APIRouter(dependencies=[Depends(deps.verify_internal_token)])
+logger = logging.getLogger(__name__)
+
+
+@router.post("/results:bulk", response_model=InferenceResultsApplied)
+async def ingest_results(batch: InferenceResultBatch, db: AsyncSession = Depends(get_db)):
+    """
+    Bulk result ingestion for inference backends (the Kestra flows).
+
+    Detections are stored with one insert_many and report statuses/summaries
+    with one batched UPDATE, over the API's pooled connections. Safe to retry:
+    reports that already have a result are skipped and listed in 'skipped'.
+    """
+    if len(batch.items) > settings.RESULTS_BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many results in one request (max {settings.RESULTS_BULK_MAX_ITEMS})",
+        )
+    applied, skipped = await results.apply_results(db, batch.items)
+    if applied:
+        logger.info("Ingested %d inference results (%d skipped)", len(applied), len(skipped))
+    return InferenceResultsApplied(applied=len(applied), skipped=skipped)
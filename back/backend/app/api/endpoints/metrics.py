@@ -0,0 +1,49 @@
+import time
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api import deps
+from app.core import metrics
+from app.core.config import settings
+from app.db.session import get_db
+from app.models.sql import Report, ReportStatus
+
+router = APIRouter()
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_status_refreshed_at = 0.0
+
+
+async def refresh_report_status_gauge(db: AsyncSession) -> None:
+    """
+    Counts reports per status (e.g. how many are PROCESSING right now). One
+    GROUP BY over reports, so it runs at most once per METRICS_STATUS_REFRESH_SECONDS
+    however often the endpoint is scraped.
+    """
+    global _status_refreshed_at
+    if time.monotonic() - _status_refreshed_at < settings.METRICS_STATUS_REFRESH_SECONDS:
+        return
+    result = await db.execute(select(Report.status, func.count()).group_by(Report.status))
+    counts = dict(result.all())
+    for status in ReportStatus:
+        metrics.REPORTS_BY_STATUS.set(counts.get(status.value, 0), status=status.value)
+    _status_refreshed_at = time.monotonic()
+
+
+@router.get(
+    "/metrics",
+    response_class=PlainTextResponse,
+    include_in_schema=False,
+    dependencies=[Depends(deps.verify_internal_token)],
+)
+async def read_metrics(db: AsyncSession = Depends(get_db)):
+    """
+    Process metrics in the Prometheus text format (scraped per API process).
+    Internal like /internal: the scraper sends INTERNAL_API_TOKEN as X-Internal-Token.
+    """
+    await refresh_report_status_gauge(db)
+    return PlainTextResponse(metrics.render(), media_type=PROMETHEUS_CONTENT_TYPE)
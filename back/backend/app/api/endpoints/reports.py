@@ -1,41 +1,329 @@
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status
+import asyncio
+import math
+from datetime import datetime
+from typing import Dict, List, Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, desc
+from sqlalchemy import and_, func, or_, select, desc, tuple_
 
 from app.api import deps
-from app.db.session import get_db
+from app.core import events, geo
+from app.core.config import settings
+from app.core.pagination import encode_cursor, decode_cursor
+from app.db.session import get_db, listing_logs_collection
 from app.models.sql import Report, User
-from app.models.nosql import InferenceLog
-from app.schemas.report import ReportResponse, ReportDetail
+from app.models.nosql import InferenceLog, InferenceLogDetections
+from app.schemas.report import ReportResponse, ReportDetail, ReportListItem, ReportTile
 
 router = APIRouter()
 
-@router.get("/", response_model=List[ReportResponse])
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def _boxes(detections: List[dict], scale: float) -> List[dict]:
+    # Fix: Map Kestra 'name' to Schema 'class_name'. Entries missing a numeric
+    # coordinate/confidence or a name are skipped instead of failing the response
+    return [
+        {
+            "x1": d["x1"] / scale,
+            "y1": d["y1"] / scale,
+            "x2": d["x2"] / scale,
+            "y2": d["y2"] / scale,
+            "confidence": d["confidence"],
+            "class_name": d["name"],  # Map name -> class_name
+            "class_id": d.get("class")    # Preserve ID if needed
+        }
+        for d in detections
+        if isinstance(d, dict)
+        and all(_is_number(d.get(key)) for key in ("x1", "y1", "x2", "y2", "confidence"))
+        and isinstance(d.get("name"), str)
+    ]
+
+def map_detections(log: Optional[InferenceLogDetections], inference_scale: Optional[float] = None) -> dict:
+    """
+    ReportDetail fields from an inference log (empty if inference has not logged yet).
+    Boxes are mapped from the model-sized copy back to original image pixels.
+    Video frames are inferred at their decoded size, so their boxes are kept as is.
+    """
+    if log is None:
+        return {"detections": []}
+    scale = inference_scale or 1.0
+    return {
+        "detections": _boxes(log.detections, scale),
+        "frames": [{**frame, "detections": _boxes(frame.get("detections", []), 1.0)} for frame in log.frames],
+        "video_summary": log.video_summary,
+        "model_version": log.model_version,
+        "processing_time_ms": log.processing_time_ms,
+    }
+
+async def fetch_inference_logs(report_ids: List[str]) -> Dict[str, InferenceLogDetections]:
+    """
+    All logs for the given reports in one `$in` query, projected to the detail
+    fields. Uses the listing read preference (may be served by a secondary).
+    """
+    if not report_ids:
+        return {}
+    docs = await listing_logs_collection().find(
+        {"report_id": {"$in": report_ids}},
+        {field: 1 for field in InferenceLogDetections.model_fields},
+    ).to_list(None)
+    by_report: Dict[str, InferenceLogDetections] = {}
+    for doc in docs:
+        by_report.setdefault(doc["report_id"], InferenceLogDetections(**doc))
+    return by_report
+
+@router.get("/", response_model=List[ReportListItem])
 async def read_reports(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     status: Optional[str] = None,
+    cursor: Optional[str] = None,
+    include: Optional[Literal["detections"]] = None,
+    fire_detected: Optional[bool] = None,
+    min_fire_confidence: Optional[float] = None,
+    min_smoke_confidence: Optional[float] = None,
+    sort: Literal["created_at", "fire_confidence"] = "created_at",
     current_user: User = Depends(deps.get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """
     Retrieve reports.
-    - Pagination: skip, limit
-    - Filters: status (PROCESSING, DONE, ERROR)
-    - Returns newest first.
+    - Pagination: pass the `X-Next-Cursor` response header back as `cursor`
+      (keyset on (sort key, id); constant cost at any depth). `skip` is still
+      accepted for compatibility but degrades linearly on deep pages.
+    - Filters: status (PROCESSING, DONE, ERROR); fire_detected (fire confidence
+      >= FIRE_CONFIDENCE_THRESHOLD); min_fire_confidence / min_smoke_confidence.
+      All answered from the summary columns, no Mongo access.
+    - sort: created_at (newest first, default) or fire_confidence (highest
+      first, completed reports only).
+    - include=detections: embed each report's detections (the ReportDetail
+      fields of ReportListItem), fetched with a single Mongo query for the
+      whole page. Without it rows have the ReportResponse shape.
     """
+    sort_column = Report.fire_confidence if sort == "fire_confidence" else Report.created_at
+    
     # Filter by current user for isolation
-    query = select(Report).where(Report.user_id == current_user.id).order_by(desc(Report.created_at)).offset(skip).limit(limit)
+    query = (
+        select(Report)
+        .where(Report.user_id == current_user.id)
+        .order_by(desc(sort_column), desc(Report.id))
+        .limit(limit)
+    )
     
     if status:
         query = query.where(Report.status == status)
+    if sort == "fire_confidence":
+        query = query.where(Report.fire_confidence.is_not(None))
+    if fire_detected is not None:
+        detected = Report.fire_confidence >= settings.FIRE_CONFIDENCE_THRESHOLD
+        query = query.where(detected if fire_detected else ~detected)
+    if min_fire_confidence is not None:
+        query = query.where(Report.fire_confidence >= min_fire_confidence)
+    if min_smoke_confidence is not None:
+        query = query.where(Report.smoke_confidence >= min_smoke_confidence)
+    
+    if cursor:
+        try:
+            cursor_value, cursor_id = decode_cursor(cursor, sort=sort)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        # Row-value comparison so the (user_id, sort key, id) index serves it as a range seek
+        query = query.where(
+            tuple_(sort_column, Report.id) < tuple_(cursor_value, cursor_id)
+        )
+    elif skip:
+        query = query.offset(skip)
         
     result = await db.execute(query)
     reports = result.scalars().all()
     
+    if len(reports) == limit and limit > 0:
+        last = reports[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(getattr(last, sort), last.id, sort=sort)
+    
+    if include == "detections":
+        # Duplicate uploads share the log of the report they reused
+        logs = await fetch_inference_logs(list({r.duplicate_of or r.id for r in reports}))
+        return [
+            ReportListItem(**{
+                **ReportResponse.model_validate(r).model_dump(),
+                **map_detections(logs.get(r.duplicate_of or r.id), r.inference_scale),
+            })
+            for r in reports
+        ]
+    
     return reports
 
+def spatial_filters(
+    min_lat: Optional[float],
+    min_lon: Optional[float],
+    max_lat: Optional[float],
+    max_lon: Optional[float],
+    lat: Optional[float],
+    lon: Optional[float],
+    radius_km: Optional[float],
+    since: Optional[datetime],
+    until: Optional[datetime],
+):
+    """
+    WHERE clauses for a bbox or radius query plus time window, and the box
+    that bounds the area.
+
+    The geohash prefix ranges covering the box are what the index serves;
+    exact coordinate checks then trim the cover's overshoot. The radius check
+    is equirectangular (no trig in SQL), accurate to well under 1% at the
+    distances a map view uses.
+    """
+    bbox_params = [v is not None for v in (min_lat, min_lon, max_lat, max_lon)]
+    radius_params = [v is not None for v in (lat, lon, radius_km)]
+    use_bbox = all(bbox_params) and not any(radius_params)
+    if not use_bbox and not (all(radius_params) and not any(bbox_params)):
+        raise HTTPException(
+            status_code=400,
+            detail="Provide either min_lat/min_lon/max_lat/max_lon or lat/lon/radius_km",
+        )
+    
+    clauses = []
+    if use_bbox:
+        if min_lat > max_lat or min_lon > max_lon:
+            raise HTTPException(status_code=400, detail="Invalid bounding box")
+        bbox = (min_lat, min_lon, max_lat, max_lon)
+        clauses += [Report.latitude.between(min_lat, max_lat), Report.longitude.between(min_lon, max_lon)]
+    else:
+        bbox = geo.radius_bbox(lat, lon, radius_km)
+        scale = math.cos(math.radians(lat))
+        dlat = Report.latitude - lat
+        dlon = (Report.longitude - lon) * scale
+        clauses.append(dlat * dlat + dlon * dlon <= (radius_km / geo.KM_PER_DEGREE) ** 2)
+    
+    ranges = [
+        and_(Report.geohash >= low, Report.geohash < high) if high else Report.geohash >= low
+        for low, high in geo.covering_ranges(bbox, settings.MAP_COVER_MAX_CELLS)
+    ]
+    clauses.insert(0, or_(*ranges))
+    if since is not None:
+        clauses.append(Report.created_at >= since)
+    if until is not None:
+        clauses.append(Report.created_at < until)
+    return clauses, bbox
+
+@router.get("/map", response_model=List[ReportResponse])
+async def read_reports_in_area(
+    min_lat: Optional[float] = Query(None, ge=-90, le=90),
+    min_lon: Optional[float] = Query(None, ge=-180, le=180),
+    max_lat: Optional[float] = Query(None, ge=-90, le=90),
+    max_lon: Optional[float] = Query(None, ge=-180, le=180),
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lon: Optional[float] = Query(None, ge=-180, le=180),
+    radius_km: Optional[float] = Query(None, gt=0, le=2000),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    fire_detected: Optional[bool] = None,
+    limit: int = Query(500, ge=1),
+    current_user: User = Depends(deps.get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Reports inside a viewport (min_lat/min_lon/max_lat/max_lon) or within
+    radius_km of lat/lon, optionally in a created_at window. Newest first,
+    capped at MAP_MAX_RESULTS; use /map/tiles for zoomed-out views.
+    """
+    clauses, _ = spatial_filters(min_lat, min_lon, max_lat, max_lon, lat, lon, radius_km, since, until)
+    query = (
+        select(Report)
+        .where(Report.user_id == current_user.id, *clauses)
+        .order_by(desc(Report.created_at), desc(Report.id))
+        .limit(min(limit, settings.MAP_MAX_RESULTS))
+    )
+    if fire_detected is not None:
+        detected = Report.fire_confidence >= settings.FIRE_CONFIDENCE_THRESHOLD
+        query = query.where(detected if fire_detected else ~detected)
+    
+    result = await db.execute(query)
+    return result.scalars().all()
+
+@router.get("/map/tiles", response_model=List[ReportTile])
+async def read_report_tiles(
+    min_lat: Optional[float] = Query(None, ge=-90, le=90),
+    min_lon: Optional[float] = Query(None, ge=-180, le=180),
+    max_lat: Optional[float] = Query(None, ge=-90, le=90),
+    max_lon: Optional[float] = Query(None, ge=-180, le=180),
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lon: Optional[float] = Query(None, ge=-180, le=180),
+    radius_km: Optional[float] = Query(None, gt=0, le=2000),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    precision: Optional[int] = Query(None, ge=1, le=geo.GEOHASH_PRECISION),
+    current_user: User = Depends(deps.get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Report count and max fire confidence per geohash cell, aggregated in SQL.
+    `precision` picks the cell size (geohash length); by default the finest
+    one that keeps the area under MAP_MAX_TILES cells.
+    """
+    clauses, bbox = spatial_filters(min_lat, min_lon, max_lat, max_lon, lat, lon, radius_km, since, until)
+    if precision is None:
+        precision = geo.covering_precision(bbox, settings.MAP_MAX_TILES)
+    
+    cell = func.substr(Report.geohash, 1, precision).label("cell")
+    query = (
+        select(cell, func.count(Report.id), func.max(Report.fire_confidence))
+        .where(Report.user_id == current_user.id, *clauses)
+        .group_by(cell)
+        .limit(settings.MAP_MAX_TILES)
+    )
+    result = await db.execute(query)
+    
+    tiles = []
+    for cell_hash, count, max_fire in result.all():
+        center_lat, center_lon = geo.decode(cell_hash)
+        tiles.append(ReportTile(
+            cell=cell_hash,
+            latitude=center_lat,
+            longitude=center_lon,
+            count=count,
+            max_fire_confidence=max_fire,
+        ))
+    return tiles
+
+async def report_event_stream(request: Request, user_id: int):
+    """
+    Server-sent events for one user's report status transitions.
+    Sends a keep-alive comment every EVENTS_KEEPALIVE_SECONDS so proxies keep
+    the connection open, and stops when the client disconnects.
+    """
+    queue = events.broker.subscribe(user_id)
+    try:
+        yield "retry: 5000\n\n"
+        while not await request.is_disconnected():
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=settings.EVENTS_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            yield events.format_sse(event)
+    finally:
+        events.broker.unsubscribe(user_id, queue)
+
+@router.get("/events")
+async def stream_report_events(
+    request: Request,
+    current_user: User = Depends(deps.get_current_user_for_stream),
+):
+    """
+    Push report status changes (PROCESSING -> DONE/ERROR) as they happen,
+    with a detection summary on DONE. Replaces polling GET /reports/.
+    Authenticate with the Authorization header or `?token=` (for EventSource).
+    """
+    return StreamingResponse(
+        report_event_stream(request, current_user.id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @router.get("/{report_id}", response_model=ReportDetail)
 async def read_report_detail(
     report_id: str,
@@ -55,34 +343,11 @@ async def read_report_detail(
     if not report:
         raise HTTPException(status_code=404, detail="Report not found")
         
-    # 2. Fetch from Mongo
-    log = await InferenceLog.find_one(InferenceLog.report_id == report_id)
-    
-    detections = []
-    model_version = None
-    processing_time_ms = 0.0
-    
-    if log:
-        # Fix: Map Kestra 'name' to Schema 'class_name'
-        detections = [
-            {
-                "x1": d.get("x1"),
-                "y1": d.get("y1"),
-                "x2": d.get("x2"),
-                "y2": d.get("y2"),
-                "confidence": d.get("confidence"),
-                "class_name": d.get("name"),  # Map name -> class_name
-                "class_id": d.get("class")    # Preserve ID if needed
-            }
-            for d in log.detections
-        ]
-        model_version = log.model_version
-        processing_time_ms = log.processing_time_ms
+    # 2. Fetch from Mongo (a duplicate upload reuses its canonical report's log)
+    log = await InferenceLog.find_one(
+        {"report_id": report.duplicate_of or report.id},
+        projection_model=InferenceLogDetections,
+    )
         
     # 3. Combine
-    return ReportDetail(
-        **report.__dict__,
-        detections=detections,
-        model_version=model_version,
-        processing_time_ms=processing_time_ms
-    )
+    return ReportDetail(**{**ReportResponse.model_validate(report).model_dump(), **map_detections(log, report.inference_scale)})
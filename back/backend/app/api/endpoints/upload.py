@@ -1,25 +1,107 @@
+import asyncio
+import logging
 import os
-import shutil
+import time
 import uuid
-from typing import Optional
+from datetime import datetime
+from typing import List, Literal, Optional, Tuple
 from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException, status
+from sqlalchemy import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.api import deps
 from app.db.session import get_db
-from app.models.sql import User, Report, ReportStatus
-from app.schemas.report import ReportResponse
-from app.core.kestra_client import trigger_fire_detection_flow
+from app.models.sql import User, Report, ReportStatus, FlowTrigger, InferencePriority, MediaType
+from app.schemas.inference import VideoSamplingOptions
+from app.schemas.report import ReportResponse, BatchUploadResponse, BatchUploadError
+from app.core.config import settings
+from app.core import dedup, geo, images, outbox, scheduling
+from app.core.images import ProcessedImage
+from app.core.logs import log_context
+from app.core.storage import UploadTooLarge, save_upload_stream
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 UPLOAD_DIR = os.getenv("SHARED_UPLOADS_DIR", "/shared-data/uploads")
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
-@router.post("/upload", response_model=ReportResponse, status_code=status.HTTP_202_ACCEPTED)
+async def process_image(file_name: str) -> ProcessedImage:
+    """
+    Post-upload processing (model-sized copy, thumbnail, EXIF GPS) in a worker
+    thread. Files Pillow cannot decode are kept as-is and inferred from the original;
+    ones whose metadata cannot be removed raise MetadataStripError (rejected).
+    """
+    if not settings.IMAGE_PROCESSING_ENABLED:
+        return ProcessedImage()
+    try:
+        return await asyncio.to_thread(
+            images.process_upload,
+            UPLOAD_DIR,
+            file_name,
+            settings.INFERENCE_IMAGE_SIZE,
+            settings.THUMBNAIL_SIZE,
+            settings.DERIVATIVE_JPEG_QUALITY,
+            settings.TILED_INFERENCE_MIN_PIXELS,
+        )
+    except images.MetadataStripError:
+        raise
+    except Exception as e:
+        logger.warning("Could not process image %s: %s", file_name, e)
+        return ProcessedImage()
+
+async def read_gps(file_name: str) -> Optional[Tuple[float, float]]:
+    """EXIF GPS of an upload that is not processed (a duplicate); header only, in a worker thread."""
+    if not settings.IMAGE_PROCESSING_ENABLED:
+        return None
+    try:
+        return await asyncio.to_thread(images.read_gps, os.path.join(UPLOAD_DIR, file_name))
+    except Exception as e:
+        logger.warning("Could not read EXIF of %s: %s", file_name, e)
+        return None
+
+def fill_coordinates(row: dict, gps: Optional[Tuple[float, float]]) -> None:
+    """EXIF GPS fills the coordinates the client did not send."""
+    if (row["latitude"] is None or row["longitude"] is None) and gps:
+        row["latitude"], row["longitude"] = gps
+        row["geohash"] = geo.encode(*gps)
+
+def upload_row(report_id: str, user_id: int, file_name: str, stored, processed: ProcessedImage,
+               latitude: Optional[float], longitude: Optional[float]) -> dict:
+    """Report column values for a new upload."""
+    row = {
+        "id": report_id,
+        "user_id": user_id,
+        "file_path": file_name,
+        "status": ReportStatus.PROCESSING.value,
+        "created_at": datetime.utcnow(),
+        "latitude": latitude,
+        "longitude": longitude,
+        "geohash": geo.encode(latitude, longitude) if latitude is not None and longitude is not None else None,
+        "content_hash": stored.sha256,
+        "size_bytes": stored.size_bytes,
+        "model_version": settings.MODEL_VERSION,
+        **processed.columns(),
+    }
+    fill_coordinates(row, processed.gps)
+    return row
+
+async def process_fresh(row: dict) -> None:
+    """Processes an upload that needs inference and fills its media columns and coordinates."""
+    processed = await process_image(row["file_path"])
+    row.update(processed.columns())
+    fill_coordinates(row, processed.gps)
+
+@router.post(
+    "/upload",
+    dependencies=[Depends(deps.rate_limit("upload")), Depends(deps.admission_control)],
+    response_model=ReportResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
 async def upload_image(
     file: UploadFile = File(...),
     latitude: Optional[float] = Form(None),
     longitude: Optional[float] = Form(None),
+    priority: Optional[InferencePriority] = Form(None),
     current_user: User = Depends(deps.get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
@@ -27,14 +109,24 @@ async def upload_image(
     Upload an image for wildfire detection.
     
     1. Validates file type.
-    2. Saves file to shared volume.
-    3. Creates initial DB record.
-    4. Triggers Kestra.
+    2. Streams file to shared volume (size-limited, hashed on the fly).
+    3. Looks the hash up: an image already seen under the current model version
+       reuses that report's result and copies (or waits on its in-flight run),
+       is not decoded and gets no trigger.
+    4. Decodes new images once in a worker thread: model-sized copy for inference,
+       thumbnail for list views (both EXIF-free), EXIF GPS for missing coordinates.
+    5. Creates initial DB record and its outbox trigger (one transaction).
+    6. Wakes the outbox worker, which triggers Kestra in the background.
+    
+    `priority` can lower the inference priority class below the user's role
+    default (e.g. bulk for archival imports); uploads located in a risk zone
+    move up one class (see core.scheduling).
     """
     
+    started = time.perf_counter()
     try:
         # 1. Validation
-        print(f"[DEBUG] Received file: {file.filename}, content_type: {file.content_type}")
+        logger.debug("Received file %s (%s)", file.filename, file.content_type)
         if not file.content_type.startswith("image/"):
             raise HTTPException(status_code=400, detail="File must be an image")
         
@@ -44,46 +136,292 @@ async def upload_image(
         safe_filename = f"{file_id}{file_extension}"
         file_path = os.path.join(UPLOAD_DIR, safe_filename)
         
-        print(f"[DEBUG] Saving to: {file_path}")
-        try:
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
-            print(f"[DEBUG] File saved successfully")
-        except Exception as e:
-            print(f"[ERROR] File save failed: {str(e)}")
-            raise HTTPException(status_code=500, detail=f"Could not save file: {str(e)}")
+        with log_context(report_id=file_id):
+            logger.debug("Saving to %s", file_path)
+            try:
+                stored = await save_upload_stream(
+                    file,
+                    file_path,
+                    max_bytes=settings.MAX_UPLOAD_SIZE_MB * 1024 * 1024,
+                    chunk_size=settings.UPLOAD_CHUNK_SIZE_KB * 1024,
+                )
+            except UploadTooLarge as e:
+                raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+            except Exception as e:
+                logger.error("File save failed: %s", e)
+                raise HTTPException(status_code=500, detail=f"Could not save file: {str(e)}")
             
-        # 3. Create DB Record
-        print(f"[DEBUG] Creating DB record for user_id={current_user.id}")
-        report = Report(
-            id=file_id,
-            user_id=current_user.id,
-            file_path=safe_filename,
-            status=ReportStatus.PROCESSING.value,
-            latitude=latitude,
-            longitude=longitude
-        )
-        db.add(report)
-        print(f"[DEBUG] Added to session, committing...")
-        await db.commit()
-        print(f"[DEBUG] Committed, refreshing...")
-        await db.refresh(report)
-        print(f"[DEBUG] DB record created successfully")
-        
-        # 4. Trigger Kestra
-        execution_id = trigger_fire_detection_flow(file_path=safe_filename, report_id=file_id)
-        if execution_id:
-            print(f"[{file_id}] Started Kestra Execution: {execution_id}")
-        else:
-            print(f"[{file_id}] Warning: Could not trigger Kestra flow.")
-        
-        return report
+            # 3. Reuse the result of an identical earlier upload if any
+            dedup_started = time.perf_counter()
+            row = upload_row(file_id, current_user.id, safe_filename, stored, ProcessedImage(), latitude, longitude)
+            needs_inference = bool(await dedup.deduplicate(db, [row]))
+            db_ms = (time.perf_counter() - dedup_started) * 1000
+            
+            # 4. Normalize: model-sized copy + thumbnail, EXIF GPS (off the event loop).
+            # Duplicates use the earlier report's copies and only have their GPS read
+            processing_started = time.perf_counter()
+            if needs_inference:
+                try:
+                    await process_fresh(row)
+                except images.MetadataStripError as e:
+                    logger.warning("Rejected upload: %s", e)
+                    images.remove_upload(UPLOAD_DIR, safe_filename)
+                    raise HTTPException(status_code=400, detail="Could not remove the image's metadata")
+            else:
+                logger.debug("Duplicate of report %s (%s), reusing its result", row["duplicate_of"], row["status"])
+                fill_coordinates(row, await read_gps(safe_filename))
+            process_ms = (time.perf_counter() - processing_started) * 1000
+            
+            # 5. Create DB Record
+            db_started = time.perf_counter()
+            report = Report(**row)
+            db.add(report)
+            if needs_inference:
+                outbox.enqueue_flow_trigger(
+                    db,
+                    report_id=file_id,
+                    file_path=row["inference_path"] or safe_filename,
+                    user_id=current_user.id,
+                    priority=scheduling.resolve_priority(current_user.role, priority, row["geohash"]).value,
+                )
+            try:
+                await db.commit()
+            except Exception:
+                images.remove_upload(UPLOAD_DIR, safe_filename)
+                raise
+            await db.refresh(report)
+            db_ms += (time.perf_counter() - db_started) * 1000
+            
+            if needs_inference:
+                # 6. Trigger Kestra (dispatched and retried by the outbox worker)
+                outbox.notify_pending()
+            else:
+                # The report points at the earlier upload's copy
+                images.remove_upload(UPLOAD_DIR, safe_filename)
+            
+            # One line per upload with the time spent in each step
+            logger.info(
+                "Upload accepted",
+                extra={
+                    "size_bytes": stored.size_bytes,
+                    "write_ms": round(stored.duration_s * 1000, 2),
+                    "throughput_mbps": round(stored.throughput_bps / 1e6, 2),
+                    "process_ms": round(process_ms, 2),
+                    "db_ms": round(db_ms, 2),
+                    "total_ms": round((time.perf_counter() - started) * 1000, 2),
+                    "duplicate_of": row["duplicate_of"],
+                },
+            )
+            return report
         
     except HTTPException:
         raise
     except Exception as e:
-        import traceback
-        print(f"[ERROR] Upload failed with exception:")
-        print(traceback.format_exc())
+        logger.exception("Upload failed")
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
+
+@router.post(
+    "/upload/video",
+    dependencies=[Depends(deps.rate_limit("upload_video")), Depends(deps.admission_control)],
+    response_model=ReportResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def upload_video(
+    file: UploadFile = File(...),
+    latitude: Optional[float] = Form(None),
+    longitude: Optional[float] = Form(None),
+    sampling: Literal["interval", "scene"] = Form("interval"),
+    interval_s: Optional[float] = Form(None, gt=0),
+    priority: Optional[InferencePriority] = Form(None),
+    current_user: User = Depends(deps.get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Upload a video (e.g. a tower recording) for wildfire detection.
+    
+    The file is streamed to the shared volume like images (MAX_VIDEO_UPLOAD_SIZE_MB)
+    and gets a single Report. The resident inference worker decodes it frame by
+    frame, samples frames every `interval_s` seconds ("interval") or on scene
+    changes ("scene"), skips near-duplicate frames and runs the rest through
+    batched inference. Per-frame detections and a temporal summary end up in the
+    report's inference log; the report columns summarize the whole video.
+    """
+    if not (file.content_type or "").startswith("video/"):
+        raise HTTPException(status_code=400, detail="File must be a video")
+    
+    file_id = str(uuid.uuid4())
+    safe_filename = f"{file_id}{os.path.splitext(file.filename or '')[1]}"
+    try:
+        stored = await save_upload_stream(
+            file,
+            os.path.join(UPLOAD_DIR, safe_filename),
+            max_bytes=settings.MAX_VIDEO_UPLOAD_SIZE_MB * 1024 * 1024,
+            chunk_size=settings.UPLOAD_CHUNK_SIZE_KB * 1024,
+        )
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    except Exception as e:
+        logger.error("Video save failed: %s", e)
+        raise HTTPException(status_code=500, detail=f"Could not save file: {str(e)}")
+    
+    row = upload_row(file_id, current_user.id, safe_filename, stored, ProcessedImage(), latitude, longitude)
+    report = Report(**row, media_type=MediaType.VIDEO.value)
+    db.add(report)
+    outbox.enqueue_flow_trigger(
+        db,
+        report_id=file_id,
+        file_path=safe_filename,
+        media_type=MediaType.VIDEO.value,
+        options=VideoSamplingOptions(mode=sampling, interval_s=interval_s).model_dump(exclude_none=True),
+        user_id=current_user.id,
+        priority=scheduling.resolve_priority(current_user.role, priority, row["geohash"]).value,
+    )
+    try:
+        await db.commit()
+    except Exception:
+        images.remove_upload(UPLOAD_DIR, safe_filename)
+        raise
+    await db.refresh(report)
+    outbox.notify_pending()
+    logger.info(
+        "Video upload accepted",
+        extra={"report_id": file_id, "size_bytes": stored.size_bytes, "sampling": sampling},
+    )
+    return report
+
+
+
+# Files streamed to disk concurrently within one batch request
+BATCH_WRITE_CONCURRENCY = 8
+
+@router.post(
+    "/upload/batch",
+    dependencies=[Depends(deps.rate_limit("upload_batch")), Depends(deps.admission_control)],
+    response_model=BatchUploadResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def upload_images_batch(
+    files: List[UploadFile] = File(...),
+    latitude: Optional[float] = Form(None),
+    longitude: Optional[float] = Form(None),
+    priority: Optional[InferencePriority] = Form(None),
+    current_user: User = Depends(deps.get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Upload many images in one multipart request.
+    
+    1. Validates and streams every file to the shared volume.
+    2. Attaches images already seen (same content hash and model version) to the
+       earlier report instead of running inference again, and processes the
+       others (model-sized copy, thumbnail, EXIF GPS) like single uploads.
+    3. Inserts all Report rows and outbox triggers with one bulk statement each, one commit.
+    4. Wakes the outbox worker, which submits the batch as grouped executions.
+    
+    Invalid files are reported in 'errors' and do not fail the rest of the batch.
+    Batches are scheduled as bulk inference unless `priority` says otherwise.
+    """
+    if len(files) > settings.MAX_BATCH_UPLOAD_FILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many files in batch (max {settings.MAX_BATCH_UPLOAD_FILES})",
+        )
+    
+    batch_id = str(uuid.uuid4())
+    errors: List[BatchUploadError] = []
+    filenames: dict = {}  # report id -> client file name
+    rejected: set = set()
+    semaphore = asyncio.Semaphore(BATCH_WRITE_CONCURRENCY)
+    
+    async def store(file: UploadFile) -> Optional[dict]:
+        if not (file.content_type or "").startswith("image/"):
+            errors.append(BatchUploadError(filename=file.filename, detail="File must be an image"))
+            return None
+        
+        file_id = str(uuid.uuid4())
+        safe_filename = f"{file_id}{os.path.splitext(file.filename or '')[1]}"
+        filenames[file_id] = file.filename
+        async with semaphore:
+            try:
+                stored = await save_upload_stream(
+                    file,
+                    os.path.join(UPLOAD_DIR, safe_filename),
+                    max_bytes=settings.MAX_UPLOAD_SIZE_MB * 1024 * 1024,
+                    chunk_size=settings.UPLOAD_CHUNK_SIZE_KB * 1024,
+                )
+            except UploadTooLarge as e:
+                errors.append(BatchUploadError(filename=file.filename, detail=str(e)))
+                return None
+            except Exception as e:
+                logger.error("Batch %s: could not save %s: %s", batch_id, file.filename, e)
+                errors.append(BatchUploadError(filename=file.filename, detail="Could not save file"))
+                return None
+        
+        return upload_row(file_id, current_user.id, safe_filename, stored, ProcessedImage(), latitude, longitude)
+    
+    async def process(row: dict) -> None:
+        async with semaphore:
+            if row["duplicate_of"] is None:
+                try:
+                    await process_fresh(row)
+                except images.MetadataStripError as e:
+                    logger.warning("Batch %s: rejected %s: %s", batch_id, filenames[row["id"]], e)
+                    rejected.add(row["id"])
+            else:
+                fill_coordinates(row, await read_gps(written[row["id"]]))
+    
+    rows = [row for row in await asyncio.gather(*(store(f) for f in files)) if row]
+    
+    if rows:
+        written = {row["id"]: row["file_path"] for row in rows}
+        try:
+            fresh = await dedup.deduplicate(db, rows)
+            # Only images seen for the first time are decoded
+            await asyncio.gather(*(process(row) for row in rows))
+            # Copies of a rejected image are rejected with it
+            for row in rows:
+                if row["id"] in rejected or row["duplicate_of"] in rejected:
+                    errors.append(BatchUploadError(
+                        filename=filenames[row["id"]], detail="Could not remove the image's metadata"
+                    ))
+                    images.remove_upload(UPLOAD_DIR, written[row["id"]])
+            rows = [row for row in rows if row["id"] not in rejected and row["duplicate_of"] not in rejected]
+            fresh = [row for row in fresh if row["id"] not in rejected]
+            # Duplicates of an image earlier in this batch were attached before it was processed
+            by_id = {row["id"]: row for row in fresh}
+            for row in rows:
+                if row["duplicate_of"] in by_id:
+                    row.update({field: by_id[row["duplicate_of"]][field] for field in images.MEDIA_FIELDS})
+            if rows:
+                await db.execute(insert(Report), rows)
+            if fresh:
+                priorities = {
+                    row["id"]: scheduling.resolve_priority(
+                        current_user.role, priority, row["geohash"], default=InferencePriority.BULK
+                    ).value
+                    for row in fresh
+                }
+                await db.execute(insert(FlowTrigger), outbox.flow_trigger_rows(fresh, batch_id, priorities))
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            for file_name in written.values():
+                images.remove_upload(UPLOAD_DIR, file_name)
+            raise
+        # Duplicates point at an earlier copy; drop the one this request wrote
+        for row in rows:
+            if row["duplicate_of"]:
+                images.remove_upload(UPLOAD_DIR, written[row["id"]])
+        if fresh:
+            outbox.notify_pending()
+    
+    logger.info(
+        "Batch upload: %d accepted, %d rejected", len(rows), len(errors),
+        extra={"batch_id": batch_id},
+    )
+    return BatchUploadResponse(
+        batch_id=batch_id,
+        reports=[ReportResponse(**row) for row in rows],
+        errors=errors,
+    )
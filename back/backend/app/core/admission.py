@@ -0,0 +1,62 @@
+import time
+from typing import Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import metrics, worker_client
+from app.core.config import settings
+from app.models.sql import FlowTrigger, FlowTriggerStatus, Report, ReportStatus
+
+# Global admission control for new inference work (uploads). When the system
+# is already behind, new uploads are refused with 503 + Retry-After instead of
+# growing a backlog that raises latency for everyone:
+# - reports still PROCESSING >= ADMISSION_MAX_PROCESSING
+# - inference queue depth (PENDING outbox triggers + the resident worker's
+#   last reported queue) >= ADMISSION_MAX_QUEUE_DEPTH
+# Both counts are re-queried at most every ADMISSION_REFRESH_SECONDS per process.
+
+_refreshed_at = 0.0
+_processing = 0
+_pending_triggers = 0
+
+
+def reset() -> None:
+    global _refreshed_at, _processing, _pending_triggers
+    _refreshed_at, _processing, _pending_triggers = 0.0, 0, 0
+
+
+async def _refresh(db: AsyncSession) -> None:
+    global _refreshed_at, _processing, _pending_triggers
+    if time.monotonic() - _refreshed_at < settings.ADMISSION_REFRESH_SECONDS:
+        return
+    _processing = (await db.execute(
+        select(func.count()).select_from(Report).where(Report.status == ReportStatus.PROCESSING.value)
+    )).scalar_one()
+    _pending_triggers = (await db.execute(
+        select(func.count()).select_from(FlowTrigger).where(FlowTrigger.status == FlowTriggerStatus.PENDING.value)
+    )).scalar_one()
+    _refreshed_at = time.monotonic()
+    metrics.INFERENCE_BACKLOG.set(_processing, queue="processing")
+    metrics.INFERENCE_BACKLOG.set(_pending_triggers, queue="outbox")
+
+
+def queue_depth() -> int:
+    return _pending_triggers + (worker_client.last_queue_depth or 0)
+
+
+async def check(db: AsyncSession) -> Optional[str]:
+    """Returns the reason new inference work must be refused right now, or None."""
+    max_processing = settings.ADMISSION_MAX_PROCESSING
+    max_queue_depth = settings.ADMISSION_MAX_QUEUE_DEPTH
+    if max_processing <= 0 and max_queue_depth <= 0:
+        return None
+    await _refresh(db)
+    reason = None
+    if max_processing > 0 and _processing >= max_processing:
+        reason = "processing"
+    elif max_queue_depth > 0 and queue_depth() >= max_queue_depth:
+        reason = "queue_depth"
+    if reason:
+        metrics.ADMISSION_REJECTED.inc(reason=reason)
+    return reason
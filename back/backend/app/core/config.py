@@ -1,23 +1,198 @@
 import os
+from typing import Dict, List, Literal, Optional, Tuple
+from pydantic import field_validator
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     PROJECT_NAME: str = "Wildfire Detection API"
+    # Logging (core.logs): DEBUG adds per-step upload/inference detail
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: Literal["json", "text"] = "json"
     
     # Auth
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # Refresh tokens (POST /auth/refresh) are single use: each refresh rotates them
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 14
+    # Resolved users are cached per process to skip the users lookup on every request
+    USER_CACHE_TTL_SECONDS: float = 60.0
+    USER_CACHE_MAX_SIZE: int = 10000
+    # bcrypt cost; existing hashes are upgraded on the user's next login when it changes
+    PASSWORD_BCRYPT_ROUNDS: int = 12
+    # Hashing runs on this many threads; logins/sign-ups beyond PASSWORD_HASH_MAX_QUEUE
+    # waiting jobs get 503 instead of queueing
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_QUEUE: int = 64
     
     # Databases
     DATABASE_URL: str
+    DB_ECHO: bool = False  # log every SQL statement (debugging only)
+    # SQLAlchemy connection pool, per process (API and worker each get their own)
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT_SECONDS: float = 30.0  # wait for a free connection before failing
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # Compiled SQL cache (SQLAlchemy) and prepared statements per connection (asyncpg)
+    DB_QUERY_CACHE_SIZE: int = 500
+    DB_STATEMENT_CACHE_SIZE: int = 100
     MONGO_URL: str
     MONGO_DB_NAME: str = "wildfire_logs"
+    # Motor client (one per process, closed on shutdown)
+    MONGO_MAX_POOL_SIZE: int = 100
+    MONGO_MIN_POOL_SIZE: int = 0
+    MONGO_MAX_IDLE_TIME_MS: int = 300_000
+    MONGO_CONNECT_TIMEOUT_MS: int = 5000
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = 5000
+    # Read preference for list views' detection lookups; "secondaryPreferred" offloads
+    # them to secondaries on a replica set (possibly slightly stale). Detail reads stay on the primary.
+    MONGO_LISTING_READ_PREFERENCE: Literal[
+        "primary", "primaryPreferred", "secondary", "secondaryPreferred", "nearest"
+    ] = "primary"
     
     # Kestra Integration
     KESTRA_API_URL: str = "http://kestra:8080/api/v1"
     KESTRA_USER: str
     KESTRA_PASSWORD: str
+    KESTRA_TIMEOUT_SECONDS: float = 5.0
+    KESTRA_MAX_CONNECTIONS: int = 20
+    KESTRA_MAX_KEEPALIVE_CONNECTIONS: int = 10
+
+    # Flow trigger outbox (retried by a background worker)
+    OUTBOX_POLL_INTERVAL_SECONDS: float = 5.0
+    OUTBOX_BATCH_SIZE: int = 200
+    OUTBOX_MAX_ATTEMPTS: int = 8
+    OUTBOX_BACKOFF_BASE_SECONDS: float = 2.0
+    OUTBOX_BACKOFF_MAX_SECONDS: float = 300.0
+    # Stuck-report reaper (core.reaper): PROCESSING reports whose last dispatch is older
+    # than REAPER_STUCK_AFTER_SECONDS get their execution checked; lost ones are
+    # re-dispatched up to REAPER_MAX_DISPATCHES times in total, then marked ERROR.
+    # Reports still PROCESSING after REAPER_GIVE_UP_SECONDS are marked ERROR regardless
+    REAPER_ENABLED: bool = True
+    REAPER_INTERVAL_SECONDS: float = 60.0
+    REAPER_STUCK_AFTER_SECONDS: float = 900.0
+    REAPER_GIVE_UP_SECONDS: float = 21600.0
+    REAPER_MAX_DISPATCHES: int = 3
+    REAPER_BATCH_SIZE: int = 200
+
+    # Inference priority classes (critical, high, normal, bulk). Triggers are dispatched
+    # by enqueue time + their class's delay, so a newer urgent upload overtakes older
+    # bulk ones, but never by more than the delay (no starvation). Until that time, a
+    # trigger waits while a more urgent class has triggers pending
+    PRIORITY_CLASS_DELAYS_SECONDS: Dict[str, float] = {
+        "critical": 0.0,
+        "high": 30.0,
+        "normal": 120.0,
+        "bulk": 900.0,
+    }
+    # Role -> default (and highest requestable) class; other roles get "normal"
+    PRIORITY_ROLE_DEFAULTS: Dict[str, str] = {"sensor": "high", "admin": "critical"}
+    # Geohash prefixes of high-risk zones: uploads located there move up one class
+    PRIORITY_RISK_GEOHASHES: List[str] = []
+    # Fair share: each trigger a user already has in a dispatch round pushes their
+    # next one back by this much, so one user's backlog cannot monopolize a round
+    SCHEDULER_FAIR_SHARE_SECONDS: float = 10.0
+    SCHEDULER_CANDIDATES: int = 1000  # due triggers considered per dispatch round
+
+    # Uploads
+    MAX_UPLOAD_SIZE_MB: int = 25
+    UPLOAD_CHUNK_SIZE_KB: int = 1024
+    MAX_BATCH_UPLOAD_FILES: int = 500
+    # Per-user token buckets: route -> (requests per minute, burst). Routes not listed
+    # are unlimited. "redis" shares the buckets between API processes (needs the
+    # redis package and RATE_LIMIT_REDIS_URL)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMITS: Dict[str, Tuple[float, int]] = {
+        "upload": (60, 20),
+        "upload_batch": (6, 3),
+        "upload_video": (6, 3),
+    }
+    RATE_LIMIT_BACKEND: Literal["memory", "redis"] = "memory"
+    RATE_LIMIT_REDIS_URL: Optional[str] = None
+    RATE_LIMIT_MAX_BUCKETS: int = 100000  # memory backend, LRU bound
+
+    @field_validator("RATE_LIMITS")
+    @classmethod
+    def _check_rate_limits(cls, limits: Dict[str, Tuple[float, int]]) -> Dict[str, Tuple[float, int]]:
+        # The buckets divide by the rate, and each request costs one token
+        for route, (per_minute, burst) in limits.items():
+            if per_minute <= 0 or burst < 1:
+                raise ValueError(f"RATE_LIMITS[{route!r}] needs a rate > 0 and a burst >= 1")
+        return limits
+    # Admission control: uploads get 503 while the inference backlog is over these
+    # (0 = no limit). Counts are refreshed at most every ADMISSION_REFRESH_SECONDS
+    ADMISSION_MAX_PROCESSING: int = 5000
+    ADMISSION_MAX_QUEUE_DEPTH: int = 2000
+    ADMISSION_REFRESH_SECONDS: float = 5.0
+    ADMISSION_RETRY_AFTER_SECONDS: int = 30
+    # Max images submitted to inference in a single grouped execution
+    INFERENCE_GROUP_SIZE: int = 32
+    # Post-upload image processing (core.images): model-sized copy, thumbnail, EXIF strip/GPS
+    IMAGE_PROCESSING_ENABLED: bool = True
+    INFERENCE_IMAGE_SIZE: int = 640  # model input size (YOLOv8 imgsz)
+    THUMBNAIL_SIZE: int = 320
+    DERIVATIVE_JPEG_QUALITY: int = 85
+
+    # Inference dispatch: "kestra" (container per execution) or "worker" (resident model service)
+    INFERENCE_BACKEND: str = "kestra"
+    INFERENCE_WORKER_URL: str = "http://inference-worker:8001"
+
+    # Resident inference worker
+    MODEL_PATH: str = "/shared-data/models/custom_fire_model.pt"
+    FALLBACK_MODEL: str = "yolov8n.pt"
+    WORKER_MAX_BATCH_SIZE: int = 16
+    WORKER_MAX_WAIT_MS: int = 50
+    WORKER_MAX_QUEUE_SIZE: int = 10000
+    # Tiled inference for very large images (e.g. 8K aerial). Images at or above this many
+    # pixels skip the downscaled inference copy and run as overlapping full-resolution tiles.
+    # 0 disables tiling.
+    TILED_INFERENCE_MIN_PIXELS: int = 20_000_000
+    # Tiled images are decoded whole (PIL has no region decode for JPEG/PNG), about 3 bytes
+    # per pixel. Larger JPEGs are tiled at a reduced decode scale under this cap, other
+    # formats over it fail. 0 = no cap.
+    TILED_INFERENCE_MAX_PIXELS: int = 50_000_000
+    TILE_SIZE: int = 640
+    TILE_OVERLAP: int = 128
+    TILE_BATCH_SIZE: int = 16
+    TILE_NMS_IOU_THRESHOLD: float = 0.5
+    # Video ingestion (POST /files/upload/video, always run on the resident worker).
+    # Frames are sampled every VIDEO_SAMPLE_INTERVAL_S seconds ("interval") or when the
+    # scene changes ("scene": checked every VIDEO_SCENE_CHECK_INTERVAL_S, kept when the
+    # 64-bit frame hash differs by >= VIDEO_SCENE_THRESHOLD bits). Frames within
+    # VIDEO_DEDUP_THRESHOLD bits of the last kept one are skipped as near-duplicates.
+    MAX_VIDEO_UPLOAD_SIZE_MB: int = 500
+    VIDEO_SAMPLE_INTERVAL_S: float = 1.0
+    VIDEO_SCENE_CHECK_INTERVAL_S: float = 0.2
+    VIDEO_SCENE_THRESHOLD: int = 12
+    VIDEO_DEDUP_THRESHOLD: int = 4
+    VIDEO_MAX_FRAMES: int = 600
+    VIDEO_BATCH_SIZE: int = 16
+
+    # Identifies the deployed model; uploads only reuse results produced under the same version.
+    # Bump it when the model changes so new uploads are inferred again.
+    MODEL_VERSION: str = "custom_fire_model"
+    DEDUP_ENABLED: bool = True
+
+    # POST /internal/results:bulk (inference backends reporting results) and GET /metrics.
+    # Callers send it in the X-Internal-Token header; both are disabled while it is unset.
+    INTERNAL_API_TOKEN: Optional[str] = None
+    RESULTS_BULK_MAX_ITEMS: int = 1000
+
+    # Minimum fire confidence for a report to count as "fire detected"
+    FIRE_CONFIDENCE_THRESHOLD: float = 0.25
+
+    # Map queries on GET /reports/map
+    MAP_MAX_RESULTS: int = 1000
+    MAP_MAX_TILES: int = 1024
+    MAP_COVER_MAX_CELLS: int = 32
+
+    # GET /metrics: the per-status report counts are re-queried at most this often
+    METRICS_STATUS_REFRESH_SECONDS: float = 15.0
+
+    # Report status push (SSE)
+    EVENTS_QUEUE_SIZE: int = 100
+    EVENTS_KEEPALIVE_SECONDS: float = 15.0
 
     # CORS
     BACKEND_CORS_ORIGINS: list[str] = ["http://localhost:3000", "http://127.0.0.1:3000"]
@@ -0,0 +1,110 @@
+from typing import Dict, Iterable, List
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.images import MEDIA_FIELDS
+from app.models.sql import Report, ReportStatus
+
+# Columns a duplicate copies from the report whose inference it reuses
+RESULT_FIELDS = (
+    "status",
+    "fire_confidence",
+    "smoke_confidence",
+    "detection_count",
+    "processing_time_ms",
+    "completed_at",
+)
+
+
+async def find_canonical_reports(db: AsyncSession, user_id: int, hashes: Iterable[str]) -> Dict[str, dict]:
+    """
+    Latest report per content hash whose inference can be reused: same owner
+    (a duplicate exposes its canonical report's id and file), same
+    MODEL_VERSION, not itself a duplicate, and not failed (a failed run is
+    retried by the next upload instead). Served by ix_reports_content_hash_model.
+    """
+    hashes = set(hashes)
+    if not settings.DEDUP_ENABLED or not hashes:
+        return {}
+    result = await db.execute(
+        select(Report)
+        .where(
+            Report.content_hash.in_(hashes),
+            Report.user_id == user_id,
+            Report.model_version == settings.MODEL_VERSION,
+            Report.duplicate_of.is_(None),
+            Report.status != ReportStatus.ERROR.value,
+        )
+        .order_by(Report.created_at.desc())
+    )
+    canonical: Dict[str, dict] = {}
+    for report in result.scalars():
+        if report.content_hash not in canonical:
+            canonical[report.content_hash] = {
+                "id": report.id,
+                "file_path": report.file_path,
+                **{field: getattr(report, field) for field in RESULT_FIELDS + MEDIA_FIELDS},
+            }
+    return canonical
+
+
+def _attach(row: dict, canonical: dict) -> None:
+    row["duplicate_of"] = canonical["id"]
+    row["file_path"] = canonical["file_path"]
+    for field in RESULT_FIELDS + MEDIA_FIELDS:
+        row[field] = canonical.get(field)
+    in_flight = row["status"] == ReportStatus.PROCESSING.value
+    metrics.UPLOAD_DEDUP.inc(result="in_flight" if in_flight else "reused")
+
+
+async def deduplicate(db: AsyncSession, rows: List[dict]) -> List[dict]:
+    """
+    Attaches new upload rows (all from one user) to that user's reports with
+    the same content and model version (including earlier rows of the same
+    batch) and returns the rows that still need inference.
+
+    A duplicate shares the canonical report's stored file and either copies its
+    finished result or stays PROCESSING until the in-flight run completes (see
+    complete_duplicates). Every row ends up with the same keys, so the batch can
+    still go through one bulk insert.
+    """
+    if not rows:
+        return []
+    canonical = await find_canonical_reports(db, rows[0]["user_id"], [row["content_hash"] for row in rows])
+    fresh = []
+    for row in rows:
+        match = canonical.get(row["content_hash"])
+        if match:
+            _attach(row, match)
+            continue
+        row["duplicate_of"] = None
+        for field in RESULT_FIELDS:
+            row.setdefault(field, None)
+        fresh.append(row)
+        if settings.DEDUP_ENABLED:
+            metrics.UPLOAD_DEDUP.inc(result="miss")
+            canonical[row["content_hash"]] = row
+    return fresh
+
+
+async def complete_duplicates(db: AsyncSession, report_ids: List[str]) -> None:
+    """
+    Copies the outcome of just-finished reports onto the uploads that attached
+    to them while they were in flight. Runs in the caller's transaction.
+    """
+    if not report_ids:
+        return
+    canonical = aliased(Report)
+    await db.execute(
+        update(Report)
+        .where(
+            Report.duplicate_of == canonical.id,
+            canonical.id.in_(report_ids),
+            Report.status == ReportStatus.PROCESSING.value,
+        )
+        .values({getattr(Report, field): getattr(canonical, field) for field in RESULT_FIELDS})
+    )
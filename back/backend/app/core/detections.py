@@ -0,0 +1,25 @@
+from typing import List, Optional
+
+# Class names are matched by substring so "fire"/"Fire"/"wildfire" all count.
+FIRE_CLASS = "fire"
+SMOKE_CLASS = "smoke"
+
+
+def _class_name(detection: dict) -> str:
+    return str(detection.get("name") or detection.get("class_name") or "").lower()
+
+
+def summarize_detections(detections: List[dict], processing_time_ms: Optional[float] = None) -> dict:
+    """
+    Compact summary of one inference result, stored on the SQL Report row so
+    listing/filtering never needs the Mongo log. Confidences are 0.0 when the
+    class was not detected.
+    """
+    fire = [float(d.get("confidence") or 0.0) for d in detections if FIRE_CLASS in _class_name(d)]
+    smoke = [float(d.get("confidence") or 0.0) for d in detections if SMOKE_CLASS in _class_name(d)]
+    return {
+        "fire_confidence": max(fire, default=0.0),
+        "smoke_confidence": max(smoke, default=0.0),
+        "detection_count": len(detections),
+        "processing_time_ms": processing_time_ms,
+    }
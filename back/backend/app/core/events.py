@@ -0,0 +1,130 @@
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from typing import Dict, Optional, Set
+
+from app.core.config import settings
+
+# Postgres NOTIFY channel fed by the reports status trigger (see db.session.install_report_triggers)
+REPORT_EVENTS_CHANNEL = "report_events"
+
+logger = logging.getLogger(__name__)
+
+
+class ReportEventBroker:
+    """
+    In-process fan-out of report status events to per-user subscribers.
+
+    There is a single upstream feed per API process (the Postgres listener), so
+    the database cost does not grow with the number of connected clients.
+    Each subscriber gets a bounded queue; a slow client drops its oldest events
+    instead of growing memory.
+    """
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = defaultdict(set)
+
+    def subscribe(self, user_id: int) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers[user_id].add(queue)
+        return queue
+
+    def unsubscribe(self, user_id: int, queue: asyncio.Queue) -> None:
+        queues = self._subscribers.get(user_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[user_id]
+
+    def has_subscribers(self, user_id: int) -> bool:
+        return bool(self._subscribers.get(user_id))
+
+    def publish(self, event: dict) -> None:
+        for queue in self._subscribers.get(event["user_id"], ()):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+
+broker = ReportEventBroker(queue_size=settings.EVENTS_QUEUE_SIZE)
+
+
+SUMMARY_FIELDS = ("fire_confidence", "smoke_confidence", "detection_count")
+
+
+def build_event(payload: dict) -> dict:
+    """
+    Turns a NOTIFY payload into a client event. The detection summary columns
+    travel in the payload itself, so no lookup is needed per event.
+    """
+    event = {
+        "report_id": payload["id"],
+        "user_id": payload["user_id"],
+        "status": payload["status"],
+    }
+    if payload.get("detection_count") is not None:
+        event["summary"] = {field: payload.get(field) for field in SUMMARY_FIELDS}
+    return event
+
+
+class PostgresReportListener:
+    """
+    Holds one dedicated asyncpg connection LISTENing on REPORT_EVENTS_CHANNEL
+    and forwards notifications to the broker. Reconnects with a fixed delay if
+    the connection drops.
+    """
+
+    def __init__(self, dsn: str, reconnect_delay: float = 5.0):
+        self.dsn = dsn
+        self.reconnect_delay = reconnect_delay
+        self._task: Optional[asyncio.Task] = None
+
+    def _on_notify(self, connection, pid, channel, payload: str) -> None:
+        try:
+            data = json.loads(payload)
+        except ValueError:
+            return
+        if broker.has_subscribers(data.get("user_id")):
+            try:
+                broker.publish(build_event(data))
+            except Exception as e:
+                logger.warning("Could not publish report event: %s", e)
+
+    async def _run(self) -> None:
+        import asyncpg
+
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(self.dsn)
+                await connection.add_listener(REPORT_EVENTS_CHANNEL, self._on_notify)
+                logger.info("Listening for report events on '%s'", REPORT_EVENTS_CHANNEL)
+                # Sit idle until the connection dies; asyncpg dispatches notifications
+                while not connection.is_closed():
+                    await asyncio.sleep(self.reconnect_delay)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Report event listener error: %s", e)
+            finally:
+                if connection is not None and not connection.is_closed():
+                    await connection.close()
+            await asyncio.sleep(self.reconnect_delay)
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+def format_sse(event: dict) -> str:
+    return f"event: report_status\ndata: {json.dumps(event)}\n\n"
@@ -0,0 +1,153 @@
+import math
+from typing import List, Optional, Tuple
+
+# Geohash: interleaved lon/lat bits in base32. Every prefix is a grid cell, and
+# all points inside a cell share that prefix, so a B-tree index on the column
+# answers "points in this cell" as a plain range scan.
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_DECODE = {c: i for i, c in enumerate(_BASE32)}
+
+GEOHASH_PRECISION = 9  # ~5 m cells; stored on every report with coordinates
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+BBox = Tuple[float, float, float, float]  # (min_lat, min_lon, max_lat, max_lon)
+
+
+def encode(latitude: float, longitude: float, precision: int = GEOHASH_PRECISION) -> str:
+    lat_lo, lat_hi = -90.0, 90.0
+    lon_lo, lon_hi = -180.0, 180.0
+    chars = []
+    bits, value, even = 0, 0, True
+    while len(chars) < precision:
+        if even:
+            mid = (lon_lo + lon_hi) / 2
+            if longitude >= mid:
+                value = value * 2 + 1
+                lon_lo = mid
+            else:
+                value = value * 2
+                lon_hi = mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if latitude >= mid:
+                value = value * 2 + 1
+                lat_lo = mid
+            else:
+                value = value * 2
+                lat_hi = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits, value = 0, 0
+    return "".join(chars)
+
+
+def decode_bbox(geohash: str) -> BBox:
+    """Bounds of the cell a geohash names."""
+    lat_lo, lat_hi = -90.0, 90.0
+    lon_lo, lon_hi = -180.0, 180.0
+    even = True
+    for char in geohash:
+        value = _DECODE[char]
+        for shift in range(4, -1, -1):
+            bit = (value >> shift) & 1
+            if even:
+                mid = (lon_lo + lon_hi) / 2
+                lon_lo, lon_hi = (mid, lon_hi) if bit else (lon_lo, mid)
+            else:
+                mid = (lat_lo + lat_hi) / 2
+                lat_lo, lat_hi = (mid, lat_hi) if bit else (lat_lo, mid)
+            even = not even
+    return lat_lo, lon_lo, lat_hi, lon_hi
+
+
+def decode(geohash: str) -> Tuple[float, float]:
+    """Center (lat, lon) of a geohash cell."""
+    min_lat, min_lon, max_lat, max_lon = decode_bbox(geohash)
+    return (min_lat + max_lat) / 2, (min_lon + max_lon) / 2
+
+
+def cell_size(precision: int) -> Tuple[float, float]:
+    """(height, width) in degrees of a cell at the given precision."""
+    bits = 5 * precision
+    lon_bits = (bits + 1) // 2
+    lat_bits = bits // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def _cell_range(low: float, high: float, origin: float, step: float, count: int) -> range:
+    first = max(0, int((low - origin) // step))
+    last = min(count - 1, int((high - origin) // step))
+    return range(first, last + 1)
+
+
+def cells_in_bbox(bbox: BBox, precision: int) -> List[str]:
+    """Geohash cells at `precision` that intersect the box."""
+    min_lat, min_lon, max_lat, max_lon = bbox
+    height, width = cell_size(precision)
+    rows = _cell_range(min_lat, max_lat, -90.0, height, round(180.0 / height))
+    cols = _cell_range(min_lon, max_lon, -180.0, width, round(360.0 / width))
+    return sorted({
+        encode(-90.0 + (r + 0.5) * height, -180.0 + (c + 0.5) * width, precision)
+        for r in rows
+        for c in cols
+    })
+
+
+def covering_precision(bbox: BBox, max_cells: int) -> int:
+    """Finest precision whose cover of the box stays within max_cells cells."""
+    min_lat, min_lon, max_lat, max_lon = bbox
+    best = 1
+    for precision in range(1, GEOHASH_PRECISION + 1):
+        height, width = cell_size(precision)
+        count = (math.floor((max_lat + 90) / height) - math.floor((min_lat + 90) / height) + 1) * (
+            math.floor((max_lon + 180) / width) - math.floor((min_lon + 180) / width) + 1
+        )
+        if count > max_cells:
+            break
+        best = precision
+    return best
+
+
+def _prefix_upper_bound(prefix: str) -> Optional[str]:
+    """Smallest string greater than every geohash starting with prefix (None: unbounded)."""
+    chars = list(prefix)
+    while chars:
+        index = _DECODE[chars[-1]]
+        if index + 1 < len(_BASE32):
+            chars[-1] = _BASE32[index + 1]
+            return "".join(chars)
+        chars.pop()
+    return None
+
+
+def covering_ranges(bbox: BBox, max_cells: int = 32) -> List[Tuple[str, Optional[str]]]:
+    """
+    Half-open [low, high) geohash ranges covering the box, with adjacent cells
+    merged. Each range is one index seek; the cover is a superset of the box,
+    so callers still filter on exact coordinates.
+    """
+    ranges: List[Tuple[str, Optional[str]]] = []
+    for cell in cells_in_bbox(bbox, covering_precision(bbox, max_cells)):
+        high = _prefix_upper_bound(cell)
+        if ranges and ranges[-1][1] == cell:
+            ranges[-1] = (ranges[-1][0], high)
+        else:
+            ranges.append((cell, high))
+    return ranges
+
+
+def radius_bbox(latitude: float, longitude: float, radius_km: float) -> BBox:
+    """Box enclosing a circle, clamped to valid coordinates (no antimeridian wrap)."""
+    dlat = radius_km / KM_PER_DEGREE
+    cos_lat = math.cos(math.radians(latitude))
+    dlon = 180.0 if cos_lat < 1e-6 else min(180.0, dlat / cos_lat)
+    return (
+        max(-90.0, latitude - dlat),
+        max(-180.0, longitude - dlon),
+        min(90.0, latitude + dlat),
+        min(180.0, longitude + dlon),
+    )
+
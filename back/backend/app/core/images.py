@@ -0,0 +1,210 @@
+import os
+import shutil
+import struct
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from PIL import Image, ImageOps
+
+# Derivatives live next to the originals so Kestra/worker paths and the
+# /static/uploads mount resolve them the same way.
+INFERENCE_DIR = "infer"
+THUMBNAIL_DIR = "thumbs"
+
+# Report columns filled from a ProcessedImage (and shared by duplicate uploads)
+MEDIA_FIELDS = ("inference_path", "thumbnail_path", "image_width", "image_height", "inference_scale")
+
+_EXIF_ORIENTATION = 0x0112
+_EXIF_GPS_IFD = 0x8825
+
+# JPEG segments that can carry location or other private metadata: APP1 (EXIF,
+# XMP) and APP13 (Photoshop/IPTC)
+_JPEG_SOI = b"\xff\xd8"
+_JPEG_APP1 = 0xE1
+_JPEG_APP13 = 0xED
+_JPEG_SOS = 0xDA
+_JPEG_EOI = 0xD9
+
+
+class MetadataStripError(Exception):
+    """An upload carries metadata (e.g. GPS) that could not be removed; it must not be served."""
+
+
+@dataclass
+class ProcessedImage:
+    inference_path: Optional[str] = None    # relative to the uploads dir; None = infer on the original
+    thumbnail_path: Optional[str] = None
+    image_width: Optional[int] = None       # original size, after EXIF orientation
+    image_height: Optional[int] = None
+    inference_scale: Optional[float] = None  # inference copy pixels per original pixel
+    gps: Optional[Tuple[float, float]] = None
+
+    def columns(self) -> dict:
+        return {field: getattr(self, field) for field in MEDIA_FIELDS}
+
+
+def _to_degrees(dms, ref) -> float:
+    degrees, minutes, seconds = (float(v) for v in dms)
+    value = degrees + minutes / 60 + seconds / 3600
+    return -value if ref in ("S", "W") else value
+
+
+def gps_coordinates(exif) -> Optional[Tuple[float, float]]:
+    """(latitude, longitude) from the EXIF GPS IFD, or None when absent/invalid."""
+    try:
+        gps = exif.get_ifd(_EXIF_GPS_IFD)
+        latitude = _to_degrees(gps[2], gps.get(1, "N"))
+        longitude = _to_degrees(gps[4], gps.get(3, "E"))
+    except (KeyError, TypeError, ValueError, ZeroDivisionError):
+        return None
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return None
+    return latitude, longitude
+
+
+def read_gps(path: str) -> Optional[Tuple[float, float]]:
+    """EXIF GPS position of an image file; only its header is parsed, no pixels are decoded."""
+    with Image.open(path) as image:
+        return gps_coordinates(image.getexif())
+
+
+def _orientation_exif(orientation: Optional[int]) -> Optional[bytes]:
+    """EXIF payload holding only the orientation tag (None when upright)."""
+    if not orientation or orientation == 1:
+        return None
+    exif = Image.Exif()
+    exif[_EXIF_ORIENTATION] = orientation
+    return exif.tobytes()
+
+
+def _strip_jpeg_metadata(path: str, tmp_path: str, orientation: Optional[int]) -> None:
+    # Copies every segment except APP1/APP13 and the entropy-coded data as-is,
+    # so the picture itself is not re-encoded
+    with open(path, "rb") as src, open(tmp_path, "wb") as dst:
+        if src.read(2) != _JPEG_SOI:
+            raise ValueError("not a JPEG file")
+        dst.write(_JPEG_SOI)
+        payload = _orientation_exif(orientation)
+        if payload:
+            dst.write(struct.pack(">BBH", 0xFF, _JPEG_APP1, len(payload) + 2) + payload)
+        while True:
+            marker = src.read(2)
+            while marker[1:] == b"\xff":  # fill bytes
+                marker = marker[1:] + src.read(1)
+            if len(marker) < 2 or marker[0] != 0xFF:
+                raise ValueError("malformed JPEG segment")
+            if marker[1] in (_JPEG_SOS, _JPEG_EOI):
+                dst.write(marker)
+                shutil.copyfileobj(src, dst)
+                break
+            length_bytes = src.read(2)
+            if len(length_bytes) < 2:
+                raise ValueError("truncated JPEG segment")
+            body = src.read(struct.unpack(">H", length_bytes)[0] - 2)
+            if marker[1] in (_JPEG_APP1, _JPEG_APP13):
+                continue
+            dst.write(marker + length_bytes + body)
+
+
+def strip_metadata(path: str) -> None:
+    """
+    Removes EXIF (GPS included), XMP and IPTC metadata from a stored upload,
+    keeping only its orientation so it still displays upright. JPEGs are
+    rewritten segment by segment without re-encoding; other formats carrying
+    metadata are re-saved in their own format. Raises MetadataStripError when
+    the file carries metadata that could not be removed; the original is then
+    left unchanged and no temporary file remains.
+    """
+    tmp_path = f"{path}.tmp"
+    try:
+        with Image.open(path) as image:
+            image_format = image.format
+            exif = image.getexif()
+            orientation = exif.get(_EXIF_ORIENTATION)
+            private = bool(set(exif) - {_EXIF_ORIENTATION}) or any(
+                key in image.info for key in ("xmp", "XML:com.adobe.xmp", "photoshop")
+            )
+            if not private:
+                return
+            if image_format != "JPEG":
+                payload = _orientation_exif(orientation)
+                image.load()
+                image.save(tmp_path, format=image_format, **({"exif": payload} if payload else {}))
+        if image_format == "JPEG":
+            _strip_jpeg_metadata(path, tmp_path, orientation)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        raise MetadataStripError(f"Could not remove metadata from {os.path.basename(path)}: {e}") from e
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def derivative_paths(file_path: str) -> Tuple[str, str]:
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    return os.path.join(INFERENCE_DIR, f"{stem}.jpg"), os.path.join(THUMBNAIL_DIR, f"{stem}.jpg")
+
+
+def process_upload(
+    upload_dir: str,
+    file_path: str,
+    inference_size: int,
+    thumbnail_size: int,
+    quality: int = 85,
+    tile_min_pixels: int = 0,
+) -> ProcessedImage:
+    """
+    Decodes an upload once and writes its derivatives. Blocking; run it with
+    asyncio.to_thread.
+
+    - inference copy: longest side inference_size (the model's input size), so
+      inference does no resize of its own. Skipped when the original is
+      already that small, or when it has at least tile_min_pixels pixels (those
+      are inferred tile by tile at full resolution instead).
+    - thumbnail: longest side thumbnail_size, for list views.
+
+    Both are re-encoded JPEGs without EXIF, upright per the EXIF orientation.
+    JPEGs are decoded at reduced DCT scale (draft mode), so a 12 MP frame is
+    never fully materialized. The original is served too, so once its GPS
+    position is read its metadata is stripped as well (strip_metadata; raises
+    MetadataStripError when that fails).
+    """
+    inference_path, thumbnail_path = derivative_paths(file_path)
+    path = os.path.join(upload_dir, file_path)
+    with Image.open(path) as original:
+        exif = original.getexif()
+        width, height = original.size
+        if exif.get(_EXIF_ORIENTATION) in (5, 6, 7, 8):
+            width, height = height, width
+    processed = ProcessedImage(image_width=width, image_height=height, gps=gps_coordinates(exif))
+    # Before decoding the pixels, so a file that fails to decode is not kept with its metadata
+    strip_metadata(path)
+
+    with Image.open(path) as original:
+        original.draft("RGB", (inference_size, inference_size))
+        image = ImageOps.exif_transpose(original).convert("RGB")
+
+    tiled = bool(tile_min_pixels) and width * height >= tile_min_pixels
+    if max(width, height) > inference_size and not tiled:
+        image.thumbnail((inference_size, inference_size), Image.LANCZOS)
+        os.makedirs(os.path.join(upload_dir, INFERENCE_DIR), exist_ok=True)
+        image.save(os.path.join(upload_dir, inference_path), "JPEG", quality=quality)
+        processed.inference_path = inference_path
+        processed.inference_scale = image.width / width
+    else:
+        processed.inference_scale = 1.0
+
+    image.thumbnail((thumbnail_size, thumbnail_size), Image.LANCZOS)
+    os.makedirs(os.path.join(upload_dir, THUMBNAIL_DIR), exist_ok=True)
+    image.save(os.path.join(upload_dir, thumbnail_path), "JPEG", quality=quality)
+    processed.thumbnail_path = thumbnail_path
+    return processed
+
+
+def remove_upload(upload_dir: str, file_path: str) -> None:
+    """Deletes an original and whatever derivatives were written for it."""
+    for path in (file_path, *derivative_paths(file_path)):
+        try:
+            os.remove(os.path.join(upload_dir, path))
+        except FileNotFoundError:
+            pass
@@ -1,43 +1,153 @@
-import requests
+import asyncio
+import functools
+import logging
 import json
-from fastapi import HTTPException
+import time
+from typing import Dict, List, Optional
 
+import httpx
+
+from app.core import metrics
 from app.core.config import settings
 
 # Kestra API URL
 # Note: we construct the full trigger URL using settings
 KESTRA_API_URL = f"{settings.KESTRA_API_URL}/executions/trigger/dev/fire-inference-flow"
+KESTRA_BATCH_API_URL = f"{settings.KESTRA_API_URL}/executions/trigger/dev/fire-inference-batch-flow"
+KESTRA_EXECUTIONS_URL = f"{settings.KESTRA_API_URL}/executions"
 
 # Credentials from Settings
 KESTRA_AUTH = (settings.KESTRA_USER, settings.KESTRA_PASSWORD)
 
-def trigger_fire_detection_flow(file_path: str, report_id: str) -> str:
+logger = logging.getLogger(__name__)
+
+# Shared pooled client (keep-alive connections are reused across triggers).
+# Created lazily on first use and closed from the app lifespan.
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            auth=KESTRA_AUTH,
+            timeout=httpx.Timeout(settings.KESTRA_TIMEOUT_SECONDS),
+            limits=httpx.Limits(
+                max_connections=settings.KESTRA_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.KESTRA_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=30.0,
+            ),
+        )
+    return _client
+
+
+async def close_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def instrumented(flow: str):
+    """Records trigger latency and sent/failed counts (a None execution id is a failure)."""
+    def decorator(trigger):
+        @functools.wraps(trigger)
+        async def wrapper(*args, **kwargs) -> Optional[str]:
+            started = time.perf_counter()
+            execution_id = await trigger(*args, **kwargs)
+            metrics.KESTRA_TRIGGER_DURATION.observe(time.perf_counter() - started, flow=flow)
+            metrics.KESTRA_TRIGGERS.inc(flow=flow, result="sent" if execution_id else "failed")
+            return execution_id
+        return wrapper
+    return decorator
+
+
+@instrumented("single")
+async def trigger_fire_detection_flow(file_path: str, report_id: str) -> Optional[str]:
     """
     Triggers the Kestra Flow for Fire Detection.
     Passes 'file_path' (relative to /shared-data) and 'report_id' as inputs.
-    Returns the Execution ID.
+    Returns the Execution ID, or None if the trigger failed (the outbox retries it).
     """
     try:
         # Kestra accepts inputs as multipart/form-data
         files = {
             'file_path': (None, file_path),
-            'report_id': (None, report_id)
+            'report_id': (None, report_id),
+            'tile_min_pixels': (None, str(settings.TILED_INFERENCE_MIN_PIXELS)),
+            'tile_max_pixels': (None, str(settings.TILED_INFERENCE_MAX_PIXELS)),
         }
-        
-        response = requests.post(
-            KESTRA_API_URL, 
-            files=files,
-            auth=KESTRA_AUTH,
-            timeout=5
-        )
-        
+
+        response = await get_client().post(KESTRA_API_URL, files=files)
         response.raise_for_status()
-        
+
         data = response.json()
         return data.get("id")
-        
-    except requests.exceptions.RequestException as e:
-        print(f"Failed to trigger Kestra: {e}")
-        # We assume fire-and-forget for now, but in production we might queue this
-        # For now, just log and allow the user to receive 202
+
+    except (httpx.HTTPError, ValueError) as e:
+        logger.warning("Failed to trigger Kestra: %s", e, extra={"report_id": report_id})
         return None
+
+
+@instrumented("batch")
+async def trigger_fire_detection_batch_flow(items: List[Dict[str, str]]) -> Optional[str]:
+    """
+    Triggers one grouped Fire Detection execution for several images.
+    'items' is a list of {"report_id", "file_path"} dicts; the batch flow loads the
+    model once and processes them together.
+    Returns the Execution ID, or None if the trigger failed.
+    """
+    try:
+        files = {
+            'items': (None, json.dumps(items)),
+            'tile_min_pixels': (None, str(settings.TILED_INFERENCE_MIN_PIXELS)),
+            'tile_max_pixels': (None, str(settings.TILED_INFERENCE_MAX_PIXELS)),
+        }
+
+        response = await get_client().post(KESTRA_BATCH_API_URL, files=files)
+        response.raise_for_status()
+
+        data = response.json()
+        return data.get("id")
+
+    except (httpx.HTTPError, ValueError) as e:
+        logger.warning("Failed to trigger Kestra batch (%d items): %s", len(items), e)
+        return None
+
+
+# Returned by get_execution_states for executions Kestra does not know (purged, or never created)
+EXECUTION_NOT_FOUND = "NOT_FOUND"
+
+
+async def _execution_state(execution_id: str) -> Optional[str]:
+    response = await get_client().get(f"{KESTRA_EXECUTIONS_URL}/{execution_id}")
+    if response.status_code == 404:
+        return EXECUTION_NOT_FOUND
+    response.raise_for_status()
+    return response.json().get("state", {}).get("current")
+
+
+async def get_execution_states(execution_ids: List[str]) -> Dict[str, str]:
+    """
+    Current state (RUNNING, SUCCESS, FAILED, KILLED, ...) of each execution,
+    or EXECUTION_NOT_FOUND. The executions API has no lookup by a list of ids
+    (search filters by flow, state and time window, paginated), so each
+    distinct id is fetched with GET /executions/{id}, concurrently over the
+    pooled client (bounded by KESTRA_MAX_CONNECTIONS). Executions whose state
+    could not be fetched are left out, so callers treat them as unknown
+    rather than lost.
+    """
+    ids = list(dict.fromkeys(execution_ids))
+    results = await asyncio.gather(*(_execution_state(i) for i in ids), return_exceptions=True)
+    states = {}
+    for execution_id, state in zip(ids, results):
+        if isinstance(state, (httpx.HTTPError, ValueError)) or state is None:
+            metrics.KESTRA_STATE_LOOKUPS.inc(result="error")
+            if state is not None:
+                logger.warning("Failed to fetch Kestra execution %s: %s", execution_id, state)
+            continue
+        if isinstance(state, BaseException):
+            raise state
+        metrics.KESTRA_STATE_LOOKUPS.inc(result="not_found" if state == EXECUTION_NOT_FOUND else "found")
+        states[execution_id] = state
+    return states
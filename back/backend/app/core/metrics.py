@@ -0,0 +1,304 @@
+import threading
+from typing import Dict, Iterable, Tuple
+
+# Lightweight in-process metrics (counters, gauges, histograms).
+# Every metric registers itself in REGISTRY so it can be exported later.
+
+LabelValues = Tuple[str, ...]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Metric:
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, value) for key, value in self._values.items()]
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, value) for key, value in self._values.items()]
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [bucket counts..., +Inf count, sum]
+        self._values: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = [0] * (len(self.buckets) + 1) + [0.0]
+                self._values[key] = state
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[len(self.buckets)] += 1
+            state[-1] += value
+
+    def get_count(self, **labels) -> int:
+        state = self._values.get(self._key(labels))
+        return state[len(self.buckets)] if state else 0
+
+    def get_sum(self, **labels) -> float:
+        state = self._values.get(self._key(labels))
+        return state[-1] if state else 0.0
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            for key, state in self._values.items():
+                for i, bound in enumerate(self.buckets):
+                    samples.append((f"{self.name}_bucket", key + (repr(float(bound)),), state[i]))
+                samples.append((f"{self.name}_bucket", key + ("+Inf",), state[len(self.buckets)]))
+                samples.append((f"{self.name}_count", key, state[len(self.buckets)]))
+                samples.append((f"{self.name}_sum", key, state[-1]))
+        return samples
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> None:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+
+    def metrics(self):
+        return list(self._metrics.values())
+
+
+REGISTRY = Registry()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def render(registry: Registry = REGISTRY) -> str:
+    """Every registered metric in the Prometheus text exposition format (version 0.0.4)."""
+    lines = []
+    for metric in registry.metrics():
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.type_name}")
+        for name, key, value in metric.samples():
+            labelnames = metric.labelnames + (("le",) if len(key) > len(metric.labelnames) else ())
+            labels = ",".join(f'{label}="{_escape(v)}"' for label, v in zip(labelnames, key))
+            lines.append(f"{name}{{{labels}}} {_format_value(value)}" if labels else f"{name} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+# --- HTTP (core.middleware.MetricsMiddleware) ---
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Request latency by route template, method and status code",
+    ["method", "route", "status"],
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge("http_requests_in_progress", "Requests being served", ["method"])
+
+# --- Databases ---
+DB_QUERY_DURATION = Histogram(
+    "db_query_duration_seconds", "SQL statement execution time by statement type", ["operation"]
+)
+DB_SESSION_DURATION = Histogram(
+    "db_session_duration_seconds", "Lifetime of a request's database session (get_db)"
+)
+MONGO_COMMAND_DURATION = Histogram(
+    "mongo_command_duration_seconds", "Mongo command time by command and outcome", ["command", "result"]
+)
+
+# --- Reports ---
+REPORTS_BY_STATUS = Gauge(
+    "reports", "Reports by status, refreshed at most every METRICS_STATUS_REFRESH_SECONDS", ["status"]
+)
+REPORT_COMPLETION = Histogram(
+    "report_completion_seconds",
+    "Time from upload to a final status (DONE/ERROR)",
+    ["status"],
+    buckets=(0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0, 3600.0),
+)
+
+# --- Upload pipeline ---
+UPLOAD_BYTES = Counter("upload_bytes_total", "Bytes received through the upload endpoints")
+UPLOAD_DURATION = Histogram(
+    "upload_write_seconds", "Time spent streaming an upload to disk"
+)
+UPLOAD_THROUGHPUT = Histogram(
+    "upload_throughput_bytes_per_second",
+    "Per-upload streaming throughput",
+    buckets=(1e5, 5e5, 1e6, 5e6, 1e7, 5e7, 1e8, 5e8),
+)
+UPLOAD_REJECTED = Counter(
+    "upload_rejected_total", "Uploads rejected while streaming", ["reason"]
+)
+
+UPLOAD_DEDUP = Counter(
+    "upload_dedup_total",
+    "Upload content-hash lookups by result (reused, attached to in-flight, miss)",
+    ["result"],
+)
+
+# --- Flow trigger outbox ---
+OUTBOX_DISPATCHED = Counter(
+    "outbox_dispatch_total", "Outbox trigger attempts by result", ["result"]
+)
+INFERENCE_QUEUE_WAIT = Histogram(
+    "inference_queue_wait_seconds",
+    "Time from enqueue to dispatch to the inference backend, by priority class",
+    ["priority"],
+    buckets=(0.1, 0.5, 1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 900.0, 1800.0, 3600.0),
+)
+KESTRA_TRIGGER_DURATION = Histogram(
+    "kestra_trigger_duration_seconds", "Kestra execution trigger latency", ["flow"]
+)
+KESTRA_TRIGGERS = Counter(
+    "kestra_triggers_total", "Kestra execution triggers by flow and result (sent, failed)", ["flow", "result"]
+)
+KESTRA_STATE_LOOKUPS = Counter(
+    "kestra_execution_lookups_total", "Kestra execution state lookups by result (found, not_found, error)", ["result"]
+)
+
+# --- Stuck-report reaper (core.reaper) ---
+REAPER_ACTIONS = Counter(
+    "reaper_actions_total",
+    "Stuck PROCESSING reports handled by the reaper, by action (redispatched, failed)",
+    ["action"],
+)
+
+# --- SQL connection pool (db.session.InstrumentedQueuePool) ---
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time to get a connection from the pool (includes opening a new one)",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0, 30.0),
+)
+DB_POOL_TIMEOUTS = Counter(
+    "db_pool_timeouts_total", "Checkouts that gave up after DB_POOL_TIMEOUT_SECONDS"
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "db_pool_connections", "Pooled connections by state (in_use, idle)", ["state"]
+)
+
+# --- Mongo connection pool (db.session.MongoPoolMetrics) ---
+MONGO_POOL_CONNECTIONS = Gauge(
+    "mongo_pool_connections", "Motor pool connections by state (open, in_use)", ["state"]
+)
+MONGO_POOL_CHECKOUT_WAIT = Histogram(
+    "mongo_pool_checkout_wait_seconds",
+    "Time to check a connection out of the Motor pool",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0),
+)
+MONGO_POOL_CHECKOUT_FAILED = Counter(
+    "mongo_pool_checkout_failed_total", "Failed Motor pool checkouts by reason", ["reason"]
+)
+
+# --- Password hashing pool (core.security) ---
+PASSWORD_HASH_QUEUE_DEPTH = Gauge(
+    "password_hash_queue_depth", "bcrypt jobs waiting for a hashing thread"
+)
+PASSWORD_HASH_WAIT = Histogram(
+    "password_hash_wait_seconds", "Time a bcrypt job waited for a hashing thread"
+)
+PASSWORD_HASH_DURATION = Histogram(
+    "password_hash_duration_seconds", "bcrypt hash/verify time by operation", ["operation"]
+)
+PASSWORD_HASH_REJECTED = Counter(
+    "password_hash_rejected_total", "bcrypt jobs refused because PASSWORD_HASH_MAX_QUEUE jobs were waiting", ["operation"]
+)
+PASSWORD_REHASHES = Counter(
+    "password_rehashes_total", "Stored hashes upgraded on login after a cost parameter change"
+)
+
+# --- Refresh tokens (core.tokens) ---
+TOKEN_REFRESHES = Counter(
+    "token_refreshes_total", "POST /auth/refresh outcomes (rotated, invalid, revoked, reused)", ["result"]
+)
+
+# --- Rate limiting and admission control (core.ratelimit, core.admission) ---
+RATE_LIMITED = Counter(
+    "rate_limited_total", "Requests refused with 429 by the per-user rate limiter", ["route"]
+)
+ADMISSION_REJECTED = Counter(
+    "admission_rejected_total", "Uploads refused with 503 because of inference backlog", ["reason"]
+)
+INFERENCE_BACKLOG = Gauge(
+    "inference_backlog", "Backlog seen by admission control (processing reports, pending outbox triggers)", ["queue"]
+)
+
+# --- In-process caches ---
+CACHE_HITS = Counter("cache_hits_total", "Cache hits", ["cache"])
+CACHE_MISSES = Counter("cache_misses_total", "Cache misses", ["cache"])
+CACHE_EVICTIONS = Counter("cache_evictions_total", "Entries evicted to respect the size bound", ["cache"])
@@ -0,0 +1,268 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import dedup, kestra_client, metrics, scheduling, worker_client
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.sql import FlowTrigger, FlowTriggerStatus, InferencePriority, MediaType, Report, ReportStatus
+
+# Set whenever new triggers are enqueued so the worker dispatches them right away
+# instead of waiting for the next poll.
+_wakeup = asyncio.Event()
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_flow_trigger(
+    db: AsyncSession,
+    report_id: str,
+    file_path: str,
+    batch_id: Optional[str] = None,
+    media_type: str = MediaType.IMAGE.value,
+    options: Optional[dict] = None,
+    user_id: Optional[int] = None,
+    priority: str = InferencePriority.NORMAL.value,
+) -> FlowTrigger:
+    """
+    Adds a pending trigger to the session. It is persisted by the caller's commit,
+    atomically with the Report it belongs to.
+    """
+    now = datetime.utcnow()
+    trigger = FlowTrigger(
+        report_id=report_id,
+        file_path=file_path,
+        batch_id=batch_id,
+        media_type=media_type,
+        options=options,
+        user_id=user_id,
+        priority=priority,
+        scheduled_at=scheduling.scheduled_at(priority, now),
+        status=FlowTriggerStatus.PENDING.value,
+        attempts=0,
+        next_attempt_at=now,
+        created_at=now,
+    )
+    db.add(trigger)
+    return trigger
+
+
+def flow_trigger_rows(
+    reports: List[dict], batch_id: str, priorities: Optional[Dict[str, str]] = None
+) -> List[dict]:
+    """
+    Outbox rows for a bulk INSERT, one per report dict (id, user_id, file_path and
+    optionally inference_path, the model-sized copy inference should read).
+    `priorities` maps report ids to their class (default normal).
+    """
+    now = datetime.utcnow()
+    rows = []
+    for report in reports:
+        priority = (priorities or {}).get(report["id"], InferencePriority.NORMAL.value)
+        rows.append({
+            "report_id": report["id"],
+            "file_path": report.get("inference_path") or report["file_path"],
+            "batch_id": batch_id,
+            "user_id": report.get("user_id"),
+            "priority": priority,
+            "scheduled_at": scheduling.scheduled_at(priority, now),
+            "status": FlowTriggerStatus.PENDING.value,
+            "attempts": 0,
+            "next_attempt_at": now,
+            "created_at": now,
+        })
+    return rows
+
+
+def notify_pending() -> None:
+    """Wakes the outbox worker after a commit that enqueued triggers."""
+    _wakeup.set()
+
+
+def backoff_delay(attempts: int) -> float:
+    """Exponential backoff (in seconds) after the given number of failed attempts."""
+    delay = settings.OUTBOX_BACKOFF_BASE_SECONDS * (2 ** max(attempts - 1, 0))
+    return min(delay, settings.OUTBOX_BACKOFF_MAX_SECONDS)
+
+
+def group_triggers(triggers: List[FlowTrigger], group_all: bool = False) -> List[List[FlowTrigger]]:
+    """
+    Splits due triggers into dispatch groups: triggers from the same upload batch
+    (or every trigger, with group_all) are chunked into groups of
+    INFERENCE_GROUP_SIZE, everything else goes alone.
+    """
+    groups: List[List[FlowTrigger]] = []
+    batches = {}
+    for trigger in triggers:
+        key = "*" if group_all else trigger.batch_id
+        if key is None:
+            groups.append([trigger])
+            continue
+        group = batches.get(key)
+        if group is None or len(group) >= settings.INFERENCE_GROUP_SIZE:
+            group = []
+            batches[key] = group
+            groups.append(group)
+        group.append(trigger)
+    return groups
+
+
+def _job_item(trigger: FlowTrigger) -> Dict[str, object]:
+    item = {
+        "report_id": trigger.report_id,
+        "file_path": trigger.file_path,
+        "priority": InferencePriority(trigger.priority).rank,
+    }
+    if trigger.media_type == MediaType.VIDEO.value:
+        item.update(media_type=trigger.media_type, options=trigger.options or {})
+    return item
+
+
+async def _dispatch_group(group: List[FlowTrigger]) -> Optional[str]:
+    # The Kestra flows only handle still images; videos always go to the resident worker
+    if settings.INFERENCE_BACKEND == "worker" or group[0].media_type == MediaType.VIDEO.value:
+        return await worker_client.submit_inference_jobs([_job_item(t) for t in group])
+    if len(group) == 1:
+        trigger = group[0]
+        return await kestra_client.trigger_fire_detection_flow(trigger.file_path, trigger.report_id)
+    return await kestra_client.trigger_fire_detection_batch_flow(
+        [{"report_id": t.report_id, "file_path": t.file_path} for t in group]
+    )
+
+
+def _record_attempt(trigger: FlowTrigger, execution_id: Optional[str], now: datetime) -> bool:
+    """Updates a trigger after a dispatch attempt. Returns False once it has given up."""
+    trigger.attempts += 1
+    if execution_id:
+        trigger.status = FlowTriggerStatus.SENT.value
+        trigger.execution_id = execution_id
+        trigger.sent_at = now
+        trigger.last_error = None
+        metrics.OUTBOX_DISPATCHED.inc(result="sent")
+        metrics.INFERENCE_QUEUE_WAIT.observe((now - trigger.created_at).total_seconds(), priority=trigger.priority)
+    elif trigger.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+        trigger.status = FlowTriggerStatus.FAILED.value
+        trigger.last_error = "Inference dispatch failed, giving up"
+        metrics.OUTBOX_DISPATCHED.inc(result="failed")
+        return False
+    else:
+        trigger.last_error = "Inference dispatch failed"
+        trigger.next_attempt_at = now + timedelta(seconds=backoff_delay(trigger.attempts))
+        metrics.OUTBOX_DISPATCHED.inc(result="retry")
+    return True
+
+
+async def dispatch_due_triggers(db: AsyncSession, now: Optional[datetime] = None) -> int:
+    """
+    Sends up to OUTBOX_BATCH_SIZE due PENDING triggers to the inference backend
+    concurrently, one grouped execution per dispatch group (see group_triggers).
+    Triggers are picked by priority with fair share between users, and less
+    urgent ones wait while more urgent ones are pending (see core.scheduling). With INFERENCE_BACKEND=worker groups are queued on the
+    resident inference worker instead of starting Kestra executions; video
+    triggers are queued there with either backend.
+
+    Successful triggers are marked SENT with their execution id, which is also
+    stored on the Report (see core.reaper). Failures are rescheduled with
+    exponential backoff; once OUTBOX_MAX_ATTEMPTS is reached the trigger is
+    marked FAILED and its Report moves to ERROR so it never stays PROCESSING
+    forever. Returns the number of triggers processed.
+    """
+    now = now or datetime.utcnow()
+    # Candidates: the most urgent due triggers, at most a round's worth per user
+    # (so one user's backlog cannot crowd everyone else out of the window)
+    ranked = (
+        select(
+            FlowTrigger.id,
+            FlowTrigger.scheduled_at,
+            func.row_number().over(
+                partition_by=FlowTrigger.user_id,
+                order_by=(FlowTrigger.scheduled_at, FlowTrigger.id),
+            ).label("user_rank"),
+        )
+        .where(
+            FlowTrigger.status == FlowTriggerStatus.PENDING.value,
+            FlowTrigger.next_attempt_at <= now,
+        )
+        .subquery()
+    )
+    candidate_ids = (
+        select(ranked.c.id)
+        .where(ranked.c.user_rank <= settings.OUTBOX_BATCH_SIZE)
+        .order_by(ranked.c.scheduled_at)
+        .limit(settings.SCHEDULER_CANDIDATES)
+    )
+    result = await db.execute(
+        select(FlowTrigger)
+        .where(FlowTrigger.id.in_(candidate_ids), FlowTrigger.status == FlowTriggerStatus.PENDING.value)
+        .with_for_update(skip_locked=True)
+    )
+    due = scheduling.schedule(scheduling.eligible(result.scalars().all(), now), settings.OUTBOX_BATCH_SIZE)
+    if not due:
+        return 0
+
+    # The worker micro-batches across requests, so any due triggers can share a request
+    groups = group_triggers(due, group_all=settings.INFERENCE_BACKEND == "worker")
+    execution_ids = await asyncio.gather(*(_dispatch_group(group) for group in groups))
+
+    failed_reports = []
+    for group, execution_id in zip(groups, execution_ids):
+        for trigger in group:
+            if not _record_attempt(trigger, execution_id, now):
+                failed_reports.append(trigger.report_id)
+
+    sent = [
+        {"sent_report_id": trigger.report_id, "sent_execution_id": trigger.execution_id}
+        for trigger in due if trigger.status == FlowTriggerStatus.SENT.value
+    ]
+    if sent:
+        reports = Report.__table__
+        await db.execute(
+            update(reports)
+            .where(reports.c.id == bindparam("sent_report_id"))
+            .values(execution_id=bindparam("sent_execution_id")),
+            sent,
+        )
+
+    if failed_reports:
+        await db.execute(
+            update(Report)
+            .where(Report.id.in_(failed_reports))
+            .values(status=ReportStatus.ERROR.value)
+        )
+        await dedup.complete_duplicates(db, failed_reports)
+
+    await db.commit()
+    return len(due)
+
+
+async def run_outbox_worker(stop: asyncio.Event) -> None:
+    """
+    Background loop started from the app lifespan.
+    Drains due triggers, then sleeps until woken by a new upload, the poll
+    interval elapses, or shutdown is requested.
+    """
+    while not stop.is_set():
+        _wakeup.clear()
+        processed = 0
+        try:
+            async with AsyncSessionLocal() as db:
+                processed = await dispatch_due_triggers(db)
+        except Exception as e:
+            logger.exception("Outbox dispatch failed: %s", e)
+
+        if processed >= settings.OUTBOX_BATCH_SIZE:
+            continue  # More work is likely waiting
+
+        wakeup = asyncio.create_task(_wakeup.wait())
+        stopping = asyncio.create_task(stop.wait())
+        await asyncio.wait(
+            {wakeup, stopping},
+            timeout=settings.OUTBOX_POLL_INTERVAL_SECONDS,
+            return_when=asyncio.FIRST_COMPLETED,
+        )
+        wakeup.cancel()
+        stopping.cancel()
@@ -0,0 +1,33 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Tuple
+
+# Sort keys a cursor can be issued for, with how their value round-trips through JSON
+_SORT_KEYS = {
+    "created_at": (lambda v: v.isoformat(), datetime.fromisoformat),
+    "fire_confidence": (float, float),
+}
+
+
+def encode_cursor(value: Any, report_id: str, sort: str = "created_at") -> str:
+    """Opaque keyset cursor for the (sort value, id) position of the last row served."""
+    dump, _ = _SORT_KEYS[sort]
+    raw = json.dumps({"s": sort, "v": dump(value), "i": report_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str = "created_at") -> Tuple[Any, str]:
+    """
+    Inverse of encode_cursor. Raises ValueError for anything malformed, or for a
+    cursor issued under a different sort order.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if data.get("s", "created_at") != sort:
+            raise ValueError("Cursor was issued for a different sort order")
+        _, load = _SORT_KEYS[sort]
+        return load(data["v"]), str(data["i"])
+    except (ValueError, TypeError, KeyError, AttributeError) as e:
+        raise ValueError("Invalid cursor") from e
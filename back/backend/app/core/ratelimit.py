@@ -0,0 +1,137 @@
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from app.core import metrics
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Per-user token buckets, one per route listed in settings.RATE_LIMITS
+# (requests per minute, burst). A bucket holds up to `burst` tokens and
+# refills continuously at the route's rate; each request takes one token.
+#
+# The memory backend is per process: N API processes allow N times the
+# configured rate. RATE_LIMIT_BACKEND=redis shares the buckets between them.
+
+
+class RateLimitBackend(ABC):
+    @abstractmethod
+    async def acquire(self, key: str, rate: float, burst: int, cost: float = 1.0) -> float:
+        """
+        Takes `cost` tokens from the bucket `key` (refilled at `rate` tokens/s,
+        capped at `burst`). Returns 0 when allowed, else seconds until it would be.
+        """
+
+    async def close(self) -> None:
+        pass
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """In-process buckets, LRU-bounded: an evicted (idle) bucket comes back full."""
+
+    def __init__(self, maxsize: int = 100000, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self._clock = clock
+        self._buckets: "OrderedDict[str, tuple[float, float]]" = OrderedDict()
+
+    async def acquire(self, key: str, rate: float, burst: int, cost: float = 1.0) -> float:
+        now = self._clock()
+        tokens, updated = self._buckets.get(key, (float(burst), now))
+        tokens = min(float(burst), tokens + (now - updated) * rate)
+        wait = 0.0
+        if tokens >= cost:
+            tokens -= cost
+        else:
+            wait = (cost - tokens) / rate
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.maxsize:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+# Same algorithm as MemoryRateLimitBackend, atomically on the Redis server
+# (its clock, so API hosts need not agree on time). Returns the wait as a
+# string: Lua numbers are truncated to integers in replies.
+_REDIS_TOKEN_BUCKET = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + (now - ts) * rate)
+local wait = 0
+if tokens >= cost then
+    tokens = tokens - cost
+else
+    wait = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(wait)
+"""
+
+
+class RedisRateLimitBackend(RateLimitBackend):
+    """
+    Buckets shared by every API process (requires the `redis` package). Fails
+    open: if Redis is unreachable, requests are allowed and a warning is logged.
+    """
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(url)
+        self._script = self._redis.register_script(_REDIS_TOKEN_BUCKET)
+
+    async def acquire(self, key: str, rate: float, burst: int, cost: float = 1.0) -> float:
+        try:
+            wait = await self._script(keys=[f"ratelimit:{key}"], args=[rate, burst, cost])
+        except Exception as e:
+            logger.warning("Rate limit backend unavailable, allowing request: %s", e)
+            return 0.0
+        return float(wait)
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+_backend: Optional[RateLimitBackend] = None
+
+
+def get_backend() -> RateLimitBackend:
+    global _backend
+    if _backend is None:
+        if settings.RATE_LIMIT_BACKEND == "redis":
+            _backend = RedisRateLimitBackend(settings.RATE_LIMIT_REDIS_URL)
+        else:
+            _backend = MemoryRateLimitBackend(maxsize=settings.RATE_LIMIT_MAX_BUCKETS)
+    return _backend
+
+
+async def close_backend() -> None:
+    global _backend
+    if _backend is not None:
+        await _backend.close()
+        _backend = None
+
+
+async def acquire(route: str, user_id: int) -> float:
+    """
+    Takes one request from the user's bucket for `route`. Returns 0 when
+    allowed (or the route is not limited), else seconds until retrying can succeed.
+    """
+    limit = settings.RATE_LIMITS.get(route)
+    if not settings.RATE_LIMIT_ENABLED or limit is None:
+        return 0.0
+    per_minute, burst = limit
+    wait = await get_backend().acquire(f"{route}:{user_id}", per_minute / 60.0, burst)
+    if wait > 0:
+        metrics.RATE_LIMITED.inc(route=route)
+    return wait
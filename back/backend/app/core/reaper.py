@@ -0,0 +1,192 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import exists, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import dedup, kestra_client, metrics, outbox, worker_client
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.sql import FlowTrigger, FlowTriggerStatus, MediaType, Report, ReportStatus
+
+logger = logging.getLogger(__name__)
+
+# Reconciliation of reports stuck in PROCESSING.
+#
+# The outbox covers dispatch failures (Kestra or the worker unreachable), but
+# an execution can also die after it was accepted: a flow failing before its
+# update step, a killed container, an inference worker restart dropping its
+# in-memory queue. Its report would stay PROCESSING forever, with clients
+# polling it. Each reaper round:
+# - scans PROCESSING reports created before the cutoff (ix_reports_status_created)
+#   whose triggers were all sent before it too (a bulk trigger can wait in the
+#   outbox for longer than the cutoff, so the send time is what counts);
+# - looks up the state of their Kestra executions (Report.execution_id), one
+#   lookup per distinct execution since a grouped execution covers many reports
+#   (see kestra_client.get_execution_states);
+# - leaves reports alone while their execution is active or its state unknown
+#   (Kestra unreachable), and re-dispatches the rest through the outbox:
+#   executions that finished without delivering results, failed, were killed
+#   or are unknown to Kestra, and reports never dispatched;
+# - for resident worker jobs, which have no per-job state, asks the worker for
+#   its health once (get_worker_health): jobs sent before it (re)started were
+#   lost with its in-memory queue, and jobs sent since are lost once it has
+#   nothing queued or running. While it still has work, or cannot be reached,
+#   they are left alone (the queue holds up to WORKER_MAX_QUEUE_SIZE jobs);
+# - marks ERROR the reports that already used REAPER_MAX_DISPATCHES triggers,
+#   and any report PROCESSING for longer than REAPER_GIVE_UP_SECONDS.
+
+# Kestra states of executions that may still deliver results
+ACTIVE_STATES = frozenset({"CREATED", "QUEUED", "RUNNING", "PAUSED", "RESTARTED", "RETRYING", "KILLING"})
+WORKER_EXECUTION_PREFIX = "worker:"
+
+
+def _redispatch(db: AsyncSession, report: Report, trigger: Optional[FlowTrigger], batch_id: str) -> None:
+    if trigger is None:
+        outbox.enqueue_flow_trigger(
+            db,
+            report_id=report.id,
+            file_path=report.inference_path or report.file_path,
+            media_type=report.media_type,
+            user_id=report.user_id,
+        )
+    else:
+        outbox.enqueue_flow_trigger(
+            db,
+            report_id=report.id,
+            file_path=trigger.file_path,
+            # Images re-dispatched in the same round share grouped executions
+            batch_id=batch_id if trigger.media_type == MediaType.IMAGE.value else None,
+            media_type=trigger.media_type,
+            options=trigger.options,
+            user_id=trigger.user_id,
+            priority=trigger.priority,
+        )
+    report.execution_id = None
+
+
+async def reconcile_stuck_reports(db: AsyncSession, now: Optional[datetime] = None) -> Dict[str, int]:
+    """
+    Runs one reaper round over up to REAPER_BATCH_SIZE stuck reports (oldest
+    first). Re-dispatched reports get a new PENDING trigger and ERROR ones pass
+    their outcome on to attached duplicates. Commits. Returns the number of
+    reports per action ("redispatched", "failed").
+    """
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(seconds=settings.REAPER_STUCK_AFTER_SECONDS)
+    give_up = now - timedelta(seconds=settings.REAPER_GIVE_UP_SECONDS)
+
+    # Reports with a trigger still waiting in the outbox, or one sent since the
+    # cutoff (e.g. re-dispatched by a previous round), are not stuck yet
+    recent_trigger = select(FlowTrigger.id).where(
+        FlowTrigger.report_id == Report.id,
+        or_(
+            FlowTrigger.status == FlowTriggerStatus.PENDING.value,
+            # Triggers sent before sent_at was recorded
+            func.coalesce(FlowTrigger.sent_at, FlowTrigger.created_at) >= cutoff,
+        ),
+    )
+    result = await db.execute(
+        select(Report)
+        .where(
+            Report.status == ReportStatus.PROCESSING.value,
+            Report.created_at < cutoff,
+            # Duplicates complete with their canonical report
+            Report.duplicate_of.is_(None),
+            ~exists(recent_trigger),
+        )
+        .order_by(Report.created_at)
+        .limit(settings.REAPER_BATCH_SIZE)
+        .with_for_update(skip_locked=True)
+    )
+    reports = result.scalars().all()
+    if not reports:
+        return {}
+
+    triggers = (await db.execute(
+        select(FlowTrigger)
+        .where(FlowTrigger.report_id.in_([report.id for report in reports]))
+        .order_by(FlowTrigger.id)
+    )).scalars().all()
+    latest: Dict[str, FlowTrigger] = {}
+    dispatches: Dict[str, int] = {}
+    for trigger in triggers:
+        latest[trigger.report_id] = trigger
+        dispatches[trigger.report_id] = dispatches.get(trigger.report_id, 0) + 1
+
+    def execution_of(report: Report) -> Optional[str]:
+        # Reports dispatched before execution ids were stored on them
+        trigger = latest.get(report.id)
+        return report.execution_id or (trigger.execution_id if trigger else None)
+
+    kestra_ids = [
+        execution_id for execution_id in (execution_of(r) for r in reports if r.created_at >= give_up)
+        if execution_id and not execution_id.startswith(WORKER_EXECUTION_PREFIX)
+    ]
+    states = await kestra_client.get_execution_states(kestra_ids) if kestra_ids else {}
+    has_worker_jobs = any(
+        (execution_of(r) or "").startswith(WORKER_EXECUTION_PREFIX) for r in reports if r.created_at >= give_up
+    )
+    worker = await worker_client.get_worker_health() if has_worker_jobs else None
+
+    def worker_job_lost(report: Report) -> bool:
+        if worker is None:
+            return False  # unknown while the worker is unreachable
+        trigger = latest.get(report.id)
+        sent_at = (trigger.sent_at or trigger.created_at) if trigger else None
+        started_at = worker.get("started_at")
+        if sent_at is None or (started_at and sent_at < datetime.fromisoformat(started_at)):
+            return True
+        return worker.get("queue_depth", 0) + worker.get("in_flight", 0) == 0
+
+    batch_id = f"reaper:{now.isoformat()}"
+    redispatched: List[str] = []
+    failed: List[str] = []
+    for report in reports:
+        execution_id = execution_of(report)
+        if report.created_at >= give_up:
+            if execution_id and execution_id.startswith(WORKER_EXECUTION_PREFIX):
+                if not worker_job_lost(report):
+                    continue
+            elif execution_id:
+                state = states.get(execution_id)
+                if state is None or state in ACTIVE_STATES:
+                    continue
+            if dispatches.get(report.id, 0) < settings.REAPER_MAX_DISPATCHES:
+                _redispatch(db, report, latest.get(report.id), batch_id)
+                redispatched.append(report.id)
+                continue
+        report.status = ReportStatus.ERROR.value
+        report.completed_at = now
+        failed.append(report.id)
+
+    if failed:
+        await dedup.complete_duplicates(db, failed)
+    await db.commit()
+
+    if redispatched:
+        outbox.notify_pending()
+        metrics.REAPER_ACTIONS.inc(len(redispatched), action="redispatched")
+    if failed:
+        metrics.REAPER_ACTIONS.inc(len(failed), action="failed")
+    if redispatched or failed:
+        logger.warning(
+            "Reconciled stuck reports: %d re-dispatched, %d marked ERROR", len(redispatched), len(failed)
+        )
+    return {"redispatched": len(redispatched), "failed": len(failed)}
+
+
+async def run_reaper(stop: asyncio.Event) -> None:
+    """Background loop started from the app lifespan: one round every REAPER_INTERVAL_SECONDS."""
+    while not stop.is_set():
+        try:
+            async with AsyncSessionLocal() as db:
+                await reconcile_stuck_reports(db)
+        except Exception as e:
+            logger.exception("Stuck report reconciliation failed: %s", e)
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=settings.REAPER_INTERVAL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
@@ -0,0 +1,101 @@
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import dedup, metrics
+from app.core.detections import summarize_detections
+from app.models.nosql import InferenceLog
+from app.models.sql import Report, ReportStatus
+from app.schemas.inference import InferenceResult
+
+
+def report_row(result: InferenceResult, completed_at: datetime) -> dict:
+    """
+    Report columns for one result. Every row has the same keys, so a list of
+    them goes out as a single executemany UPDATE.
+    """
+    row = {
+        "id": result.report_id,
+        "status": result.status,
+        "completed_at": completed_at,
+        "frame_count": None,
+        "first_fire_s": None,
+    }
+    if result.status != ReportStatus.DONE.value:
+        row.update(fire_confidence=None, smoke_confidence=None, detection_count=None, processing_time_ms=None)
+        return row
+    detections = result.detections
+    if result.frames is not None:
+        # Videos: the summary covers every sampled frame
+        detections = [d for frame in result.frames for d in frame["detections"]]
+        row.update(frame_count=len(result.frames), first_fire_s=(result.video_summary or {}).get("first_fire_s"))
+    row.update(summarize_detections(detections, result.processing_time_ms))
+    return row
+
+
+def inference_log(result: InferenceResult, row: dict) -> dict:
+    """InferenceLog fields for one successful result."""
+    return {
+        "report_id": result.report_id,
+        "detections": result.detections,
+        "frames": result.frames or [],
+        "video_summary": result.video_summary,
+        "model_version": result.model_version or "yolov8",
+        "processing_time_ms": result.processing_time_ms,
+        "fire_confidence": row["fire_confidence"],
+        "smoke_confidence": row["smoke_confidence"],
+    }
+
+
+async def replace_inference_logs(report_ids: List[str], logs: List[dict]) -> None:
+    """
+    Drops any log left by an earlier, interrupted attempt for these reports,
+    then writes the new ones with one insert_many.
+    """
+    await InferenceLog.find({"report_id": {"$in": report_ids}}).delete()
+    if logs:
+        await InferenceLog.insert_many([InferenceLog(**log) for log in logs])
+
+
+async def apply_results(db: AsyncSession, results: List[InferenceResult]) -> Tuple[List[str], List[str]]:
+    """
+    Stores a batch of inference results and returns (applied, skipped) report ids.
+
+    Idempotent per report_id: only reports still PROCESSING are written (locked
+    for the duration), so a retried or duplicated delivery is skipped. Logs go
+    to Mongo first, then one bulk UPDATE sets status and the summary columns,
+    so a DONE report always has its detections. Uploads deduplicated onto these
+    reports get the same outcome. Commits.
+    """
+    latest: Dict[str, InferenceResult] = {r.report_id: r for r in results}
+    if not latest:
+        return [], []
+    pending = dict((await db.execute(
+        select(Report.id, Report.created_at)
+        .where(Report.id.in_(latest), Report.status == ReportStatus.PROCESSING.value)
+        .with_for_update()
+    )).all())
+    applied = [report_id for report_id in latest if report_id in pending]
+    skipped = [report_id for report_id in latest if report_id not in pending]
+    if not applied:
+        await db.commit()  # releases the row locks
+        return applied, skipped
+
+    now = datetime.utcnow()
+    rows = [report_row(latest[report_id], now) for report_id in applied]
+    logs = [
+        inference_log(latest[row["id"]], row)
+        for row in rows
+        if row["status"] == ReportStatus.DONE.value
+    ]
+    await replace_inference_logs(applied, logs)
+
+    await db.execute(update(Report), rows)
+    await dedup.complete_duplicates(db, applied)
+    await db.commit()
+    for row in rows:
+        if pending[row["id"]] is not None:
+            metrics.REPORT_COMPLETION.observe((now - pending[row["id"]]).total_seconds(), status=row["status"])
+    return applied, skipped
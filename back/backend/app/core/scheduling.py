@@ -0,0 +1,87 @@
+import heapq
+from collections import defaultdict, deque
+from datetime import datetime, timedelta
+from typing import Deque, Dict, List, Optional
+
+from app.core.config import settings
+from app.models.sql import FlowTrigger, InferencePriority
+
+# Priority scheduling for inference triggers (used by core.outbox).
+#
+# Every trigger gets a priority class when it is enqueued (resolve_priority)
+# and a virtual dispatch time, scheduled_at = enqueue time + the class's
+# delay (PRIORITY_CLASS_DELAYS_SECONDS). Dispatch rounds take due triggers in
+# scheduled_at order, which behaves like one queue per class where urgent
+# classes go first, while a waiting bulk trigger overtakes newer normal ones
+# once it has waited the difference between their delays (starvation
+# protection). Triggers still ahead of their scheduled_at are held back while
+# a more urgent class has triggers waiting (eligible), so they do not compete
+# with urgent work for the backend, but run right away on an idle system.
+# Within a round, schedule() interleaves users (fair share).
+
+
+def resolve_priority(
+    role: Optional[str],
+    requested: Optional[InferencePriority] = None,
+    geohash: Optional[str] = None,
+    default: Optional[InferencePriority] = None,
+) -> InferencePriority:
+    """
+    Priority class for a new upload:
+    - the role's class (PRIORITY_ROLE_DEFAULTS, else normal) is both the
+      default and the highest class the user may request;
+    - `requested` (upload parameter) can lower it, e.g. bulk for archival
+      imports; `default` replaces the role default when nothing was requested;
+    - uploads located in a risk zone (PRIORITY_RISK_GEOHASHES) move up one class.
+    """
+    ceiling = InferencePriority(settings.PRIORITY_ROLE_DEFAULTS.get(role or "", InferencePriority.NORMAL.value))
+    priority = requested or default or ceiling
+    if priority.rank < ceiling.rank:
+        priority = ceiling
+    if geohash and any(geohash.startswith(prefix) for prefix in settings.PRIORITY_RISK_GEOHASHES):
+        priority = list(InferencePriority)[max(priority.rank - 1, 0)]
+    return priority
+
+
+def scheduled_at(priority: str, enqueued_at: datetime) -> datetime:
+    delay = settings.PRIORITY_CLASS_DELAYS_SECONDS.get(priority, 0.0)
+    return enqueued_at + timedelta(seconds=delay)
+
+
+def eligible(candidates: List[FlowTrigger], now: datetime) -> List[FlowTrigger]:
+    """
+    Triggers that may be dispatched this round: those past their scheduled_at,
+    and those of the most urgent class among the candidates.
+    """
+    if not candidates:
+        return []
+    top = min(InferencePriority(t.priority).rank for t in candidates)
+    return [t for t in candidates if t.scheduled_at <= now or InferencePriority(t.priority).rank == top]
+
+
+def schedule(candidates: List[FlowTrigger], limit: int) -> List[FlowTrigger]:
+    """
+    Picks up to `limit` triggers for one dispatch round. Each user's triggers
+    keep their scheduled_at order; across users, every trigger already picked
+    for a user pushes that user's next one back by SCHEDULER_FAIR_SHARE_SECONDS,
+    so a user with a large backlog shares the round with everyone else in the
+    same class instead of filling it.
+    """
+    queues: Dict[Optional[int], Deque[FlowTrigger]] = defaultdict(deque)
+    for trigger in sorted(candidates, key=lambda t: (t.scheduled_at, t.id)):
+        queues[trigger.user_id].append(trigger)
+
+    penalty = timedelta(seconds=settings.SCHEDULER_FAIR_SHARE_SECONDS)
+    picks: Dict[Optional[int], int] = defaultdict(int)
+    heap = [(queue[0].scheduled_at, queue[0].id, user) for user, queue in queues.items()]
+    heapq.heapify(heap)
+
+    chosen: List[FlowTrigger] = []
+    while heap and len(chosen) < limit:
+        _, _, user = heapq.heappop(heap)
+        queue = queues[user]
+        chosen.append(queue.popleft())
+        picks[user] += 1
+        if queue:
+            heapq.heappush(heap, (queue[0].scheduled_at + penalty * picks[user], queue[0].id, user))
+    return chosen
@@ -1,11 +1,21 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional, Any, Union
+from typing import Optional, Any, Tuple, Union
 from jose import jwt
 from passlib.context import CryptContext
+from app.core import metrics
 from app.core.config import settings
 
 # Password Hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashes made with other cost parameters still verify, and are flagged for
+# rehashing (verify_and_update) so changing PASSWORD_BCRYPT_ROUNDS migrates
+# users as they log in.
+pwd_context = CryptContext(
+    schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.PASSWORD_BCRYPT_ROUNDS
+)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
@@ -13,13 +23,74 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+# bcrypt is CPU-bound; async handlers run it on a bounded thread pool (bcrypt
+# releases the GIL) so a login storm cannot stall the event loop. Jobs beyond
+# the pool wait in its queue; past PASSWORD_HASH_MAX_QUEUE waiting jobs new
+# ones are refused with PasswordHashingBusy instead of queueing indefinitely.
+_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+)
+_queued = 0
+_queued_lock = threading.Lock()
+
+class PasswordHashingBusy(Exception):
+    """Too many password hashing jobs are already waiting for the pool."""
+
+def _set_queued(delta: int) -> None:
+    global _queued
+    with _queued_lock:
+        _queued += delta
+        metrics.PASSWORD_HASH_QUEUE_DEPTH.set(_queued)
+
+async def _run_hashing(operation: str, fn, *args):
+    with _queued_lock:
+        if _queued >= settings.PASSWORD_HASH_MAX_QUEUE:
+            metrics.PASSWORD_HASH_REJECTED.inc(operation=operation)
+            raise PasswordHashingBusy()
+    _set_queued(1)
+    submitted = time.perf_counter()
+
+    def job():
+        started = time.perf_counter()
+        _set_queued(-1)
+        metrics.PASSWORD_HASH_WAIT.observe(started - submitted)
+        try:
+            return fn(*args)
+        finally:
+            metrics.PASSWORD_HASH_DURATION.observe(time.perf_counter() - started, operation=operation)
+
+    return await asyncio.get_running_loop().run_in_executor(_hash_executor, job)
+
+async def hash_password(password: str) -> str:
+    """get_password_hash on the hashing pool. Raises PasswordHashingBusy."""
+    return await _run_hashing("hash", pwd_context.hash, password)
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verifies on the hashing pool. Returns (valid, new_hash); new_hash is set
+    when the stored hash uses outdated cost parameters and should be replaced.
+    Raises PasswordHashingBusy.
+    """
+    valid, new_hash = await _run_hashing(
+        "verify", pwd_context.verify_and_update, plain_password, hashed_password
+    )
+    if new_hash is not None:
+        metrics.PASSWORD_REHASHES.inc()
+    return valid, new_hash
+
 # JWT Generation
-def create_access_token(subject: Union[str, Any], expires_delta: timedelta = None) -> str:
+def create_access_token(
+    subject: Union[str, Any], expires_delta: timedelta = None, claims: Optional[dict] = None
+) -> str:
+    """
+    `claims` are added to the payload; core.tokens sets uid (user id) and fam
+    (refresh token family) so requests authenticate without a users lookup.
+    """
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     
-    to_encode = {"exp": expire, "sub": str(subject)}
+    to_encode = {**(claims or {}), "exp": expire, "sub": str(subject)}
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
@@ -0,0 +1,77 @@
+import hashlib
+import os
+import time
+from dataclasses import dataclass
+
+import aiofiles
+from fastapi import UploadFile
+
+from app.core import metrics
+
+
+class UploadTooLarge(Exception):
+    """Raised when an upload exceeds the configured size limit while streaming."""
+
+    def __init__(self, max_bytes: int):
+        super().__init__(f"File exceeds the maximum allowed size of {max_bytes} bytes")
+        self.max_bytes = max_bytes
+
+
+@dataclass
+class StoredUpload:
+    path: str
+    size_bytes: int
+    sha256: str
+    duration_s: float
+
+    @property
+    def throughput_bps(self) -> float:
+        return self.size_bytes / self.duration_s if self.duration_s > 0 else 0.0
+
+
+async def save_upload_stream(
+    upload: UploadFile,
+    dest_path: str,
+    max_bytes: int,
+    chunk_size: int = 1024 * 1024,
+) -> StoredUpload:
+    """
+    Streams an UploadFile to disk chunk by chunk.
+
+    Reads and writes go through the thread pool (UploadFile.read / aiofiles), so the
+    event loop is never blocked and at most one chunk is held in memory. The SHA-256
+    digest is computed on the fly and the size limit is enforced while streaming;
+    a partially written file is removed on any failure.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    started = time.perf_counter()
+
+    try:
+        async with aiofiles.open(dest_path, "wb") as out:
+            while True:
+                chunk = await upload.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(max_bytes)
+                digest.update(chunk)
+                await out.write(chunk)
+    except BaseException as e:
+        if os.path.exists(dest_path):
+            os.remove(dest_path)
+        if isinstance(e, UploadTooLarge):
+            metrics.UPLOAD_REJECTED.inc(reason="too_large")
+        raise
+
+    stored = StoredUpload(
+        path=dest_path,
+        size_bytes=size,
+        sha256=digest.hexdigest(),
+        duration_s=time.perf_counter() - started,
+    )
+    metrics.UPLOAD_BYTES.inc(stored.size_bytes)
+    metrics.UPLOAD_DURATION.observe(stored.duration_s)
+    metrics.UPLOAD_THROUGHPUT.observe(stored.throughput_bps)
+    return stored
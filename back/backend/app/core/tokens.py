@@ -0,0 +1,193 @@
+import logging
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+from jose import JWTError, jwt
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import metrics, security
+from app.core.config import settings
+from app.models.sql import RefreshToken, RefreshTokenRevocation, User
+
+logger = logging.getLogger(__name__)
+
+# Access + refresh token pairs.
+#
+# Access tokens are short lived and self-contained (sub, uid, role, fam), so the
+# request path verifies them with the signature and an in-memory revocation
+# check: no password check, no users lookup. Refresh tokens are single use:
+# POST /auth/refresh exchanges one for a new pair in the same family and marks
+# it rotated. Presenting a rotated token again means it leaked, so the whole
+# family is revoked (RFC 6749 refresh token rotation).
+#
+# Revocations are persisted on refresh_tokens rows and mirrored in
+# revoked_families, loaded at startup. The mirror is per process: another API
+# process learns about a logout when it restarts, and until then only refresh
+# is refused there (by the database), which bounds the window to the access
+# token lifetime.
+
+
+class InvalidRefreshToken(Exception):
+    def __init__(self, result: str):
+        super().__init__(result)
+        self.result = result  # token_refreshes_total label
+
+
+class RevocationList:
+    """
+    Revoked token families -> when their last token expires (epoch seconds).
+    Entries are dropped once nothing issued in the family can still be valid,
+    so the structure stays proportional to recent logouts, not to all users.
+    """
+
+    def __init__(self, clock=time.time):
+        self._clock = clock
+        self._families: Dict[str, float] = {}
+
+    def revoke(self, family_id: str, until: float) -> None:
+        now = self._clock()
+        self._families = {f: t for f, t in self._families.items() if t > now}
+        self._families[family_id] = max(until, self._families.get(family_id, 0.0))
+
+    def is_revoked(self, family_id: str) -> bool:
+        until = self._families.get(family_id)
+        if until is None:
+            return False
+        if until <= self._clock():
+            self._families.pop(family_id, None)
+            return False
+        return True
+
+    def load(self, families: Iterable[Tuple[str, float]]) -> None:
+        self._families = {}
+        for family_id, until in families:
+            self.revoke(family_id, until)
+
+    def __len__(self) -> int:
+        return len(self._families)
+
+
+revoked_families = RevocationList()
+
+
+def _epoch(value: datetime) -> float:
+    # Columns hold naive UTC (datetime.utcnow)
+    return (value - datetime(1970, 1, 1)).total_seconds()
+
+
+def create_token_pair(db: AsyncSession, user: User, family_id: Optional[str] = None) -> dict:
+    """
+    New access + refresh tokens (Token response shape) for `user`, in a new
+    family unless one is given. Adds the refresh token row; the caller commits.
+    """
+    return _issue_tokens(db, user, family_id)[0]
+
+
+def _issue_tokens(db: AsyncSession, user: User, family_id: Optional[str]) -> Tuple[dict, str]:
+    family_id = family_id or uuid.uuid4().hex
+    token_id = uuid.uuid4().hex
+    expires_at = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    db.add(RefreshToken(id=token_id, family_id=family_id, user_id=user.id, expires_at=expires_at))
+
+    refresh_token = jwt.encode(
+        {"sub": user.username, "uid": user.id, "typ": "refresh", "jti": token_id, "fam": family_id, "exp": expires_at},
+        settings.SECRET_KEY,
+        algorithm=settings.ALGORITHM,
+    )
+    access_token = security.create_access_token(
+        subject=user.username, claims={"uid": user.id, "role": user.role, "typ": "access", "fam": family_id}
+    )
+    return {
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "token_type": "bearer",
+        "expires_in": settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    }, token_id
+
+
+def decode_refresh_token(token: str) -> dict:
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        raise InvalidRefreshToken("invalid")
+    if payload.get("typ") != "refresh" or not payload.get("jti") or not payload.get("fam"):
+        raise InvalidRefreshToken("invalid")
+    return payload
+
+
+async def revoke_family(db: AsyncSession, family_id: str, reason: RefreshTokenRevocation) -> None:
+    """Revokes every token of the family, persisted and in memory. Commits."""
+    now = datetime.utcnow()
+    await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=now, revoked_reason=reason.value)
+    )
+    last_expiry = (await db.execute(
+        select(func.max(RefreshToken.expires_at)).where(RefreshToken.family_id == family_id)
+    )).scalar()
+    await db.commit()
+    if last_expiry is not None:
+        revoked_families.revoke(family_id, _epoch(last_expiry))
+
+
+async def rotate_refresh_token(db: AsyncSession, token: str) -> dict:
+    """
+    Exchanges a refresh token for a new pair in the same family. Raises
+    InvalidRefreshToken when the token is malformed, expired, revoked, or was
+    already rotated (which revokes its family). Commits.
+    """
+    try:
+        payload = decode_refresh_token(token)
+        family_id = payload["fam"]
+        if revoked_families.is_revoked(family_id):
+            raise InvalidRefreshToken("revoked")
+
+        row = (await db.execute(
+            select(RefreshToken).where(RefreshToken.id == payload["jti"]).with_for_update()
+        )).scalar_one_or_none()
+        if row is None or row.user_id != payload.get("uid") or row.expires_at <= datetime.utcnow():
+            raise InvalidRefreshToken("invalid")
+        if row.revoked_at is not None:
+            if row.revoked_reason == RefreshTokenRevocation.ROTATED.value:
+                logger.warning("Rotated refresh token reused, revoking its family", extra={"user_id": row.user_id})
+                await revoke_family(db, family_id, RefreshTokenRevocation.REUSE)
+                raise InvalidRefreshToken("reused")
+            raise InvalidRefreshToken("revoked")
+
+        # Current role, so role changes reach access tokens on the next refresh
+        role = (await db.execute(select(User.role).where(User.id == row.user_id))).scalar_one_or_none()
+        if role is None:
+            raise InvalidRefreshToken("invalid")
+        user = User(id=row.user_id, username=payload["sub"], role=role)
+        tokens, token_id = _issue_tokens(db, user, family_id)
+        row.revoked_at = datetime.utcnow()
+        row.revoked_reason = RefreshTokenRevocation.ROTATED.value
+        row.replaced_by = token_id
+        await db.commit()
+    except InvalidRefreshToken as e:
+        metrics.TOKEN_REFRESHES.inc(result=e.result)
+        raise
+    metrics.TOKEN_REFRESHES.inc(result="rotated")
+    return tokens
+
+
+async def load_revocations(db: AsyncSession) -> None:
+    """
+    Startup: deletes expired refresh tokens and loads the families revoked by
+    logout or reuse that still have unexpired tokens. Commits.
+    """
+    now = datetime.utcnow()
+    await db.execute(delete(RefreshToken).where(RefreshToken.expires_at <= now))
+    rows = (await db.execute(
+        select(RefreshToken.family_id, func.max(RefreshToken.expires_at))
+        .where(RefreshToken.revoked_reason.in_([
+            RefreshTokenRevocation.LOGOUT.value, RefreshTokenRevocation.REUSE.value,
+        ]))
+        .group_by(RefreshToken.family_id)
+    )).all()
+    await db.commit()
+    revoked_families.load((family_id, _epoch(expires_at)) for family_id, expires_at in rows)
@@ -0,0 +1,75 @@
+import logging
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from app.core.config import settings
+
+# Resident inference worker (app/worker/main.py), used when INFERENCE_BACKEND=worker
+WORKER_JOBS_URL = f"{settings.INFERENCE_WORKER_URL}/jobs"
+WORKER_HEALTH_URL = f"{settings.INFERENCE_WORKER_URL}/health"
+
+logger = logging.getLogger(__name__)
+
+# Shared pooled client, same lifecycle as the Kestra one
+_client: Optional[httpx.AsyncClient] = None
+
+# Worker queue depth from its last reply (core.admission); full when it answered 503
+last_queue_depth: Optional[int] = None
+
+
+def get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(settings.KESTRA_TIMEOUT_SECONDS),
+            limits=httpx.Limits(
+                max_connections=settings.KESTRA_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.KESTRA_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=30.0,
+            ),
+        )
+    return _client
+
+
+async def close_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def submit_inference_jobs(items: List[Dict[str, Any]]) -> Optional[str]:
+    """
+    Queues {"report_id", "file_path"} items on the inference worker (videos also
+    carry "media_type" and their sampling "options").
+    Returns a pseudo execution id ("worker:<first report id>") on success, or
+    None if the worker's queue is full or it could not be reached (the outbox
+    retries it).
+    """
+    global last_queue_depth
+    try:
+        response = await get_client().post(WORKER_JOBS_URL, json={"items": items})
+        if response.status_code == 503:
+            last_queue_depth = settings.WORKER_MAX_QUEUE_SIZE
+        response.raise_for_status()
+        last_queue_depth = response.json().get("queue_depth", last_queue_depth)
+        return f"worker:{items[0]['report_id']}"
+
+    except (httpx.HTTPError, ValueError) as e:
+        logger.warning("Failed to submit %d jobs to inference worker: %s", len(items), e)
+        return None
+
+
+async def get_worker_health() -> Optional[Dict[str, Any]]:
+    """
+    The worker's /health reply (queue_depth, in_flight, started_at), or None
+    if it could not be reached.
+    """
+    try:
+        response = await get_client().get(WORKER_HEALTH_URL)
+        response.raise_for_status()
+        return response.json()
+    except (httpx.HTTPError, ValueError) as e:
+        logger.warning("Failed to get inference worker health: %s", e)
+        return None
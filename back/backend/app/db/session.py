@@ -1,28 +1,262 @@
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+import time
+from typing import Optional
+
+from sqlalchemy import event, exc, inspect, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.schema import CreateColumn
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReadPreference, monitoring
 from beanie import init_beanie
 
+from app.core import metrics
 from app.core.config import settings
 from app.models.sql import Base
 from app.models.nosql import InferenceLog
 
 # 1. SQLAlchemy Setup
-engine = create_async_engine(settings.DATABASE_URL, echo=True)
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    The default async queue pool, plus metrics: how long each checkout waited
+    for a connection, checkouts that timed out, and in-use/idle connections.
+    """
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            metrics.DB_POOL_TIMEOUTS.inc()
+            raise
+        finally:
+            metrics.DB_POOL_CHECKOUT_WAIT.observe(time.perf_counter() - started)
+        self._record_usage()
+        return connection
+
+    def _do_return_conn(self, record):
+        super()._do_return_conn(record)
+        self._record_usage()
+
+    def _record_usage(self) -> None:
+        metrics.DB_POOL_CONNECTIONS.set(self.checkedout(), state="in_use")
+        metrics.DB_POOL_CONNECTIONS.set(self.checkedin(), state="idle")
+
+def create_engine(url: str) -> AsyncEngine:
+    """
+    Engine with the DB_* pool settings. SQLite (tests, local runs) keeps
+    SQLAlchemy's default pool for its URL type.
+    """
+    options = {"echo": settings.DB_ECHO, "query_cache_size": settings.DB_QUERY_CACHE_SIZE}
+    if url.startswith("sqlite"):
+        return create_async_engine(url, **options)
+    if url.startswith("postgresql+asyncpg"):
+        options["connect_args"] = {"prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE}
+    return create_async_engine(
+        url,
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+        pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        **options,
+    )
+
+_TIMED_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE"}
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Times every statement run by the engine (db_query_duration_seconds, by statement type)."""
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _query_started(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def _query_finished(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+        metrics.DB_QUERY_DURATION.observe(
+            time.perf_counter() - started,
+            operation=operation if operation in _TIMED_OPERATIONS else "OTHER",
+        )
+
+    @event.listens_for(engine.sync_engine, "handle_error")
+    def _query_failed(context):
+        # after_cursor_execute does not run for failed statements
+        if context.connection is not None and context.connection.info.get("query_started"):
+            context.connection.info["query_started"].pop()
+
+engine = create_engine(settings.DATABASE_URL)
+instrument_engine(engine)
 AsyncSessionLocal = sessionmaker(
     engine, class_=AsyncSession, expire_on_commit=False
 )
 
 async def get_db():
-    async with AsyncSessionLocal() as session:
-        yield session
+    started = time.perf_counter()
+    try:
+        async with AsyncSessionLocal() as session:
+            yield session
+    finally:
+        metrics.DB_SESSION_DURATION.observe(time.perf_counter() - started)
+
+def upgrade_schema(connection) -> None:
+    """
+    create_all only creates missing tables. Columns and indexes added to
+    existing tables since are created here; idempotent, runs on every start.
+    Added NOT NULL columns carry a server default for the existing rows.
+    """
+    inspector = inspect(connection)
+    preparer = connection.dialect.identifier_preparer
+    existing_tables = set(inspector.get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        columns = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in columns:
+                continue
+            ddl = str(CreateColumn(column).compile(dialect=connection.dialect))
+            for foreign_key in column.foreign_keys:
+                target = foreign_key.column
+                ddl += f" REFERENCES {preparer.format_table(target.table)} ({preparer.quote(target.name)})"
+            connection.execute(text(f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {ddl}"))
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
 
 async def init_sql_db():
     # In dev, we can auto-create tables. In prod, use Alembic.
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(upgrade_schema)
+    if engine.dialect.name == "postgresql":
+        await install_report_triggers()
+
+# Publishes every reports.status transition on the 'report_events' channel, whoever
+# writes it (API, inference worker, /internal/results:bulk). Consumed by core.events.
+REPORT_EVENTS_DDL = [
+    """
+    CREATE OR REPLACE FUNCTION notify_report_status() RETURNS trigger AS $$
+    BEGIN
+        PERFORM pg_notify('report_events', json_build_object(
+            'id', NEW.id, 'user_id', NEW.user_id, 'status', NEW.status,
+            'fire_confidence', NEW.fire_confidence, 'smoke_confidence', NEW.smoke_confidence,
+            'detection_count', NEW.detection_count
+        )::text);
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS reports_status_notify ON reports",
+    """
+    CREATE TRIGGER reports_status_notify
+    AFTER UPDATE OF status ON reports
+    FOR EACH ROW WHEN (OLD.status IS DISTINCT FROM NEW.status)
+    EXECUTE FUNCTION notify_report_status()
+    """,
+]
+
+async def install_report_triggers():
+    async with engine.begin() as conn:
+        for statement in REPORT_EVENTS_DDL:
+            await conn.execute(text(statement))
 
 # 2. MongoDB/Beanie Setup
+READ_PREFERENCES = {
+    "primary": ReadPreference.PRIMARY,
+    "primaryPreferred": ReadPreference.PRIMARY_PREFERRED,
+    "secondary": ReadPreference.SECONDARY,
+    "secondaryPreferred": ReadPreference.SECONDARY_PREFERRED,
+    "nearest": ReadPreference.NEAREST,
+}
+
+class MongoPoolMetrics(monitoring.ConnectionPoolListener):
+    """
+    CMAP listener feeding the Motor pool metrics: open/in-use connections,
+    checkout wait and failed checkouts. Called from PyMongo's threads.
+    """
+
+    def connection_created(self, event):
+        metrics.MONGO_POOL_CONNECTIONS.inc(state="open")
+
+    def connection_closed(self, event):
+        metrics.MONGO_POOL_CONNECTIONS.dec(state="open")
+
+    def connection_checked_out(self, event):
+        metrics.MONGO_POOL_CONNECTIONS.inc(state="in_use")
+        metrics.MONGO_POOL_CHECKOUT_WAIT.observe(event.duration)
+
+    def connection_checked_in(self, event):
+        metrics.MONGO_POOL_CONNECTIONS.dec(state="in_use")
+
+    def connection_check_out_failed(self, event):
+        metrics.MONGO_POOL_CHECKOUT_FAILED.inc(reason=event.reason)
+        metrics.MONGO_POOL_CHECKOUT_WAIT.observe(event.duration)
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Times every Mongo command (InferenceLog queries and writes included)."""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        metrics.MONGO_COMMAND_DURATION.observe(event.duration_micros / 1e6, command=event.command_name, result="ok")
+
+    def failed(self, event):
+        metrics.MONGO_COMMAND_DURATION.observe(event.duration_micros / 1e6, command=event.command_name, result="error")
+
+# One client per process, opened in the app lifespan (init_mongo_db) and
+# closed on shutdown (close_mongo_db). Writes and detail reads use the primary.
+mongo_client: Optional[AsyncIOMotorClient] = None
+
+def create_mongo_client(url: str) -> AsyncIOMotorClient:
+    return AsyncIOMotorClient(
+        url,
+        maxPoolSize=settings.MONGO_MAX_POOL_SIZE,
+        minPoolSize=settings.MONGO_MIN_POOL_SIZE,
+        maxIdleTimeMS=settings.MONGO_MAX_IDLE_TIME_MS,
+        connectTimeoutMS=settings.MONGO_CONNECT_TIMEOUT_MS,
+        serverSelectionTimeoutMS=settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        event_listeners=[MongoPoolMetrics(), MongoCommandMetrics()],
+    )
+
 async def init_mongo_db():
-    client = AsyncIOMotorClient(settings.MONGO_URL)
-    await init_beanie(database=client[settings.MONGO_DB_NAME], document_models=[InferenceLog])
+    global mongo_client
+    if mongo_client is None:
+        mongo_client = create_mongo_client(settings.MONGO_URL)
+    await init_beanie(database=mongo_client[settings.MONGO_DB_NAME], document_models=[InferenceLog])
+
+def close_mongo_db() -> None:
+    global mongo_client
+    if mongo_client is not None:
+        mongo_client.close()
+        mongo_client = None
+
+def listing_logs_collection():
+    """
+    inference_logs for list views (GET /reports?include=detections), read with
+    MONGO_LISTING_READ_PREFERENCE so they can be served by secondaries.
+    """
+    return mongo_client[settings.MONGO_DB_NAME].get_collection(
+        InferenceLog.Settings.name,
+        read_preference=READ_PREFERENCES[settings.MONGO_LISTING_READ_PREFERENCE],
+    )
@@ -1,23 +1,55 @@
+import asyncio
+import logging
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
-from app.db.session import init_sql_db, init_mongo_db
+from app.db.session import AsyncSessionLocal, init_sql_db, init_mongo_db, close_mongo_db, engine
+from app.core import kestra_client, ratelimit, tokens, worker_client
+from app.core.logs import setup_logging, stop_logging
+from app.core.middleware import MetricsMiddleware, RequestContextMiddleware
+from app.core.events import PostgresReportListener
+from app.core.outbox import run_outbox_worker
+from app.core.reaper import run_reaper
+
+logger = logging.getLogger(__name__)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    print("Initializing Databases...")
+    logger.info("Initializing databases")
     await init_sql_db()
     await init_mongo_db()
+    async with AsyncSessionLocal() as db:
+        await tokens.load_revocations(db)
+    background_stop = asyncio.Event()
+    outbox_task = asyncio.create_task(run_outbox_worker(background_stop))
+    reaper_task = asyncio.create_task(run_reaper(background_stop)) if settings.REAPER_ENABLED else None
+    report_listener = None
+    if engine.dialect.name == "postgresql":
+        report_listener = PostgresReportListener(settings.DATABASE_URL.replace("+asyncpg", ""))
+        report_listener.start()
     yield
     # Shutdown
-    print("Shutting down...")
+    logger.info("Shutting down")
+    background_stop.set()
+    await outbox_task
+    if reaper_task is not None:
+        await reaper_task
+    if report_listener is not None:
+        await report_listener.stop()
+    await kestra_client.close_client()
+    await worker_client.close_client()
+    await ratelimit.close_backend()
+    close_mongo_db()
+    stop_logging(log_listener)
 
 from fastapi.staticfiles import StaticFiles
 import os
 
 from app.core.config import settings
 
+log_listener = setup_logging(settings.LOG_LEVEL, settings.LOG_FORMAT)
+
 app = FastAPI(title="Wildfire Detection API", lifespan=lifespan)
 
 # Mount /static/uploads to point to /shared-data/uploads (configurable for tests)
@@ -32,12 +64,18 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Request-ID"],
 )
 
-from app.api.endpoints import auth, upload, reports
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(RequestContextMiddleware)
+
+from app.api.endpoints import auth, upload, reports, internal, metrics
 app.include_router(auth.router, prefix="/auth", tags=["auth"])
 app.include_router(upload.router, prefix="/files", tags=["files"])
 app.include_router(reports.router, prefix="/reports", tags=["reports"])
+app.include_router(internal.router, prefix="/internal", tags=["internal"])
+app.include_router(metrics.router, tags=["metrics"])
 
 @app.get("/")
 def read_root():
@@ -1,5 +1,5 @@
 from beanie import Document
-from pydantic import Field
+from pydantic import BaseModel, Field
 from datetime import datetime
 from typing import Optional, List, Any
 
@@ -25,9 +25,26 @@ class InferenceLog(Document):
     smoke_confidence: float = 0.0
     detections: List[dict] = [] # List of BoundingBox dicts
     
+    # Videos: {"frame_index", "timestamp_s", "detections"} per sampled frame,
+    # and the temporal summary (worker.video.temporal_summary)
+    frames: List[dict] = []
+    video_summary: Optional[dict] = None
+    
     # Metadata about the execution environment
     model_version: str = "yolov8"
     processing_time_ms: float = 0.0
 
     class Settings:
         name = "inference_logs"
+
+class InferenceLogDetections(BaseModel):
+    """
+    Projection of InferenceLog with only what ReportDetail needs
+    (used as Beanie projection_model, so other fields are never loaded).
+    """
+    report_id: str
+    detections: List[dict] = []
+    frames: List[dict] = []
+    video_summary: Optional[dict] = None
+    model_version: str = "yolov8"
+    processing_time_ms: float = 0.0
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Enum, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, Enum, ForeignKey, Index, JSON, func
 from sqlalchemy.orm import declarative_base
 from datetime import datetime
 import enum
@@ -10,12 +10,39 @@ class ReportStatus(str, enum.Enum):
     DONE = "DONE"
     ERROR = "ERROR"
 
+class MediaType(str, enum.Enum):
+    IMAGE = "image"
+    VIDEO = "video"  # one report per video; per-frame detections in its inference log
+
+class FlowTriggerStatus(str, enum.Enum):
+    PENDING = "PENDING"
+    SENT = "SENT"
+    FAILED = "FAILED"
+
+class InferencePriority(str, enum.Enum):
+    """Inference scheduling classes (core.scheduling), most urgent first."""
+    CRITICAL = "critical"  # e.g. tower/sensor alerts in a risk zone
+    HIGH = "high"
+    NORMAL = "normal"
+    BULK = "bulk"          # archival imports, batch uploads
+
+    @property
+    def rank(self) -> int:
+        return list(InferencePriority).index(self)
+
+class RefreshTokenRevocation(str, enum.Enum):
+    ROTATED = "rotated"  # exchanged for its successor; the family stays valid
+    LOGOUT = "logout"    # whole family revoked by the user
+    REUSE = "reuse"      # a rotated token was presented again; whole family revoked
+
 class User(Base):
     __tablename__ = "users"
 
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=False)
+    # Default inference priority class comes from the role (settings.PRIORITY_ROLE_DEFAULTS)
+    role = Column(String(32), default="user", server_default="user", nullable=False)
 
 class Report(Base):
     __tablename__ = "reports"
@@ -27,5 +54,96 @@ class Report(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     latitude = Column(Float, nullable=True)
     longitude = Column(Float, nullable=True)
-    # Summary of findings (e.g., {"fire_detected": true}) stored as simple string/json if needed in SQL
-    # but detailed logs go to Mongo
+    geohash = Column(String(12), nullable=True)  # core.geo.encode(latitude, longitude); spatial index key
+    content_hash = Column(String(64), nullable=True)  # SHA-256 of the uploaded file
+    size_bytes = Column(Integer, nullable=True)
+    media_type = Column(String(16), default=MediaType.IMAGE.value, server_default=MediaType.IMAGE.value, nullable=False)
+    # Derivatives written by core.images (paths relative to the uploads dir)
+    inference_path = Column(String, nullable=True)  # model-sized copy; NULL = infer on file_path
+    thumbnail_path = Column(String, nullable=True)
+    image_width = Column(Integer, nullable=True)
+    image_height = Column(Integer, nullable=True)
+    inference_scale = Column(Float, nullable=True)  # detections are in inference-copy pixels
+    model_version = Column(String(64), nullable=True)  # settings.MODEL_VERSION at upload time
+    # Set when this upload reused another report's inference (same content_hash + model_version)
+    duplicate_of = Column(String, ForeignKey("reports.id"), nullable=True)
+    # Latest inference execution (Kestra id, or "worker:..." for the resident worker);
+    # core.reaper checks it when the report stays PROCESSING too long
+    execution_id = Column(String, nullable=True)
+
+    # Summary of findings, written when inference completes (detailed logs go to Mongo).
+    # NULL while PROCESSING; confidences are 0.0 when the class was not detected.
+    fire_confidence = Column(Float, nullable=True)
+    smoke_confidence = Column(Float, nullable=True)
+    detection_count = Column(Integer, nullable=True)
+    processing_time_ms = Column(Float, nullable=True)
+    completed_at = Column(DateTime, nullable=True)
+    # Videos: sampled frames that went through inference, and when fire was first seen
+    frame_count = Column(Integer, nullable=True)
+    first_fire_s = Column(Float, nullable=True)
+
+    __table_args__ = (
+        # Listing: WHERE user_id [AND status] ORDER BY created_at DESC, id DESC (keyset pagination)
+        Index("ix_reports_user_status_created", "user_id", "status", "created_at"),
+        Index("ix_reports_user_created_id", "user_id", "created_at", "id"),
+        # "fire detected with confidence >= X", sorted by confidence
+        Index("ix_reports_user_fire_confidence", "user_id", "fire_confidence", "id"),
+        # Map queries: geohash prefix ranges (bbox/radius cover), then time window
+        Index("ix_reports_user_geohash_created", "user_id", "geohash", "created_at"),
+        # Dedup lookup (content hash -> canonical report) and duplicate fan-out on completion
+        Index("ix_reports_content_hash_model", "content_hash", "model_version"),
+        Index("ix_reports_duplicate_of", "duplicate_of"),
+        # Stuck-report scan (core.reaper) and the admission PROCESSING count
+        Index("ix_reports_status_created", "status", "created_at"),
+    )
+
+class FlowTrigger(Base):
+    """
+    Transactional outbox for inference triggers.
+    Written in the same transaction as the Report, dispatched (and retried
+    with backoff) by the background outbox worker.
+    """
+    __tablename__ = "flow_triggers"
+
+    id = Column(Integer, primary_key=True, index=True)
+    report_id = Column(String, ForeignKey("reports.id"), nullable=False, index=True)
+    file_path = Column(String, nullable=False)
+    batch_id = Column(String, nullable=True)  # Triggers sharing a batch are dispatched as grouped executions
+    media_type = Column(String(16), default=MediaType.IMAGE.value, server_default=MediaType.IMAGE.value, nullable=False)
+    options = Column(JSON, nullable=True)  # video frame sampling parameters
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # fair share between users
+    priority = Column(
+        String(16), default=InferencePriority.NORMAL.value, server_default=InferencePriority.NORMAL.value, nullable=False
+    )
+    # Dispatch order: enqueue time + the priority class's delay (core.scheduling)
+    scheduled_at = Column(DateTime, default=datetime.utcnow, server_default=func.now(), nullable=False)
+    status = Column(String, default=FlowTriggerStatus.PENDING.value, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    execution_id = Column(String, nullable=True)
+    last_error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    # When the backend accepted it (SENT); core.reaper measures stuck time from here
+    sent_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_flow_triggers_status_next_attempt", "status", "next_attempt_at"),
+        Index("ix_flow_triggers_status_scheduled", "status", "scheduled_at"),
+    )
+
+class RefreshToken(Base):
+    """
+    One row per issued refresh token (core.tokens). Tokens rotated from the
+    same login share a family_id; revoking a family invalidates every token
+    in it, access tokens included.
+    """
+    __tablename__ = "refresh_tokens"
+
+    id = Column(String(32), primary_key=True)  # JWT id (jti)
+    family_id = Column(String(32), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    revoked_at = Column(DateTime, nullable=True)
+    revoked_reason = Column(String(16), nullable=True)  # RefreshTokenRevocation
+    replaced_by = Column(String(32), nullable=True)
@@ -0,0 +1,41 @@
+from pydantic import BaseModel
+from typing import List, Literal, Optional
+
+class VideoSamplingOptions(BaseModel):
+    """How frames are picked from a video (defaults come from settings)."""
+    mode: Literal["interval", "scene"] = "interval"
+    interval_s: Optional[float] = None
+    max_frames: Optional[int] = None
+
+class InferenceJob(BaseModel):
+    report_id: str
+    file_path: str  # Relative to the shared uploads directory
+    media_type: Literal["image", "video"] = "image"
+    options: VideoSamplingOptions = VideoSamplingOptions()
+    priority: int = 2  # InferencePriority rank, lower is more urgent (normal = 2)
+
+class InferenceJobBatch(BaseModel):
+    items: List[InferenceJob]
+
+class InferenceJobAccepted(BaseModel):
+    accepted: int
+    queue_depth: int
+
+class InferenceResult(BaseModel):
+    """Outcome of one inference run, as reported by an inference backend."""
+    report_id: str
+    status: Literal["DONE", "ERROR"]
+    detections: List[dict] = []
+    processing_time_ms: float = 0.0
+    error: Optional[str] = None
+    # Videos only (see worker.video)
+    frames: Optional[List[dict]] = None
+    video_summary: Optional[dict] = None
+    model_version: Optional[str] = None
+
+class InferenceResultBatch(BaseModel):
+    items: List[InferenceResult]
+
+class InferenceResultsApplied(BaseModel):
+    applied: int
+    skipped: List[str] = []  # unknown report ids, or reports that already had a result
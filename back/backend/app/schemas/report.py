@@ -1,6 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, SerializerFunctionWrapHandler, model_serializer
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List
 
 class ReportBase(BaseModel):
     file_path: str
@@ -13,6 +13,20 @@ class ReportResponse(ReportBase):
     status: str
     created_at: datetime
     
+    # Detection summary (set once inference completes)
+    fire_confidence: Optional[float] = None
+    smoke_confidence: Optional[float] = None
+    detection_count: Optional[int] = None
+    processing_time_ms: Optional[float] = None
+    completed_at: Optional[datetime] = None
+    duplicate_of: Optional[str] = None  # report whose inference result this upload reuses
+    thumbnail_path: Optional[str] = None  # under /static/uploads, for list views
+    image_width: Optional[int] = None
+    image_height: Optional[int] = None
+    media_type: str = "image"
+    frame_count: Optional[int] = None  # videos: sampled frames that went through inference
+    first_fire_s: Optional[float] = None  # videos: first sampled timestamp with fire
+    
     class Config:
         from_attributes = True
 
@@ -25,7 +39,59 @@ class BoundingBox(BaseModel):
     class_name: str
     class_id: Optional[int] = None
 
+class FrameDetections(BaseModel):
+    frame_index: int
+    timestamp_s: float
+    detections: List[BoundingBox] = []
+
+class VideoSummary(BaseModel):
+    sampled_frames: int
+    skipped_duplicates: int = 0
+    fire_frames: int = 0
+    first_fire_s: Optional[float] = None
+    last_fire_s: Optional[float] = None
+    peak_fire_s: Optional[float] = None
+    duration_s: float = 0.0
+
 class ReportDetail(ReportResponse):
     detections: List[BoundingBox] = []
     model_version: Optional[str] = None
-    processing_time_ms: Optional[float] = None
+    # Videos only: per sampled frame detections and the temporal summary
+    frames: List[FrameDetections] = []
+    video_summary: Optional[VideoSummary] = None
+
+class ReportListItem(ReportResponse):
+    """
+    GET /reports/ row. The ReportDetail fields are only filled (and only
+    serialized) with include=detections; plain listings keep the
+    ReportResponse shape.
+    """
+    detections: Optional[List[BoundingBox]] = None
+    model_version: Optional[str] = None
+    frames: Optional[List[FrameDetections]] = None
+    video_summary: Optional[VideoSummary] = None
+
+    @model_serializer(mode="wrap")
+    def _omit_detail_fields(self, handler: SerializerFunctionWrapHandler):
+        data = handler(self)
+        if self.detections is None:
+            for field in ("detections", "model_version", "frames", "video_summary"):
+                data.pop(field, None)
+        return data
+
+class BatchUploadError(BaseModel):
+    filename: Optional[str] = None
+    detail: str
+
+class BatchUploadResponse(BaseModel):
+    batch_id: str
+    reports: List[ReportResponse] = []
+    errors: List[BatchUploadError] = []
+
+class ReportTile(BaseModel):
+    """Aggregate of the reports in one geohash cell (map view at low zoom)."""
+    cell: str
+    latitude: float   # cell center
+    longitude: float
+    count: int
+    max_fire_confidence: Optional[float] = None
@@ -0,0 +1,80 @@
+import asyncio
+import itertools
+import logging
+from typing import Awaitable, Callable, Generic, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher(Generic[T]):
+    """
+    Collects queued items into micro-batches for a single consumer.
+
+    A batch is flushed as soon as it holds max_batch_size items, or max_wait_s
+    after its first item arrived, whichever comes first. The handler is awaited
+    before the next batch is collected, so there is never more than one batch
+    in flight (the model is the bottleneck anyway).
+
+    With `priority` (item -> int, lower first), items are dequeued by
+    priority, FIFO within the same priority.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[List[T]], Awaitable[None]],
+        max_batch_size: int,
+        max_wait_s: float,
+        max_queue_size: int = 0,
+        priority: Optional[Callable[[T], int]] = None,
+    ):
+        self.handler = handler
+        self.max_batch_size = max_batch_size
+        self.max_wait_s = max_wait_s
+        self._priority = priority or (lambda item: 0)
+        self._sequence = itertools.count()
+        self._queue: asyncio.PriorityQueue = asyncio.PriorityQueue(maxsize=max_queue_size)
+        self.in_flight = 0  # items of the batch being handled
+
+    def submit_nowait(self, item: T) -> None:
+        """Enqueues an item; raises asyncio.QueueFull when the queue is at capacity."""
+        self._queue.put_nowait((self._priority(item), next(self._sequence), item))
+
+    def has_capacity(self, count: int) -> bool:
+        maxsize = self._queue.maxsize
+        return maxsize <= 0 or self._queue.qsize() + count <= maxsize
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+    async def next_batch(self) -> List[T]:
+        loop = asyncio.get_running_loop()
+        batch = [(await self._queue.get())[-1]]
+        deadline = loop.time() + self.max_wait_s
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self._queue.get_nowait()[-1])
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append((await asyncio.wait_for(self._queue.get(), timeout))[-1])
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def run(self) -> None:
+        """Consumer loop; runs until cancelled."""
+        while True:
+            batch = await self.next_batch()
+            self.in_flight = len(batch)
+            try:
+                await self.handler(batch)
+            except Exception as e:
+                logger.exception("Batch of %d failed: %s", len(batch), e)
+            finally:
+                self.in_flight = 0
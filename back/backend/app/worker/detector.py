@@ -0,0 +1,253 @@
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from PIL import Image, ImageOps
+
+from app.models.sql import ReportStatus
+from app.worker.tiling import decode_reduction, merge_detections, offset_detections, scale_detections, tile_grid
+from app.worker.video import FrameSampler, iter_sampled_frames, temporal_summary
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DetectionResult:
+    report_id: str
+    status: str  # ReportStatus value
+    detections: List[dict] = field(default_factory=list)
+    processing_time_ms: float = 0.0
+    error: Optional[str] = None
+    # Videos: per sampled frame detections and the temporal summary
+    frames: Optional[List[dict]] = None
+    video_summary: Optional[dict] = None
+
+
+class FireDetector:
+    """
+    Resident YOLO model. Loaded once when the worker starts and reused for every
+    batch, instead of a fresh container + model load per image.
+    """
+
+    def __init__(
+        self,
+        model_path: str,
+        fallback_model: str = "yolov8n.pt",
+        tile_min_pixels: int = 0,
+        tile_max_pixels: int = 0,
+        tile_size: int = 640,
+        tile_overlap: int = 128,
+        tile_batch_size: int = 16,
+        tile_iou_threshold: float = 0.5,
+        video_batch_size: int = 16,
+    ):
+        self.model_path = model_path
+        self.fallback_model = fallback_model
+        self.model = None
+        self.model_version: Optional[str] = None
+        # Tiled mode for very large images (0 disables it)
+        self.tile_min_pixels = tile_min_pixels
+        self.tile_max_pixels = tile_max_pixels
+        self.tile_size = tile_size
+        self.tile_overlap = tile_overlap
+        self.tile_batch_size = tile_batch_size
+        self.tile_iou_threshold = tile_iou_threshold
+        self.video_batch_size = video_batch_size
+
+    def load(self) -> None:
+        # Imported here so the API image does not need ultralytics/torch
+        from ultralytics import YOLO
+
+        if os.path.exists(self.model_path):
+            logger.info("Loading custom model from %s", self.model_path)
+            self.model = YOLO(self.model_path)
+            self.model_version = os.path.basename(self.model_path)
+        else:
+            logger.warning("Custom model not found, falling back to %s", self.fallback_model)
+            self.model = YOLO(self.fallback_model)
+            self.model_version = self.fallback_model
+
+    def _to_detections(self, result) -> List[dict]:
+        # Same shape as the Kestra flow output ('class'/'name' keys)
+        return [
+            {
+                "x1": float(box.xyxy[0][0]),
+                "y1": float(box.xyxy[0][1]),
+                "x2": float(box.xyxy[0][2]),
+                "y2": float(box.xyxy[0][3]),
+                "confidence": float(box.conf[0]),
+                "class": int(box.cls[0]),
+                "name": self.model.names[int(box.cls[0])],
+            }
+            for box in result.boxes
+        ]
+
+    def needs_tiling(self, image_path: str) -> bool:
+        """Reads only the image header; True for images at or above tile_min_pixels."""
+        if not self.tile_min_pixels:
+            return False
+        try:
+            with Image.open(image_path) as image:
+                width, height = image.size
+        except Exception:
+            return False
+        return width * height >= self.tile_min_pixels
+
+    def predict_batch(self, report_ids: List[str], image_paths: List[str]) -> List[DetectionResult]:
+        """
+        Runs one batched forward pass over all images. Blocking; call it from a
+        thread. If the batch fails (e.g. one unreadable file) images are retried
+        one by one so a single bad upload does not fail its neighbours.
+        Images large enough for tiled mode are taken out of the batch and run
+        through predict_tiled instead.
+        """
+        tiled = [i for i, path in enumerate(image_paths) if self.needs_tiling(path)]
+        if tiled:
+            results = {i: self.predict_tiled(report_ids[i], image_paths[i]) for i in tiled}
+            rest = [i for i in range(len(image_paths)) if i not in results]
+            if rest:
+                batch = self.predict_batch([report_ids[i] for i in rest], [image_paths[i] for i in rest])
+                results.update(zip(rest, batch))
+            return [results[i] for i in range(len(image_paths))]
+
+        started = time.perf_counter()
+        try:
+            results = self.model(image_paths, verbose=False)
+        except Exception:
+            return [self._predict_one(r, p) for r, p in zip(report_ids, image_paths)]
+
+        per_image_ms = (time.perf_counter() - started) * 1000 / max(len(image_paths), 1)
+        return [
+            DetectionResult(
+                report_id=report_id,
+                status=ReportStatus.DONE.value,
+                detections=self._to_detections(result),
+                processing_time_ms=per_image_ms,
+            )
+            for report_id, result in zip(report_ids, results)
+        ]
+
+    def _load_pixels(self, image_path: str):
+        """
+        Decodes the image once (upright, RGB) into an array; tiles are views
+        of it. PIL decodes JPEG/PNG whole, not region by region, so the frame
+        is resident for the whole tiled pass; tile_max_pixels caps it. JPEGs
+        above the cap are decoded at a reduced DCT scale (1/2 to 1/8, without
+        materializing the full frame) and other formats are rejected.
+        Returns the array and the original pixels per array pixel.
+        """
+        import numpy as np
+
+        with Image.open(image_path) as image:
+            width, height = image.size
+            reduction = decode_reduction(width, height, self.tile_max_pixels)
+            if reduction is None or (reduction > 1 and image.format != "JPEG"):
+                raise ValueError(
+                    f"{width}x{height} image is over the tiled inference limit of {self.tile_max_pixels} pixels"
+                )
+            if reduction > 1:
+                logger.warning("Tiling %dx%d image at 1/%d resolution", width, height, reduction)
+                image.draft("RGB", (width // reduction, height // reduction))
+            scale = width / image.width
+            return np.asarray(ImageOps.exif_transpose(image).convert("RGB")), scale
+
+    def predict_tiled(self, report_id: str, image_path: str) -> DetectionResult:
+        """
+        Tiled inference for very large (e.g. 8K aerial) images: overlapping
+        tile_size tiles at full resolution (reduced past tile_max_pixels), tile_batch_size tiles per forward
+        pass, boxes shifted to image coordinates and merged with NMS across
+        tile borders. Detections come back in the normal single-image format.
+        """
+        started = time.perf_counter()
+        try:
+            pixels, scale = self._load_pixels(image_path)
+            height, width = pixels.shape[:2]
+            tiles = tile_grid(width, height, self.tile_size, self.tile_overlap)
+            detections: List[dict] = []
+            for start in range(0, len(tiles), self.tile_batch_size):
+                chunk = tiles[start:start + self.tile_batch_size]
+                # Ultralytics treats numpy input as BGR
+                crops = [pixels[y:y + h, x:x + w, ::-1] for x, y, w, h in chunk]
+                for (x, y, _, _), result in zip(chunk, self.model(crops, verbose=False)):
+                    detections.extend(offset_detections(self._to_detections(result), x, y))
+            del pixels
+        except Exception as e:
+            logger.error("Tiled inference failed: %s", e, extra={"report_id": report_id})
+            return DetectionResult(report_id=report_id, status=ReportStatus.ERROR.value, error=str(e))
+
+        logger.debug(
+            "Tiled inference: %d tiles, %d raw boxes", len(tiles), len(detections), extra={"report_id": report_id}
+        )
+        return DetectionResult(
+            report_id=report_id,
+            status=ReportStatus.DONE.value,
+            detections=scale_detections(merge_detections(detections, self.tile_iou_threshold), scale),
+            processing_time_ms=(time.perf_counter() - started) * 1000,
+        )
+
+    def predict_video(
+        self, report_id: str, video_path: str, sampler: FrameSampler, fire_threshold: float
+    ) -> DetectionResult:
+        """
+        Streams a video through the model: frames are decoded one at a time,
+        the sampler keeps interval/scene-change frames and drops near-duplicates,
+        and kept frames are inferred video_batch_size at a time. Only one
+        batch of frames is resident at any point.
+
+        detections holds the frame with the highest confidence (the one a single
+        image view should show); every sampled frame is in frames.
+        """
+        started = time.perf_counter()
+        frames: List[dict] = []
+        pending: List[tuple] = []
+
+        def flush() -> None:
+            results = self.model([frame for _, _, frame in pending], verbose=False)
+            for (index, timestamp_s, _), result in zip(pending, results):
+                frames.append({
+                    "frame_index": index,
+                    "timestamp_s": round(timestamp_s, 3),
+                    "detections": self._to_detections(result),
+                })
+            pending.clear()
+
+        try:
+            for sample in iter_sampled_frames(video_path, sampler):
+                pending.append(sample)
+                if len(pending) >= self.video_batch_size:
+                    flush()
+            if pending:
+                flush()
+        except Exception as e:
+            logger.error("Video inference failed: %s", e, extra={"report_id": report_id})
+            return DetectionResult(report_id=report_id, status=ReportStatus.ERROR.value, error=str(e))
+
+        peak = max(frames, key=lambda f: max((d["confidence"] for d in f["detections"]), default=0.0), default=None)
+        logger.info(
+            "Video inference: %d frames, %d near-duplicates skipped", len(frames), sampler.skipped_duplicates,
+            extra={"report_id": report_id},
+        )
+        return DetectionResult(
+            report_id=report_id,
+            status=ReportStatus.DONE.value,
+            detections=peak["detections"] if peak else [],
+            processing_time_ms=(time.perf_counter() - started) * 1000,
+            frames=frames,
+            video_summary=temporal_summary(frames, fire_threshold, sampler.skipped_duplicates),
+        )
+
+    def _predict_one(self, report_id: str, image_path: str) -> DetectionResult:
+        started = time.perf_counter()
+        try:
+            result = self.model(image_path, verbose=False)[0]
+        except Exception as e:
+            logger.error("Inference failed: %s", e, extra={"report_id": report_id})
+            return DetectionResult(report_id=report_id, status=ReportStatus.ERROR.value, error=str(e))
+        return DetectionResult(
+            report_id=report_id,
+            status=ReportStatus.DONE.value,
+            detections=self._to_detections(result),
+            processing_time_ms=(time.perf_counter() - started) * 1000,
+        )
@@ -0,0 +1,143 @@
+"""
+Resident inference worker.
+
+Loads the YOLO model once at startup, accepts jobs over HTTP into an in-memory
+queue and processes them in micro-batches (WORKER_MAX_BATCH_SIZE /
+WORKER_MAX_WAIT_MS). Results are written with core.results.apply_results, the
+same code path the Kestra flows reach through POST /internal/results:bulk.
+
+Run with: uvicorn app.worker.main:app --host 0.0.0.0 --port 8001
+"""
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from dataclasses import asdict
+from datetime import datetime
+from typing import List
+
+from fastapi import FastAPI, HTTPException, status
+
+from app.core.config import settings
+from app.core.logs import setup_logging, stop_logging
+from app.core.results import apply_results
+from app.db.session import AsyncSessionLocal, close_mongo_db, init_mongo_db
+from app.schemas.inference import InferenceJob, InferenceJobAccepted, InferenceJobBatch, InferenceResult
+from app.worker.batcher import MicroBatcher
+from app.worker.detector import DetectionResult, FireDetector
+from app.worker.video import FrameSampler
+
+UPLOAD_DIR = os.getenv("SHARED_UPLOADS_DIR", "/shared-data/uploads")
+
+logger = logging.getLogger(__name__)
+log_listener = setup_logging(settings.LOG_LEVEL, settings.LOG_FORMAT)
+
+detector = FireDetector(
+    settings.MODEL_PATH,
+    settings.FALLBACK_MODEL,
+    tile_min_pixels=settings.TILED_INFERENCE_MIN_PIXELS,
+    tile_max_pixels=settings.TILED_INFERENCE_MAX_PIXELS,
+    tile_size=settings.TILE_SIZE,
+    tile_overlap=settings.TILE_OVERLAP,
+    tile_batch_size=settings.TILE_BATCH_SIZE,
+    tile_iou_threshold=settings.TILE_NMS_IOU_THRESHOLD,
+    video_batch_size=settings.VIDEO_BATCH_SIZE,
+)
+
+
+async def store_results(results: List[DetectionResult]) -> None:
+    """
+    Writes a batch of results through core.results: one insert_many on
+    inference_logs, then one bulk UPDATE on reports. Reports that already have
+    a result (e.g. a job delivered twice) are left untouched.
+    """
+    model_version = detector.model_version or "yolov8"
+    async with AsyncSessionLocal() as db:
+        await apply_results(db, [InferenceResult(**asdict(r), model_version=model_version) for r in results])
+
+
+def frame_sampler(job: InferenceJob) -> FrameSampler:
+    """Sampler for a video job: its upload options over the VIDEO_* settings."""
+    return FrameSampler(
+        mode=job.options.mode,
+        interval_s=job.options.interval_s or settings.VIDEO_SAMPLE_INTERVAL_S,
+        check_interval_s=settings.VIDEO_SCENE_CHECK_INTERVAL_S,
+        scene_threshold=settings.VIDEO_SCENE_THRESHOLD,
+        dedup_threshold=settings.VIDEO_DEDUP_THRESHOLD,
+        max_frames=min(job.options.max_frames or settings.VIDEO_MAX_FRAMES, settings.VIDEO_MAX_FRAMES),
+    )
+
+
+async def process_batch(jobs: List[InferenceJob]) -> None:
+    images = [job for job in jobs if job.media_type == "image"]
+    videos = [job for job in jobs if job.media_type == "video"]
+    started = time.perf_counter()
+    results = []
+    if images:
+        results = await asyncio.to_thread(
+            detector.predict_batch,
+            [job.report_id for job in images],
+            [os.path.join(UPLOAD_DIR, job.file_path) for job in images],
+        )
+    # Each video is already a stream of frame batches of its own
+    for job in videos:
+        results.append(await asyncio.to_thread(
+            detector.predict_video,
+            job.report_id,
+            os.path.join(UPLOAD_DIR, job.file_path),
+            frame_sampler(job),
+            settings.FIRE_CONFIDENCE_THRESHOLD,
+        ))
+    await store_results(results)
+    logger.info(
+        "Processed batch of %d images, %d videos", len(images), len(videos),
+        extra={"duration_ms": round((time.perf_counter() - started) * 1000, 2)},
+    )
+
+
+batcher: MicroBatcher[InferenceJob] = MicroBatcher(
+    process_batch,
+    max_batch_size=settings.WORKER_MAX_BATCH_SIZE,
+    max_wait_s=settings.WORKER_MAX_WAIT_MS / 1000,
+    max_queue_size=settings.WORKER_MAX_QUEUE_SIZE,
+    priority=lambda job: job.priority,
+)
+# Jobs accepted before this were lost with the previous process's queue (core.reaper)
+started_at = datetime.utcnow()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    logger.info("Loading model")
+    await asyncio.to_thread(detector.load)
+    await init_mongo_db()
+    consumer = asyncio.create_task(batcher.run())
+    yield
+    consumer.cancel()
+    close_mongo_db()
+    stop_logging(log_listener)
+
+
+app = FastAPI(title="Wildfire Inference Worker", lifespan=lifespan)
+
+
+@app.post("/jobs", response_model=InferenceJobAccepted, status_code=status.HTTP_202_ACCEPTED)
+async def submit_jobs(batch: InferenceJobBatch):
+    """Queues jobs for the micro-batch consumer. All-or-nothing: 503 when the queue is full."""
+    if not batcher.has_capacity(len(batch.items)):
+        raise HTTPException(status_code=503, detail="Inference queue is full")
+    for job in batch.items:
+        batcher.submit_nowait(job)
+    return InferenceJobAccepted(accepted=len(batch.items), queue_depth=batcher.qsize())
+
+
+@app.get("/health")
+def health():
+    return {
+        "status": "ok" if detector.model is not None else "loading",
+        "model_version": detector.model_version,
+        "queue_depth": batcher.qsize(),
+        "in_flight": batcher.in_flight,
+        "started_at": started_at.isoformat(),
+    }
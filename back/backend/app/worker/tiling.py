@@ -0,0 +1,86 @@
+import math
+from typing import Dict, List, Optional, Tuple
+
+# Pure helpers for tiled inference: where to cut tiles, and how to fold the
+# per-tile boxes back into one detection list. No numpy/torch so they can be
+# unit tested (and reasoned about) without the model stack.
+
+Tile = Tuple[int, int, int, int]  # (x, y, width, height) in image pixels
+
+
+def tile_origins(length: int, tile_size: int, overlap: int) -> List[int]:
+    """Start offsets along one axis; the last tile is flush with the far edge."""
+    if length <= tile_size:
+        return [0]
+    stride = max(tile_size - overlap, 1)
+    origins = list(range(0, length - tile_size, stride))
+    origins.append(length - tile_size)
+    return origins
+
+
+def tile_grid(width: int, height: int, tile_size: int, overlap: int) -> List[Tile]:
+    """Overlapping tiles covering the whole image, row by row."""
+    return [
+        (x, y, min(tile_size, width), min(tile_size, height))
+        for y in tile_origins(height, tile_size, overlap)
+        for x in tile_origins(width, tile_size, overlap)
+    ]
+
+
+def decode_reduction(width: int, height: int, max_pixels: int) -> Optional[int]:
+    """
+    Smallest JPEG DCT scale factor (1, 2, 4 or 8) whose decoded image has at
+    most max_pixels pixels, or None when even 1/8 is too large. 0 = no cap.
+    """
+    for factor in (1, 2, 4, 8):
+        if not max_pixels or math.ceil(width / factor) * math.ceil(height / factor) <= max_pixels:
+            return factor
+    return None
+
+
+def offset_detections(detections: List[dict], x: int, y: int) -> List[dict]:
+    """Moves tile-local boxes into full-image coordinates."""
+    return [
+        {**d, "x1": d["x1"] + x, "y1": d["y1"] + y, "x2": d["x2"] + x, "y2": d["y2"] + y}
+        for d in detections
+    ]
+
+
+def scale_detections(detections: List[dict], factor: float) -> List[dict]:
+    """Moves boxes from a reduced decode back to original image pixels."""
+    if factor == 1:
+        return detections
+    return [
+        {**d, "x1": d["x1"] * factor, "y1": d["y1"] * factor, "x2": d["x2"] * factor, "y2": d["y2"] * factor}
+        for d in detections
+    ]
+
+
+def iou(a: dict, b: dict) -> float:
+    inter_w = min(a["x2"], b["x2"]) - max(a["x1"], b["x1"])
+    inter_h = min(a["y2"], b["y2"]) - max(a["y1"], b["y1"])
+    if inter_w <= 0 or inter_h <= 0:
+        return 0.0
+    intersection = inter_w * inter_h
+    area_a = (a["x2"] - a["x1"]) * (a["y2"] - a["y1"])
+    area_b = (b["x2"] - b["x1"]) * (b["y2"] - b["y1"])
+    return intersection / (area_a + area_b - intersection)
+
+
+def merge_detections(detections: List[dict], iou_threshold: float) -> List[dict]:
+    """
+    Per-class greedy NMS over boxes from all tiles: an object seen by two
+    overlapping tiles is kept once, at its most confident box.
+    """
+    by_class: Dict[object, List[dict]] = {}
+    for d in detections:
+        by_class.setdefault(d.get("class", d.get("name")), []).append(d)
+
+    kept: List[dict] = []
+    for boxes in by_class.values():
+        survivors: List[dict] = []
+        for box in sorted(boxes, key=lambda d: d["confidence"], reverse=True):
+            if all(iou(box, other) < iou_threshold for other in survivors):
+                survivors.append(box)
+        kept.extend(survivors)
+    return sorted(kept, key=lambda d: d["confidence"], reverse=True)
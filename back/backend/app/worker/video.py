@@ -0,0 +1,123 @@
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from app.core.detections import summarize_detections
+
+# Frame sampling for video ingestion. Frames are compared through a 64-bit
+# difference hash (dHash) of a 9x8 grayscale thumbnail: near-identical frames
+# differ in a few bits, a scene change flips many. The sampler itself is pure
+# Python; decoding (OpenCV, imported lazily) happens in iter_sampled_frames.
+
+INTERVAL = "interval"
+SCENE = "scene"
+
+
+def dhash(gray: Sequence[Sequence[int]]) -> int:
+    """64-bit hash of a 9 (wide) x 8 (high) grayscale image: one bit per horizontal gradient."""
+    bits = 0
+    for row in gray:
+        for left, right in zip(row[:-1], row[1:]):
+            bits = (bits << 1) | (1 if left > right else 0)
+    return bits
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+@dataclass
+class FrameSampler:
+    """
+    Decides which decoded frames go to inference.
+
+    - interval: one candidate every interval_s seconds.
+    - scene: candidates are checked at check_interval_s; one is kept when its
+      hash differs from the last kept frame by at least scene_threshold bits.
+
+    In both modes a candidate within dedup_threshold bits of the last kept
+    frame is skipped as a near-duplicate (static camera, nothing changed), and
+    sampling stops after max_frames kept frames.
+    """
+    mode: str = INTERVAL
+    interval_s: float = 1.0
+    check_interval_s: float = 0.2
+    scene_threshold: int = 12
+    dedup_threshold: int = 4
+    max_frames: int = 600
+    kept: int = 0
+    skipped_duplicates: int = 0
+    _next_check_s: float = 0.0
+    _last_hash: Optional[int] = field(default=None, repr=False)
+
+    @property
+    def done(self) -> bool:
+        return self.kept >= self.max_frames
+
+    def wants(self, timestamp_s: float) -> bool:
+        """True if the frame at this timestamp should be decoded and offered."""
+        return not self.done and timestamp_s >= self._next_check_s
+
+    def offer(self, timestamp_s: float, frame_hash: int) -> bool:
+        """Registers a decoded candidate; True if it should be kept."""
+        step = self.interval_s if self.mode == INTERVAL else self.check_interval_s
+        self._next_check_s = timestamp_s + step
+        if self._last_hash is not None:
+            distance = hamming(frame_hash, self._last_hash)
+            if distance <= self.dedup_threshold:
+                self.skipped_duplicates += 1
+                return False
+            if self.mode == SCENE and distance < self.scene_threshold:
+                return False
+        self._last_hash = frame_hash
+        self.kept += 1
+        return True
+
+
+def iter_sampled_frames(video_path: str, sampler: FrameSampler) -> Iterator[Tuple[int, float, object]]:
+    """
+    Yields (frame_index, timestamp_s, BGR frame) for the frames the sampler keeps.
+    Decodes incrementally with OpenCV: frames between candidates are only
+    grabbed (demuxed/decoded, never converted), so memory stays at one frame.
+    """
+    import cv2
+
+    capture = cv2.VideoCapture(video_path)
+    if not capture.isOpened():
+        raise ValueError(f"Could not open video {video_path}")
+    fps = capture.get(cv2.CAP_PROP_FPS) or 25.0
+    index = -1
+    try:
+        while not sampler.done and capture.grab():
+            index += 1
+            timestamp_s = index / fps
+            if not sampler.wants(timestamp_s):
+                continue
+            ok, frame = capture.retrieve()
+            if not ok:
+                continue
+            gray = cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), (9, 8), interpolation=cv2.INTER_AREA)
+            if sampler.offer(timestamp_s, dhash(gray.tolist())):
+                yield index, timestamp_s, frame
+    finally:
+        capture.release()
+
+
+def temporal_summary(frames: List[dict], fire_threshold: float, skipped_duplicates: int) -> dict:
+    """
+    Per-video summary of the per-frame results: when fire was first/last seen
+    and where its confidence peaked.
+    """
+    def fire_confidence(frame: dict) -> float:
+        return summarize_detections(frame["detections"])["fire_confidence"]
+
+    fire_frames = [f for f in frames if fire_confidence(f) >= fire_threshold]
+    peak = max(frames, key=fire_confidence, default=None)
+    return {
+        "sampled_frames": len(frames),
+        "skipped_duplicates": skipped_duplicates,
+        "fire_frames": len(fire_frames),
+        "first_fire_s": fire_frames[0]["timestamp_s"] if fire_frames else None,
+        "last_fire_s": fire_frames[-1]["timestamp_s"] if fire_frames else None,
+        "peak_fire_s": peak["timestamp_s"] if peak is not None and fire_confidence(peak) > 0 else None,
+        "duration_s": frames[-1]["timestamp_s"] if frames else 0.0,
+    }
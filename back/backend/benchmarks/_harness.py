@@ -0,0 +1,173 @@
+"""
+Shared setup for the benchmark scripts.
+
+Runs the real FastAPI app in-process (httpx ASGITransport) against a throwaway
+SQLite file and upload directory, so numbers are reproducible without Docker.
+Point DATABASE_URL / MONGO_URL at containers to benchmark against Postgres and
+a real Mongo instead. Import this module before anything from `app`.
+"""
+import asyncio
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+BENCH_DIR = tempfile.mkdtemp(prefix="wildfire-bench-")
+
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{os.path.join(BENCH_DIR, 'bench.db')}")
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("KESTRA_USER", "bench")
+os.environ.setdefault("KESTRA_PASSWORD", "bench")
+os.environ.setdefault("SHARED_UPLOADS_DIR", os.path.join(BENCH_DIR, "uploads"))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+# Per-user rate limits and admission control would reject most of the benchmark
+# traffic (one user, no real inference draining the backlog). Set these in the
+# environment to benchmark with the protections on.
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("ADMISSION_MAX_PROCESSING", "0")
+os.environ.setdefault("ADMISSION_MAX_QUEUE_DEPTH", "0")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx  # noqa: E402
+from httpx import AsyncClient, ASGITransport  # noqa: E402
+from PIL import Image  # noqa: E402
+
+from app.core import kestra_client, security  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.db import session as db_session  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.sql import User  # noqa: E402
+
+
+async def setup_app(username: str = "bench") -> dict:
+    """Creates the schema and a user; returns auth headers for that user."""
+    db_session.engine.echo = False
+    await db_session.init_sql_db()
+    async with db_session.AsyncSessionLocal() as db:
+        db.add(User(username=username, hashed_password=security.get_password_hash("bench")))
+        await db.commit()
+    token = security.create_access_token(subject=username)
+    return {"Authorization": f"Bearer {token}"}
+
+
+def client() -> AsyncClient:
+    return AsyncClient(transport=ASGITransport(app=app), base_url="http://bench", timeout=60)
+
+
+def make_images(count: int, size: int) -> List[bytes]:
+    """Distinct JPEGs, so uploads are not all answered by the dedup path."""
+    images = []
+    for i in range(count):
+        image = Image.effect_noise((size, size), 64).convert("RGB")
+        image.putpixel((0, 0), (i % 256, (i // 256) % 256, 0))
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=90)
+        images.append(buffer.getvalue())
+    return images
+
+
+def fake_kestra(latency_s: float) -> None:
+    """Answers every Kestra call with a fake execution id after `latency_s`."""
+    async def handler(request: httpx.Request):
+        await asyncio.sleep(latency_s)
+        return httpx.Response(200, json={"id": "bench-execution"})
+
+    kestra_client._client = httpx.AsyncClient(
+        transport=httpx.MockTransport(handler),
+        limits=httpx.Limits(max_connections=20),
+    )
+
+
+async def setup_mongo(mode: str) -> None:
+    """
+    "local": the Mongo at MONGO_URL (e.g. a container), through the app's own client.
+    "mock": in-memory mongomock-motor (pip install mongomock-motor).
+    """
+    if mode == "local":
+        await db_session.init_mongo_db()
+    elif mode == "mock":
+        from beanie import init_beanie
+        from mongomock_motor import AsyncMongoMockClient
+
+        from app.models.nosql import InferenceLog
+
+        db_session.mongo_client = AsyncMongoMockClient()
+        await init_beanie(
+            database=db_session.mongo_client[settings.MONGO_DB_NAME],
+            document_models=[InferenceLog],
+        )
+    else:
+        raise ValueError(f"Unknown mongo mode {mode!r}")
+
+
+def percentile(sorted_samples: List[float], q: float) -> float:
+    """Nearest-rank percentile of already sorted samples (q in 0..100)."""
+    if not sorted_samples:
+        return 0.0
+    rank = max(1, -(-len(sorted_samples) * q // 100))
+    return sorted_samples[int(rank) - 1]
+
+
+def summarize(latencies: List[float], errors: int, elapsed_s: float) -> Dict:
+    """Latency percentiles (ms), throughput and error rate for one operation."""
+    samples = sorted(latencies)
+    count = len(samples)
+    return {
+        "requests": count,
+        "errors": errors,
+        "error_rate": round(errors / count, 4) if count else 0.0,
+        "throughput_rps": round(count / elapsed_s, 2) if elapsed_s else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(samples, 50) * 1000, 2),
+            "p95": round(percentile(samples, 95) * 1000, 2),
+            "p99": round(percentile(samples, 99) * 1000, 2),
+            "mean": round(sum(samples) / count * 1000, 2) if count else 0.0,
+            "max": round(samples[-1] * 1000, 2) if count else 0.0,
+        },
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(name: str, config: Dict, results: Dict, output: Optional[str] = None) -> str:
+    """
+    Saves a run as JSON (default: benchmarks/results/<name>-<commit>-<timestamp>.json)
+    so runs from different commits can be compared with compare_results.py.
+    """
+    commit = git_commit()
+    started = datetime.now(timezone.utc)
+    if output is None:
+        results_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+        os.makedirs(results_dir, exist_ok=True)
+        output = os.path.join(results_dir, f"{name}-{commit or 'nogit'}-{started:%Y%m%dT%H%M%S}.json")
+    document = {
+        "benchmark": name,
+        "commit": commit,
+        "timestamp": started.isoformat(timespec="seconds"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": db_session.engine.dialect.name,
+        },
+        "config": config,
+        "results": results,
+    }
+    with open(output, "w") as f:
+        json.dump(document, f, indent=2)
+    return output
@@ -0,0 +1,173 @@
+"""
+Mixed API load: login, upload, list and detail traffic from concurrent users.
+
+Each virtual user loops for --duration seconds, picking an operation by the
+--mix weights, and every request's latency is recorded per operation. A fake
+Kestra (fixed latency) drains the outbox in the background the way the
+lifespan worker would. Prints p50/p95/p99 latency, throughput and error rate
+per operation and saves the run as JSON (see compare_results.py). Requests
+refused by rate limiting or admission control (429/503) are counted as
+"rejected", not errors; the harness turns both off unless configured.
+
+Stand-ins: SQLite by default, or DATABASE_URL=postgresql+asyncpg://... for a
+Postgres container; --mongo mock (mongomock-motor) or local (MONGO_URL).
+With --mongo none, detail requests are dropped from the mix.
+
+Usage:
+    python benchmarks/bench_api_load.py --users 32 --duration 60 \\
+        --mix login=1,upload=2,list=5,detail=5 --mongo mock
+"""
+import argparse
+import asyncio
+import random
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+import _harness  # noqa: F401  (must be imported before app modules)
+
+from app.core import outbox
+
+OPERATIONS = ("login", "upload", "list", "detail")
+
+
+def parse_mix(value: str) -> Dict[str, int]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"unknown operation {name!r} (expected one of {OPERATIONS})")
+        mix[name] = int(weight or 1)
+    return mix
+
+
+class LoadRun:
+    def __init__(self, client, headers: Dict[str, str], images: List[bytes], list_limit: int):
+        self.client = client
+        self.headers = headers
+        self.images = images
+        self.list_limit = list_limit
+        self.report_ids: List[str] = []
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.rejected: Dict[str, int] = defaultdict(int)  # 429/503: rate limit or admission control
+        self.status_codes: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+
+    async def login(self):
+        return await self.client.post("/auth/token", data={"username": "bench", "password": "bench"})
+
+    async def upload(self):
+        payload = random.choice(self.images)
+        response = await self.client.post(
+            "/files/upload", headers=self.headers, files={"file": ("bench.jpg", payload, "image/jpeg")}
+        )
+        if response.status_code == 202:
+            self.report_ids.append(response.json()["id"])
+        return response
+
+    async def list(self):
+        return await self.client.get(f"/reports/?limit={self.list_limit}", headers=self.headers)
+
+    async def detail(self):
+        return await self.client.get(f"/reports/{random.choice(self.report_ids)}", headers=self.headers)
+
+    async def request(self, operation: str) -> None:
+        started = time.perf_counter()
+        try:
+            response = await getattr(self, operation)()
+            status_code = response.status_code
+        except Exception:
+            status_code = 0
+        self.latencies[operation].append(time.perf_counter() - started)
+        self.status_codes[operation][status_code] += 1
+        if status_code in (429, 503):
+            self.rejected[operation] += 1
+        elif not 200 <= status_code < 400:
+            self.errors[operation] += 1
+
+    async def user(self, mix: Dict[str, int], deadline: float) -> None:
+        names, weights = list(mix), list(mix.values())
+        while time.perf_counter() < deadline:
+            operation = random.choices(names, weights)[0]
+            if operation == "detail" and not self.report_ids:
+                operation = "upload"
+            await self.request(operation)
+
+
+async def main(args):
+    random.seed(args.seed)
+    headers = await _harness.setup_app()
+    mix = dict(args.mix)
+    if args.mongo == "none":
+        mix.pop("detail", None)
+    else:
+        await _harness.setup_mongo(args.mongo)
+    if not mix:
+        raise SystemExit("Nothing to run: the mix is empty")
+
+    _harness.fake_kestra(args.kestra_latency_ms / 1000)
+    images = _harness.make_images(args.distinct_images, args.image_size)
+    outbox_stop = asyncio.Event()
+    outbox_task = asyncio.create_task(outbox.run_outbox_worker(outbox_stop))
+
+    async with _harness.client() as client:
+        run = LoadRun(client, headers, images, args.list_limit)
+        if args.warmup:
+            warmup_deadline = time.perf_counter() + args.warmup
+            await asyncio.gather(*(run.user(mix, warmup_deadline) for _ in range(args.users)))
+            report_ids = run.report_ids
+            run = LoadRun(client, headers, images, args.list_limit)
+            run.report_ids = report_ids
+
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(*(run.user(mix, deadline) for _ in range(args.users)))
+        elapsed = time.perf_counter() - started
+
+    outbox_stop.set()
+    await outbox_task
+
+    operations = {
+        name: {
+            **_harness.summarize(run.latencies[name], run.errors[name], elapsed),
+            "rejected": run.rejected[name],
+            "status_codes": {str(code): n for code, n in sorted(run.status_codes[name].items())},
+        }
+        for name in mix
+    }
+    total = {
+        **_harness.summarize(
+            [s for samples in run.latencies.values() for s in samples], sum(run.errors.values()), elapsed
+        ),
+        "rejected": sum(run.rejected.values()),
+    }
+
+    print(f"{args.users} users, {elapsed:.1f}s, database={_harness.db_session.engine.dialect.name}, mongo={args.mongo}")
+    print(f"{'operation':>10} {'requests':>9} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7} {'rejected':>9}")
+    for name, result in list(operations.items()) + [("total", total)]:
+        latency = result["latency_ms"]
+        print(
+            f"{name:>10} {result['requests']:>9} {result['throughput_rps']:>8.1f} {latency['p50']:>8.1f} "
+            f"{latency['p95']:>8.1f} {latency['p99']:>8.1f} {result['error_rate']:>7.2%} {result['rejected']:>9}"
+        )
+
+    config = {**vars(args), "mix": mix}
+    results = {"elapsed_s": round(elapsed, 2), "operations": operations, "total": total}
+    path = _harness.write_results("api_load", config, results, args.output)
+    print(f"Saved {path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=16, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="unmeasured seconds before the run")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("login=1,upload=2,list=5,detail=5"))
+    parser.add_argument("--mongo", choices=("none", "mock", "local"), default="none")
+    parser.add_argument("--list-limit", type=int, default=50)
+    parser.add_argument("--image-size", type=int, default=640, help="uploaded JPEG side in pixels")
+    parser.add_argument("--distinct-images", type=int, default=64)
+    parser.add_argument("--kestra-latency-ms", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="JSON results path (default: benchmarks/results/)")
+    asyncio.run(main(parser.parse_args()))
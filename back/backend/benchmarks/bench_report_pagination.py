@@ -0,0 +1,90 @@
+"""
+OFFSET vs keyset (cursor) pagination on GET /reports/.
+
+Seeds one user with N reports, then times a page fetch at increasing depths
+with `skip=<depth>` and with the equivalent `cursor`. Keyset latency should
+stay flat while OFFSET grows with depth.
+
+Usage:
+    python benchmarks/bench_report_pagination.py --reports 200000 --limit 50
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import _harness  # noqa: F401  (must be imported before app modules)
+from sqlalchemy import desc, insert, select
+
+from app.core.pagination import encode_cursor
+from app.db.session import AsyncSessionLocal
+from app.models.sql import Report, ReportStatus, User
+
+
+async def seed(username: str, count: int) -> None:
+    async with AsyncSessionLocal() as db:
+        user_id = (await db.execute(select(User.id).where(User.username == username))).scalar_one()
+        base = datetime(2026, 1, 1)
+        chunk = 10000
+        for offset in range(0, count, chunk):
+            rows = [
+                {
+                    "id": str(uuid.uuid4()),
+                    "user_id": user_id,
+                    "file_path": "bench.jpg",
+                    "status": ReportStatus.DONE.value,
+                    "created_at": base + timedelta(seconds=i),
+                }
+                for i in range(offset, min(offset + chunk, count))
+            ]
+            await db.execute(insert(Report), rows)
+        await db.commit()
+
+
+async def cursor_at(depth: int) -> str:
+    """Cursor pointing just before the row at `depth` (what a client would hold)."""
+    async with AsyncSessionLocal() as db:
+        row = (await db.execute(
+            select(Report.created_at, Report.id)
+            .order_by(desc(Report.created_at), desc(Report.id))
+            .offset(depth - 1)
+            .limit(1)
+        )).one()
+    return encode_cursor(row.created_at, row.id)
+
+
+async def timed_get(client, headers, url: str, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        r = await client.get(url, headers=headers)
+        r.raise_for_status()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+async def main(args):
+    headers = await _harness.setup_app()
+    print(f"Seeding {args.reports} reports...")
+    await seed("bench", args.reports)
+
+    depths = [d for d in (0, 1000, 10000, 50000, 100000, 150000, 190000) if d < args.reports]
+    print(f"{'depth':>8} {'offset ms':>10} {'cursor ms':>10}")
+    async with _harness.client() as client:
+        for depth in depths:
+            offset_ms = await timed_get(client, headers, f"/reports/?limit={args.limit}&skip={depth}", args.repeat)
+            cursor_url = f"/reports/?limit={args.limit}"
+            if depth:
+                cursor_url += f"&cursor={await cursor_at(depth)}"
+            cursor_ms = await timed_get(client, headers, cursor_url, args.repeat)
+            print(f"{depth:>8} {offset_ms:>10.2f} {cursor_ms:>10.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reports", type=int, default=200000)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    asyncio.run(main(parser.parse_args()))
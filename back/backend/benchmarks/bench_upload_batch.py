@@ -0,0 +1,110 @@
+"""
+Single-file vs batch upload throughput.
+
+Measures images/sec and requests/sec for N images uploaded through
+POST /files/upload (with bounded client concurrency) versus
+POST /files/upload/batch, then the outbox dispatch cost for both shapes
+against a fake Kestra with a fixed per-request latency.
+
+Usage:
+    python benchmarks/bench_upload_batch.py --images 400 --batch-size 50
+"""
+import argparse
+import asyncio
+import time
+from typing import List
+
+import _harness  # noqa: F401  (must be imported before app modules)
+from sqlalchemy import update
+
+from app.core import kestra_client, outbox
+from app.db.session import AsyncSessionLocal
+from app.models.sql import FlowTrigger, FlowTriggerStatus
+
+
+async def bench_single(client, headers, images: List[bytes], concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with semaphore:
+            r = await client.post(
+                "/files/upload",
+                headers=headers,
+                files={"file": (f"frame{i}.jpg", images[i], "image/jpeg")},
+            )
+            r.raise_for_status()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(len(images))))
+    return time.perf_counter() - started
+
+
+async def bench_batch(client, headers, images: List[bytes], batch_size: int) -> float:
+    started = time.perf_counter()
+    for offset in range(0, len(images), batch_size):
+        files = [
+            ("files", (f"frame{i}.jpg", images[i], "image/jpeg"))
+            for i in range(offset, min(offset + batch_size, len(images)))
+        ]
+        r = await client.post("/files/upload/batch", headers=headers, files=files)
+        r.raise_for_status()
+    return time.perf_counter() - started
+
+
+async def bench_dispatch(latency_s: float) -> float:
+    """Drains every PENDING trigger through a fake Kestra; returns elapsed seconds."""
+    _harness.fake_kestra(latency_s)
+    started = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        while await outbox.dispatch_due_triggers(db):
+            pass
+    elapsed = time.perf_counter() - started
+    await kestra_client.close_client()
+    return elapsed
+
+
+async def reset_outbox(only_batched: bool):
+    async with AsyncSessionLocal() as db:
+        condition = FlowTrigger.batch_id.is_not(None) if only_batched else FlowTrigger.batch_id.is_(None)
+        await db.execute(
+            update(FlowTrigger).where(condition).values(status=FlowTriggerStatus.PENDING.value)
+        )
+        await db.execute(
+            update(FlowTrigger).where(~condition).values(status=FlowTriggerStatus.SENT.value)
+        )
+        await db.commit()
+
+
+async def main(args):
+    headers = await _harness.setup_app()
+    # Distinct decodable images for both runs: repeated bytes would be answered
+    # by content-hash dedup without enqueuing any inference
+    images = _harness.make_images(2 * args.images, args.image_size)
+
+    async with _harness.client() as client:
+        single_s = await bench_single(client, headers, images[:args.images], args.concurrency)
+        batch_s = await bench_batch(client, headers, images[args.images:], args.batch_size)
+
+    batch_requests = -(-args.images // args.batch_size)
+    print(f"Uploads: {args.images} images of {args.image_size}x{args.image_size} px")
+    print(f"  single : {args.images / single_s:8.1f} images/s  {args.images / single_s:8.1f} req/s  ({single_s:.2f}s)")
+    print(f"  batch  : {args.images / batch_s:8.1f} images/s  {batch_requests / batch_s:8.1f} req/s  ({batch_s:.2f}s)")
+    print(f"  speedup: {single_s / batch_s:.1f}x images/s")
+
+    await reset_outbox(only_batched=False)
+    single_dispatch_s = await bench_dispatch(args.kestra_latency_ms / 1000)
+    await reset_outbox(only_batched=True)
+    batch_dispatch_s = await bench_dispatch(args.kestra_latency_ms / 1000)
+    print(f"Outbox dispatch ({args.kestra_latency_ms} ms fake Kestra latency):")
+    print(f"  single : {single_dispatch_s:.2f}s")
+    print(f"  grouped: {batch_dispatch_s:.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=400)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--image-size", type=int, default=640, help="uploaded JPEG side in pixels")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--kestra-latency-ms", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,60 @@
+"""
+Compares two saved benchmark runs (JSON written by bench_api_load.py).
+
+Prints per-operation p50/p95/p99 latency, throughput and error-rate deltas of
+CURRENT against BASELINE, and exits with status 1 when any operation's p95
+grew by more than --max-regression percent or its error rate went up, so it
+can gate a CI job.
+
+Usage:
+    python benchmarks/compare_results.py results/api_load-abc123-....json results/api_load-def456-....json
+"""
+import argparse
+import json
+import sys
+
+
+def load(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def change(before: float, after: float) -> str:
+    if not before:
+        return "   n/a"
+    return f"{(after - before) / before:+6.1%}"
+
+
+def main(args) -> int:
+    baseline, current = load(args.baseline), load(args.current)
+    print(f"baseline {baseline.get('commit')} ({baseline['timestamp']})  vs  current {current.get('commit')} ({current['timestamp']})")
+    print(f"{'operation':>10} {'metric':>8} {'baseline':>10} {'current':>10} {'change':>8}")
+
+    regressions = []
+    before_ops = {**baseline["results"]["operations"], "total": baseline["results"]["total"]}
+    after_ops = {**current["results"]["operations"], "total": current["results"]["total"]}
+    for name in [name for name in before_ops if name in after_ops]:
+        before, after = before_ops[name], after_ops[name]
+        rows = [(f"{q} ms", before["latency_ms"][q], after["latency_ms"][q]) for q in ("p50", "p95", "p99")]
+        rows.append(("rps", before["throughput_rps"], after["throughput_rps"]))
+        rows.append(("errors", before["error_rate"], after["error_rate"]))
+        for metric, b, a in rows:
+            print(f"{name:>10} {metric:>8} {b:>10.2f} {a:>10.2f} {change(b, a):>8}")
+
+        p95_before, p95_after = before["latency_ms"]["p95"], after["latency_ms"]["p95"]
+        if p95_before and (p95_after - p95_before) / p95_before * 100 > args.max_regression:
+            regressions.append(f"{name}: p95 {p95_before:.1f} -> {p95_after:.1f} ms")
+        if after["error_rate"] > before["error_rate"]:
+            regressions.append(f"{name}: error rate {before['error_rate']:.2%} -> {after['error_rate']:.2%}")
+
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--max-regression", type=float, default=10.0, help="allowed p95 growth, percent")
+    sys.exit(main(parser.parse_args()))
@@ -26,7 +26,8 @@ from app.main import app
 from app.db.session import get_db, Base
 from app.models.sql import User
 from app.core import security
-from app.api.deps import get_current_user
+from app.api.deps import get_current_user, clear_user_cache
+from app.core import admission, ratelimit
 
 # Create temporary SQLite file for tests (more robust than :memory:)
 _test_db_file = os.path.join(tempfile.gettempdir(), "test_wildfire.db")
@@ -61,6 +62,24 @@ async def setup_test_database():
         os.remove(_test_db_file)
 
 
+@pytest.fixture(autouse=True)
+def reset_user_cache():
+    """Users are rolled back after each test, so cached snapshots must go too."""
+    clear_user_cache()
+    yield
+    clear_user_cache()
+
+
+@pytest_asyncio.fixture(autouse=True)
+async def reset_rate_limits():
+    """Buckets and backlog counts are per process; start every test from empty."""
+    await ratelimit.close_backend()
+    admission.reset()
+    yield
+    await ratelimit.close_backend()
+    admission.reset()
+
+
 @pytest_asyncio.fixture(scope="function")
 async def db_session(setup_test_database) -> AsyncGenerator[AsyncSession, None]:
     """
@@ -149,7 +168,7 @@ def mock_kestra_trigger(monkeypatch):
     """
     Mock the Kestra client to avoid real HTTP calls.
     """
-    def mock_trigger(file_path: str, report_id: str):
+    async def mock_trigger(file_path: str, report_id: str):
         return f"mock-execution-{report_id}"
     
     monkeypatch.setattr("app.core.kestra_client.trigger_fire_detection_flow", mock_trigger)
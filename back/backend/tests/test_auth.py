@@ -1,7 +1,15 @@
+import threading
+
 import pytest
 from httpx import AsyncClient
+from jose import jwt
+from passlib.context import CryptContext
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core import metrics, security, tokens
+from app.core.config import settings
+
 
 @pytest.mark.asyncio
 class TestAuthentication:
@@ -73,3 +81,215 @@ class TestAuthentication:
         """Test accessing protected endpoint with valid token succeeds."""
         response = await authenticated_client.get("/reports")
         assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+class TestUserCache:
+    """Test suite for the authenticated user cache."""
+    
+    async def test_repeated_requests_hit_cache(self, client: AsyncClient, test_user, auth_headers):
+        """Test the users lookup runs once for repeated authenticated requests."""
+        from app.api.deps import user_cache
+        
+        hits_before = user_cache.hits
+        for _ in range(3):
+            response = await client.get("/reports", headers=auth_headers)
+            assert response.status_code == 200
+        
+        assert user_cache.hits - hits_before == 2
+        assert user_cache.get(test_user.username).id == test_user.id
+    
+    async def test_invalidate_user(self, client: AsyncClient, test_user, auth_headers):
+        """Test invalidation forces the next request back to the database."""
+        from app.api.deps import user_cache, invalidate_user
+        
+        await client.get("/reports", headers=auth_headers)
+        invalidate_user(test_user.username)
+        
+        assert user_cache.get(test_user.username) is None
+    
+    def test_ttl_expiry_and_lru_bound(self):
+        """Test entries expire after the TTL and the oldest entry is evicted."""
+        from app.core.cache import TTLCache
+        
+        now = [0.0]
+        cache = TTLCache(name="test", maxsize=2, ttl=10, clock=lambda: now[0])
+        cache.set("a", 1)
+        cache.set("b", 2)
+        assert cache.get("a") == 1  # "a" is now most recently used
+        cache.set("c", 3)
+        assert cache.get("b") is None
+        assert len(cache) == 2
+        
+        now[0] = 11
+        assert cache.get("a") is None
+        assert (cache.hits, cache.misses) == (1, 2)
+
+
+@pytest.mark.asyncio
+class TestPasswordHashing:
+    """Test suite for the password hashing pool and rehash-on-login."""
+
+    async def test_login_rehashes_outdated_hash(
+        self, client: AsyncClient, db_session: AsyncSession, test_user, monkeypatch
+    ):
+        """Test that a hash made with old bcrypt rounds is replaced on login."""
+        test_user.hashed_password = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash("testpass123")
+        await db_session.commit()
+        monkeypatch.setattr(
+            security, "pwd_context", CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=5)
+        )
+        rehashes = metrics.PASSWORD_REHASHES.get()
+
+        response = await client.post("/auth/token", data={"username": "testuser", "password": "testpass123"})
+
+        assert response.status_code == 200
+        await db_session.refresh(test_user)
+        assert test_user.hashed_password.startswith("$2b$05$")
+        assert metrics.PASSWORD_REHASHES.get() == rehashes + 1
+
+    async def test_current_hash_is_kept(self, client: AsyncClient, db_session: AsyncSession, test_user):
+        """Test that a hash with the current rounds is not rewritten."""
+        stored = test_user.hashed_password
+
+        response = await client.post("/auth/token", data={"username": "testuser", "password": "testpass123"})
+
+        assert response.status_code == 200
+        await db_session.refresh(test_user)
+        assert test_user.hashed_password == stored
+
+    async def test_full_queue_returns_503(self, client: AsyncClient, test_user, monkeypatch):
+        """Test that logins are refused instead of queued past PASSWORD_HASH_MAX_QUEUE."""
+        monkeypatch.setattr(settings, "PASSWORD_HASH_MAX_QUEUE", 0)
+
+        response = await client.post("/auth/token", data={"username": "testuser", "password": "testpass123"})
+
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "1"
+
+    async def test_hashing_runs_off_the_event_loop(self, monkeypatch):
+        """Test that hash/verify run on the pool threads and round-trip."""
+        loop_thread = threading.get_ident()
+        threads = []
+        original = security.pwd_context.hash
+
+        def tracking_hash(password):
+            threads.append(threading.get_ident())
+            return original(password)
+
+        monkeypatch.setattr(security.pwd_context, "hash", tracking_hash)
+        hashed = await security.hash_password("secret")
+
+        assert threads and threads[0] != loop_thread
+        assert await security.verify_and_update_password("secret", hashed) == (True, None)
+
+
+@pytest.mark.asyncio
+class TestRefreshTokens:
+    """Test suite for refresh token rotation, revocation and stateless access tokens."""
+
+    async def _login(self, client: AsyncClient) -> dict:
+        response = await client.post("/auth/token", data={"username": "testuser", "password": "testpass123"})
+        assert response.status_code == 200
+        return response.json()
+
+    async def test_login_returns_refresh_token(self, client: AsyncClient, test_user):
+        """Test that login issues a refresh token and an access token carrying the user id."""
+        data = await self._login(client)
+
+        assert data["refresh_token"]
+        assert data["expires_in"] == settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+        claims = jwt.get_unverified_claims(data["access_token"])
+        assert claims["uid"] == test_user.id
+        assert claims["typ"] == "access"
+
+    async def test_access_token_skips_users_lookup(self, client: AsyncClient, db_session: AsyncSession, test_user):
+        """Test that requests with a uid claim never query the users table."""
+        data = await self._login(client)
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        engine = db_session.bind.sync_engine
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            response = await client.get("/reports/", headers={"Authorization": f"Bearer {data['access_token']}"})
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+
+        assert response.status_code == 200
+        assert not any("FROM users" in statement for statement in statements)
+
+    async def test_refresh_rotates_token(self, client: AsyncClient, test_user):
+        """Test that a refresh returns a new pair and the old refresh token stops working."""
+        data = await self._login(client)
+
+        response = await client.post("/auth/refresh", json={"refresh_token": data["refresh_token"]})
+
+        assert response.status_code == 200
+        rotated = response.json()
+        assert rotated["refresh_token"] != data["refresh_token"]
+        reports = await client.get("/reports/", headers={"Authorization": f"Bearer {rotated['access_token']}"})
+        assert reports.status_code == 200
+
+    async def test_reused_refresh_token_revokes_family(self, client: AsyncClient, test_user):
+        """Test that replaying a rotated refresh token revokes every token of that login."""
+        data = await self._login(client)
+        rotated = (await client.post("/auth/refresh", json={"refresh_token": data["refresh_token"]})).json()
+
+        replay = await client.post("/auth/refresh", json={"refresh_token": data["refresh_token"]})
+        assert replay.status_code == 401
+
+        # The legitimate successor and its access token are revoked as well
+        response = await client.post("/auth/refresh", json={"refresh_token": rotated["refresh_token"]})
+        assert response.status_code == 401
+        reports = await client.get("/reports/", headers={"Authorization": f"Bearer {rotated['access_token']}"})
+        assert reports.status_code == 401
+
+    async def test_logout_revokes_tokens(self, client: AsyncClient, db_session: AsyncSession, test_user):
+        """Test that logout revokes the refresh token and its access tokens, persisted for restarts."""
+        data = await self._login(client)
+
+        response = await client.post("/auth/logout", json={"refresh_token": data["refresh_token"]})
+
+        assert response.status_code == 204
+        assert (await client.post("/auth/refresh", json={"refresh_token": data["refresh_token"]})).status_code == 401
+        reports = await client.get("/reports/", headers={"Authorization": f"Bearer {data['access_token']}"})
+        assert reports.status_code == 401
+
+        family_id = jwt.get_unverified_claims(data["refresh_token"])["fam"]
+        tokens.revoked_families.load([])
+        await tokens.load_revocations(db_session)
+        assert tokens.revoked_families.is_revoked(family_id)
+
+    async def test_refresh_token_is_not_an_access_token(self, client: AsyncClient, test_user):
+        """Test that a refresh token cannot authenticate API requests."""
+        data = await self._login(client)
+
+        response = await client.get("/reports/", headers={"Authorization": f"Bearer {data['refresh_token']}"})
+
+        assert response.status_code == 401
+
+    async def test_invalid_refresh_token(self, client: AsyncClient):
+        """Test that a malformed refresh token is rejected."""
+        response = await client.post("/auth/refresh", json={"refresh_token": "not-a-token"})
+
+        assert response.status_code == 401
+
+
+class TestRevocationList:
+    """Test suite for the in-memory revoked family list."""
+
+    def test_entries_expire(self):
+        """Test that families are forgotten once their tokens have expired."""
+        now = [1000.0]
+        revocations = tokens.RevocationList(clock=lambda: now[0])
+        revocations.revoke("a", until=1100.0)
+        revocations.revoke("b", until=1010.0)
+
+        assert revocations.is_revoked("a")
+        now[0] = 1050.0
+        assert not revocations.is_revoked("b")
+        revocations.revoke("c", until=1200.0)
+        assert len(revocations) == 2
@@ -0,0 +1,140 @@
+import pytest
+from sqlalchemy import exc, inspect, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core import metrics
+from app.core.config import settings
+from app.db.session import InstrumentedQueuePool, create_engine, instrument_engine, upgrade_schema
+from app.models.sql import Base
+
+
+@pytest.mark.asyncio
+class TestEnginePool:
+    """Test suite for the instrumented SQL connection pool."""
+
+    async def test_sqlite_engine_keeps_default_pool_and_no_echo(self):
+        """Test SQL echo is off by default and SQLite is not given queue-pool options."""
+        engine = create_engine("sqlite+aiosqlite:///:memory:")
+
+        assert settings.DB_ECHO is False
+        assert engine.echo is False
+        assert not isinstance(engine.pool, InstrumentedQueuePool)
+        await engine.dispose()
+
+    async def test_checkouts_are_measured(self, tmp_path):
+        """Test checkout wait, in-use connections and pool timeouts are recorded."""
+        engine = create_async_engine(
+            f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}",
+            poolclass=InstrumentedQueuePool,
+            pool_size=1,
+            max_overflow=0,
+            pool_timeout=0.05,
+        )
+        waits = metrics.DB_POOL_CHECKOUT_WAIT.get_count()
+        timeouts = metrics.DB_POOL_TIMEOUTS.get()
+
+        async with engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+            assert metrics.DB_POOL_CONNECTIONS.get(state="in_use") == 1
+            with pytest.raises(exc.TimeoutError):
+                async with engine.connect():
+                    pass
+
+        assert metrics.DB_POOL_CONNECTIONS.get(state="in_use") == 0
+        assert metrics.DB_POOL_CONNECTIONS.get(state="idle") == 1
+        assert metrics.DB_POOL_CHECKOUT_WAIT.get_count() == waits + 2
+        assert metrics.DB_POOL_TIMEOUTS.get() == timeouts + 1
+        await engine.dispose()
+
+    async def test_statements_are_timed_by_type(self, tmp_path):
+        """Test instrumented engines record each statement, including failed ones."""
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'timed.db'}")
+        instrument_engine(engine)
+        selects = metrics.DB_QUERY_DURATION.get_count(operation="SELECT")
+
+        async with engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+            with pytest.raises(exc.OperationalError):
+                await connection.execute(text("SELECT * FROM missing_table"))
+            await connection.execute(text("SELECT 2"))
+
+        assert metrics.DB_QUERY_DURATION.get_count(operation="SELECT") == selects + 2
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+class TestSchemaUpgrade:
+    """Test suite for upgrading databases created by earlier versions."""
+
+    async def test_missing_columns_and_indexes_are_added(self, tmp_path):
+        """Test a database with the original users/reports tables gets the current schema, twice safely."""
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'old.db'}")
+        async with engine.begin() as connection:
+            await connection.execute(text(
+                "CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR NOT NULL, hashed_password VARCHAR NOT NULL)"
+            ))
+            await connection.execute(text(
+                "CREATE TABLE reports (id VARCHAR PRIMARY KEY, user_id INTEGER NOT NULL REFERENCES users (id), "
+                "file_path VARCHAR NOT NULL, status VARCHAR, created_at DATETIME, latitude FLOAT, longitude FLOAT)"
+            ))
+            await connection.execute(text("INSERT INTO users VALUES (1, 'old', 'hash')"))
+            await connection.execute(text("INSERT INTO reports (id, user_id, file_path) VALUES ('r1', 1, 'r1.png')"))
+
+        for _ in range(2):
+            async with engine.begin() as connection:
+                await connection.run_sync(Base.metadata.create_all)
+                await connection.run_sync(upgrade_schema)
+
+        async with engine.connect() as connection:
+            columns = await connection.run_sync(lambda c: {col["name"] for col in inspect(c).get_columns("reports")})
+            indexes = await connection.run_sync(lambda c: {index["name"] for index in inspect(c).get_indexes("reports")})
+            role = (await connection.execute(text("SELECT role FROM users"))).scalar_one()
+            media_type = (await connection.execute(text("SELECT media_type FROM reports"))).scalar_one()
+
+        assert columns == set(Base.metadata.tables["reports"].columns.keys())
+        assert "ix_reports_content_hash_model" in indexes
+        assert (role, media_type) == ("user", "image")
+        await engine.dispose()
+
+
+@pytest.mark.asyncio
+class TestMongoClient:
+    """Test suite for the managed Motor client."""
+
+    async def test_client_uses_pool_settings(self, monkeypatch):
+        """Test pool size and timeouts come from settings, and the listing read preference applies."""
+        from pymongo import ReadPreference
+        from app.db import session
+
+        monkeypatch.setattr(settings, "MONGO_MAX_POOL_SIZE", 7)
+        monkeypatch.setattr(settings, "MONGO_SERVER_SELECTION_TIMEOUT_MS", 1500)
+        monkeypatch.setattr(settings, "MONGO_LISTING_READ_PREFERENCE", "secondaryPreferred")
+        client = session.create_mongo_client("mongodb://localhost:27017")
+        monkeypatch.setattr(session, "mongo_client", client)
+
+        assert client.options.pool_options.max_pool_size == 7
+        assert client.options.server_selection_timeout == 1.5
+        assert session.listing_logs_collection().read_preference == ReadPreference.SECONDARY_PREFERRED
+
+        session.close_mongo_db()
+        assert session.mongo_client is None
+
+    async def test_pool_listener_records_metrics(self):
+        """Test CMAP events move the connection gauges and checkout histogram."""
+        from types import SimpleNamespace
+        from app.db.session import MongoPoolMetrics
+
+        listener = MongoPoolMetrics()
+        open_before = metrics.MONGO_POOL_CONNECTIONS.get(state="open")
+        waits = metrics.MONGO_POOL_CHECKOUT_WAIT.get_count()
+
+        listener.connection_created(SimpleNamespace())
+        listener.connection_checked_out(SimpleNamespace(duration=0.002))
+        assert metrics.MONGO_POOL_CONNECTIONS.get(state="in_use") == 1
+        listener.connection_checked_in(SimpleNamespace())
+        listener.connection_check_out_failed(SimpleNamespace(duration=5.0, reason="timeout"))
+
+        assert metrics.MONGO_POOL_CONNECTIONS.get(state="open") == open_before + 1
+        assert metrics.MONGO_POOL_CONNECTIONS.get(state="in_use") == 0
+        assert metrics.MONGO_POOL_CHECKOUT_WAIT.get_count() == waits + 2
+        assert metrics.MONGO_POOL_CHECKOUT_FAILED.get(reason="timeout") >= 1
@@ -0,0 +1,216 @@
+import os
+import pytest
+from io import BytesIO
+from httpx import AsyncClient
+from PIL import Image
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.endpoints.upload import UPLOAD_DIR
+from app.core import dedup, images, metrics
+from app.core.config import settings
+from app.models.sql import FlowTrigger, Report, ReportStatus, User
+
+
+async def upload(client: AsyncClient, content: bytes, name: str = "frame.jpg"):
+    response = await client.post(
+        "/files/upload",
+        files={"file": (name, BytesIO(content), "image/jpeg")},
+    )
+    assert response.status_code == 202
+    return response.json()
+
+
+def photo(gps=None) -> bytes:
+    """A decodable 2000x1000 JPEG, optionally with an EXIF GPS position."""
+    exif = Image.Exif()
+    if gps:
+        exif.get_ifd(0x8825).update({1: "N", 2: (gps[0], 0, 0), 3: "E", 4: (gps[1], 0, 0)})
+    buffer = BytesIO()
+    Image.new("RGB", (2000, 1000), (200, 80, 20)).save(buffer, "JPEG", exif=exif)
+    return buffer.getvalue()
+
+
+@pytest.mark.asyncio
+class TestUploadDedup:
+    """Test suite for content-hash deduplication of uploads."""
+
+    async def test_reupload_attaches_to_in_flight_report(
+        self,
+        authenticated_client: AsyncClient,
+        db_session: AsyncSession
+    ):
+        """Test a re-upload shares the first report's file and gets no new trigger."""
+        before = metrics.UPLOAD_DEDUP.get(result="in_flight")
+        first = await upload(authenticated_client, b"same frame")
+        second = await upload(authenticated_client, b"same frame", name="retry.jpg")
+
+        assert second["duplicate_of"] == first["id"]
+        assert second["file_path"] == first["file_path"]
+        assert second["status"] == ReportStatus.PROCESSING.value
+        assert not os.path.exists(os.path.join(UPLOAD_DIR, f"{second['id']}.jpg"))
+
+        result = await db_session.execute(
+            select(FlowTrigger).where(FlowTrigger.report_id.in_([first["id"], second["id"]]))
+        )
+        assert [t.report_id for t in result.scalars()] == [first["id"]]
+        assert metrics.UPLOAD_DEDUP.get(result="in_flight") == before + 1
+
+    async def test_reupload_reuses_finished_result(
+        self,
+        authenticated_client: AsyncClient,
+        test_user,
+        db_session: AsyncSession
+    ):
+        """Test a re-upload of a finished image is DONE immediately with the same summary."""
+        import hashlib
+
+        db_session.add(Report(
+            id="canonical",
+            user_id=test_user.id,
+            file_path="canonical.jpg",
+            status=ReportStatus.DONE.value,
+            content_hash=hashlib.sha256(b"finished frame").hexdigest(),
+            model_version=settings.MODEL_VERSION,
+            fire_confidence=0.8,
+            detection_count=2,
+        ))
+        await db_session.commit()
+
+        data = await upload(authenticated_client, b"finished frame")
+
+        assert data["duplicate_of"] == "canonical"
+        assert data["status"] == ReportStatus.DONE.value
+        assert data["fire_confidence"] == 0.8
+        assert data["detection_count"] == 2
+
+    async def test_other_model_version_is_not_reused(
+        self,
+        authenticated_client: AsyncClient,
+        monkeypatch
+    ):
+        """Test results are only reused under the same model version."""
+        first = await upload(authenticated_client, b"versioned frame")
+        monkeypatch.setattr(settings, "MODEL_VERSION", "next-model")
+
+        second = await upload(authenticated_client, b"versioned frame")
+
+        assert second["duplicate_of"] is None
+        assert second["file_path"] != first["file_path"]
+
+    async def test_other_users_reports_are_not_reused(
+        self,
+        authenticated_client: AsyncClient,
+        test_user,
+        db_session: AsyncSession
+    ):
+        """Test identical bytes from another user never link to (or expose) their report."""
+        import hashlib
+
+        other = User(username="other-uploader", hashed_password="x")
+        db_session.add(other)
+        await db_session.flush()
+        db_session.add(Report(
+            id="someone-else",
+            user_id=other.id,
+            file_path="someone-else.jpg",
+            status=ReportStatus.DONE.value,
+            content_hash=hashlib.sha256(b"shared frame").hexdigest(),
+            model_version=settings.MODEL_VERSION,
+        ))
+        await db_session.commit()
+
+        data = await upload(authenticated_client, b"shared frame")
+
+        assert data["duplicate_of"] is None
+        assert data["file_path"] != "someone-else.jpg"
+        assert data["status"] == ReportStatus.PROCESSING.value
+
+    async def test_batch_dedups_within_and_across_requests(
+        self,
+        authenticated_client: AsyncClient,
+        db_session: AsyncSession
+    ):
+        """Test repeated images in a batch get a single trigger."""
+        files = [
+            ("files", (f"{i}.jpg", BytesIO(b"A" if i % 2 else b"B"), "image/jpeg"))
+            for i in range(4)
+        ]
+        response = await authenticated_client.post("/files/upload/batch", files=files)
+
+        assert response.status_code == 202
+        reports = response.json()["reports"]
+        originals = [r for r in reports if r["duplicate_of"] is None]
+        assert len(originals) == 2
+        result = await db_session.execute(
+            select(FlowTrigger).where(FlowTrigger.report_id.in_([r["id"] for r in reports]))
+        )
+        assert {t.report_id for t in result.scalars()} == {r["id"] for r in originals}
+
+    async def test_duplicates_are_not_processed(
+        self,
+        authenticated_client: AsyncClient,
+        monkeypatch
+    ):
+        """Test only the first copy of an image is decoded; duplicates get its derivatives and their own GPS."""
+        processed = []
+        process_upload = images.process_upload
+
+        def counting_process_upload(upload_dir, file_path, *args):
+            processed.append(file_path)
+            return process_upload(upload_dir, file_path, *args)
+        monkeypatch.setattr(images, "process_upload", counting_process_upload)
+        content = photo(gps=(10, 20))
+
+        first = await upload(authenticated_client, content)
+        second = await upload(authenticated_client, content, name="retry.jpg")
+        response = await authenticated_client.post(
+            "/files/upload/batch",
+            files=[("files", (f"{i}.jpg", BytesIO(content), "image/jpeg")) for i in range(3)],
+        )
+
+        assert processed == [first["file_path"]]
+        assert response.status_code == 202
+        for data in [second, *response.json()["reports"]]:
+            assert data["duplicate_of"] == first["id"]
+            assert data["thumbnail_path"] == first["thumbnail_path"] is not None
+            assert data["latitude"] == pytest.approx(10)
+
+    async def test_batch_duplicates_share_derivatives_of_new_images(
+        self,
+        authenticated_client: AsyncClient
+    ):
+        """Test repeats of an image first seen in the same batch get the derivatives it was given."""
+        content = photo()
+        response = await authenticated_client.post(
+            "/files/upload/batch",
+            files=[("files", (f"{i}.jpg", BytesIO(content), "image/jpeg")) for i in range(2)],
+        )
+
+        first, second = response.json()["reports"]
+        assert first["thumbnail_path"] is not None
+        assert second["thumbnail_path"] == first["thumbnail_path"]
+        assert second["image_width"] == first["image_width"] == 2000
+
+    async def test_completion_propagates_to_duplicates(
+        self,
+        test_user,
+        db_session: AsyncSession
+    ):
+        """Test finishing a report copies its outcome onto attached uploads."""
+        db_session.add_all([
+            Report(id="origin", user_id=test_user.id, file_path="o.jpg", status=ReportStatus.DONE.value,
+                   fire_confidence=0.6, detection_count=1),
+            Report(id="copy", user_id=test_user.id, file_path="o.jpg", status=ReportStatus.PROCESSING.value,
+                   duplicate_of="origin"),
+        ])
+        await db_session.commit()
+
+        await dedup.complete_duplicates(db_session, ["origin"])
+        await db_session.commit()
+
+        copy = await db_session.get(Report, "copy")
+        await db_session.refresh(copy)
+        assert copy.status == ReportStatus.DONE.value
+        assert copy.fire_confidence == 0.6
+        assert copy.detection_count == 1
@@ -0,0 +1,82 @@
+import asyncio
+import json
+import pytest
+from httpx import AsyncClient
+
+from app.api.endpoints.reports import report_event_stream
+from app.core import events
+from app.core.events import ReportEventBroker
+
+
+class FakeRequest:
+    def __init__(self):
+        self.disconnected = False
+
+    async def is_disconnected(self):
+        return self.disconnected
+
+
+@pytest.mark.asyncio
+class TestReportEvents:
+    """Test suite for report status push (SSE)."""
+
+    async def test_broker_isolates_users(self):
+        """Test events only reach subscribers of the report owner."""
+        broker = ReportEventBroker()
+        mine = broker.subscribe(1)
+        theirs = broker.subscribe(2)
+
+        broker.publish({"user_id": 1, "report_id": "r1", "status": "DONE"})
+
+        assert mine.get_nowait()["report_id"] == "r1"
+        assert theirs.empty()
+
+    async def test_broker_drops_oldest_for_slow_subscriber(self):
+        """Test a full subscriber queue keeps the newest events."""
+        broker = ReportEventBroker(queue_size=2)
+        queue = broker.subscribe(1)
+        for i in range(3):
+            broker.publish({"user_id": 1, "report_id": f"r{i}", "status": "DONE"})
+
+        assert [queue.get_nowait()["report_id"] for _ in range(2)] == ["r1", "r2"]
+        broker.unsubscribe(1, queue)
+        assert not broker.has_subscribers(1)
+
+    async def test_build_event_adds_summary_on_done(self):
+        """Test DONE events carry the summary columns from the NOTIFY payload."""
+        event = events.build_event({
+            "id": "r1", "user_id": 1, "status": "DONE",
+            "fire_confidence": 0.9, "smoke_confidence": 0.7, "detection_count": 3,
+        })
+
+        assert event["summary"] == {
+            "fire_confidence": 0.9,
+            "smoke_confidence": 0.7,
+            "detection_count": 3,
+        }
+
+    async def test_build_event_without_summary(self):
+        """Test events for reports without a result carry no summary."""
+        event = events.build_event({"id": "r1", "user_id": 1, "status": "ERROR", "detection_count": None})
+        assert "summary" not in event
+
+    async def test_stream_yields_published_events(self):
+        """Test the SSE generator forwards events and unsubscribes on close."""
+        request = FakeRequest()
+        stream = report_event_stream(request, user_id=42)
+
+        assert (await stream.__anext__()).startswith("retry:")
+        next_chunk = asyncio.ensure_future(stream.__anext__())
+        await asyncio.sleep(0)
+        events.broker.publish({"user_id": 42, "report_id": "r9", "status": "ERROR"})
+        chunk = await asyncio.wait_for(next_chunk, timeout=1)
+
+        assert chunk.startswith("event: report_status\n")
+        assert json.loads(chunk.split("data: ", 1)[1])["report_id"] == "r9"
+        await stream.aclose()
+        assert not events.broker.has_subscribers(42)
+
+    async def test_stream_requires_authentication(self, client: AsyncClient):
+        """Test the event stream rejects anonymous clients."""
+        response = await client.get("/reports/events")
+        assert response.status_code == 401
@@ -0,0 +1,127 @@
+import pytest
+from datetime import datetime
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import geo
+from app.models.sql import Report, ReportStatus, User
+
+
+class TestGeohash:
+    """Test suite for the geohash helpers behind map queries."""
+
+    def test_encode_known_point(self):
+        """Test encoding matches the reference geohash."""
+        assert geo.encode(57.64911, 10.40744, 11) == "u4pruydqqvj"
+
+    def test_decode_contains_point(self):
+        """Test a decoded cell contains the encoded point."""
+        min_lat, min_lon, max_lat, max_lon = geo.decode_bbox(geo.encode(-23.55, -46.63, 6))
+        assert min_lat <= -23.55 <= max_lat
+        assert min_lon <= -46.63 <= max_lon
+
+    def test_covering_ranges_include_points_in_box(self):
+        """Test every point inside the box falls in one of the covering ranges."""
+        bbox = (-23.7, -46.8, -23.4, -46.4)
+        ranges = geo.covering_ranges(bbox, max_cells=16)
+        assert len(ranges) <= 16
+
+        for lat in (-23.7, -23.55, -23.4):
+            for lon in (-46.8, -46.6, -46.4):
+                h = geo.encode(lat, lon)
+                assert any(low <= h and (high is None or h < high) for low, high in ranges)
+
+    def test_adjacent_cells_are_merged(self):
+        """Test consecutive geohash cells collapse into one range."""
+        assert geo._prefix_upper_bound("u0x") == "u0y"
+        assert geo._prefix_upper_bound("u0z") == "u1"
+        assert geo._prefix_upper_bound("zz") is None
+
+
+def add_report(db_session, user, report_id, lat, lon, **kwargs):
+    db_session.add(Report(
+        id=report_id,
+        user_id=user.id,
+        file_path=f"{report_id}.png",
+        status=ReportStatus.DONE.value,
+        latitude=lat,
+        longitude=lon,
+        geohash=geo.encode(lat, lon),
+        **kwargs,
+    ))
+
+
+@pytest.mark.asyncio
+class TestReportMap:
+    """Test suite for spatial report queries."""
+
+    async def test_bbox_query(
+        self,
+        authenticated_client: AsyncClient,
+        test_user: User,
+        db_session: AsyncSession
+    ):
+        """Test only reports inside the viewport are returned."""
+        add_report(db_session, test_user, "sp", -23.55, -46.63)
+        add_report(db_session, test_user, "rj", -22.91, -43.17)
+        await db_session.commit()
+
+        response = await authenticated_client.get(
+            "/reports/map?min_lat=-24&min_lon=-47&max_lat=-23&max_lon=-46"
+        )
+
+        assert response.status_code == 200
+        assert [r["id"] for r in response.json()] == ["sp"]
+
+    async def test_radius_and_time_window(
+        self,
+        authenticated_client: AsyncClient,
+        test_user: User,
+        db_session: AsyncSession
+    ):
+        """Test radius queries respect distance and the created_at window."""
+        add_report(db_session, test_user, "near-new", -23.56, -46.64, created_at=datetime(2026, 6, 2))
+        add_report(db_session, test_user, "near-old", -23.56, -46.64, created_at=datetime(2026, 1, 1))
+        # Inside the enclosing box but outside the circle (~70 km diagonal)
+        add_report(db_session, test_user, "corner", -23.05, -46.13, created_at=datetime(2026, 6, 2))
+        await db_session.commit()
+
+        response = await authenticated_client.get(
+            "/reports/map?lat=-23.55&lon=-46.63&radius_km=60&since=2026-06-01T00:00:00"
+        )
+
+        assert response.status_code == 200
+        assert [r["id"] for r in response.json()] == ["near-new"]
+
+    async def test_requires_one_area(self, authenticated_client: AsyncClient):
+        """Test missing or mixed area parameters are rejected."""
+        response = await authenticated_client.get("/reports/map?min_lat=1&min_lon=1")
+        assert response.status_code == 400
+
+        response = await authenticated_client.get(
+            "/reports/map?min_lat=1&min_lon=1&max_lat=2&max_lon=2&lat=1&lon=1&radius_km=5"
+        )
+        assert response.status_code == 400
+
+    async def test_tiles_aggregate_per_cell(
+        self,
+        authenticated_client: AsyncClient,
+        test_user: User,
+        db_session: AsyncSession
+    ):
+        """Test tiles report count and max fire confidence per cell."""
+        add_report(db_session, test_user, "a", -23.550, -46.630, fire_confidence=0.3)
+        add_report(db_session, test_user, "b", -23.551, -46.631, fire_confidence=0.8)
+        add_report(db_session, test_user, "c", -22.910, -43.170, fire_confidence=0.1)
+        await db_session.commit()
+
+        response = await authenticated_client.get(
+            "/reports/map/tiles?min_lat=-24&min_lon=-47&max_lat=-22&max_lon=-43&precision=4"
+        )
+
+        assert response.status_code == 200
+        tiles = {t["cell"]: t for t in response.json()}
+        sp = tiles[geo.encode(-23.55, -46.63, 4)]
+        assert sp["count"] == 2
+        assert sp["max_fire_confidence"] == 0.8
+        assert tiles[geo.encode(-22.91, -43.17, 4)]["count"] == 1
@@ -0,0 +1,220 @@
+import os
+import pytest
+from io import BytesIO
+from httpx import AsyncClient
+from PIL import Image
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.endpoints.reports import map_detections
+from app.api.endpoints.upload import UPLOAD_DIR
+from app.core import images
+from app.models.nosql import InferenceLogDetections
+from app.models.sql import FlowTrigger
+
+
+def jpeg_bytes(size=(2000, 1000), gps=None, orientation=None) -> bytes:
+    image = Image.new("RGB", size, (200, 80, 20))
+    exif = Image.Exif()
+    if orientation:
+        exif[0x0112] = orientation
+    if gps:
+        (lat, lat_ref), (lon, lon_ref) = gps
+        exif.get_ifd(0x8825).update({1: lat_ref, 2: lat, 3: lon_ref, 4: lon})
+    buffer = BytesIO()
+    image.save(buffer, "JPEG", exif=exif)
+    return buffer.getvalue()
+
+
+class TestImageProcessing:
+    """Test suite for the post-upload image pipeline."""
+
+    def test_writes_model_sized_copy_and_thumbnail(self, tmp_path):
+        """Test derivatives are resized, EXIF-free, and the scale is recorded."""
+        (tmp_path / "big.jpg").write_bytes(jpeg_bytes(gps=(((23, 33, 0), "S"), ((46, 38, 0), "W"))))
+
+        processed = images.process_upload(str(tmp_path), "big.jpg", inference_size=640, thumbnail_size=160)
+
+        assert (processed.image_width, processed.image_height) == (2000, 1000)
+        assert processed.inference_scale == pytest.approx(0.32)
+        with Image.open(tmp_path / processed.inference_path) as copy:
+            assert copy.size == (640, 320)
+            assert len(copy.getexif()) == 0
+        with Image.open(tmp_path / processed.thumbnail_path) as thumb:
+            assert max(thumb.size) == 160
+        lat, lon = processed.gps
+        assert lat == pytest.approx(-23.55)
+        assert lon == pytest.approx(-46.6333, abs=1e-3)
+
+    def test_original_is_stored_without_location(self, tmp_path):
+        """Test the served original loses its GPS block but keeps orientation and pixels."""
+        content = jpeg_bytes(size=(300, 200), gps=(((23, 33, 0), "S"), ((46, 38, 0), "W")), orientation=6)
+        (tmp_path / "geo.jpg").write_bytes(content)
+        with Image.open(BytesIO(content)) as uploaded:
+            pixels = uploaded.tobytes()
+
+        processed = images.process_upload(str(tmp_path), "geo.jpg", inference_size=640, thumbnail_size=160)
+
+        assert processed.gps is not None
+        with Image.open(tmp_path / "geo.jpg") as stored:
+            exif = stored.getexif()
+            assert dict(exif) == {0x0112: 6}
+            assert len(exif.get_ifd(0x8825)) == 0
+            assert stored.tobytes() == pixels
+
+    def test_png_metadata_is_stripped(self, tmp_path):
+        """Test non-JPEG uploads carrying EXIF are re-saved without it."""
+        exif = Image.Exif()
+        exif.get_ifd(0x8825).update({1: "N", 2: (10, 0, 0), 3: "E", 4: (20, 0, 0)})
+        Image.new("RGB", (50, 40), "red").save(tmp_path / "geo.png", "PNG", exif=exif)
+
+        images.strip_metadata(str(tmp_path / "geo.png"))
+
+        with Image.open(tmp_path / "geo.png") as stored:
+            assert len(stored.getexif()) == 0
+            assert stored.getpixel((0, 0)) == (255, 0, 0)
+
+    def test_failed_strip_leaves_no_temporary_file(self, tmp_path, monkeypatch):
+        """Test a rewrite failing halfway raises, removes its temporary file and leaves the original."""
+        content = jpeg_bytes(size=(300, 200), gps=(((23, 33, 0), "S"), ((46, 38, 0), "W")))
+        (tmp_path / "geo.jpg").write_bytes(content)
+
+        def disk_full(src, dst):
+            dst.write(b"partial")
+            raise OSError("No space left on device")
+        monkeypatch.setattr(images.shutil, "copyfileobj", disk_full)
+
+        with pytest.raises(images.MetadataStripError):
+            images.process_upload(str(tmp_path), "geo.jpg", inference_size=640, thumbnail_size=160)
+
+        assert sorted(os.listdir(tmp_path)) == ["geo.jpg"]
+        assert (tmp_path / "geo.jpg").read_bytes() == content
+
+    def test_small_image_is_inferred_as_uploaded(self, tmp_path):
+        """Test no inference copy is written when the original is already model-sized."""
+        (tmp_path / "small.jpg").write_bytes(jpeg_bytes(size=(400, 300)))
+
+        processed = images.process_upload(str(tmp_path), "small.jpg", inference_size=640, thumbnail_size=160)
+
+        assert processed.inference_path is None
+        assert processed.inference_scale == 1.0
+        assert processed.thumbnail_path is not None
+
+    def test_exif_orientation_is_applied(self, tmp_path):
+        """Test rotated captures are stored upright with swapped dimensions."""
+        (tmp_path / "rotated.jpg").write_bytes(jpeg_bytes(size=(1200, 800), orientation=6))
+
+        processed = images.process_upload(str(tmp_path), "rotated.jpg", inference_size=600, thumbnail_size=100)
+
+        assert (processed.image_width, processed.image_height) == (800, 1200)
+        with Image.open(tmp_path / processed.inference_path) as copy:
+            assert copy.size == (400, 600)
+
+    def test_tiled_size_images_keep_full_resolution(self, tmp_path):
+        """Test images above the tiling threshold get no downscaled inference copy."""
+        (tmp_path / "aerial.jpg").write_bytes(jpeg_bytes(size=(2000, 1000)))
+
+        processed = images.process_upload(
+            str(tmp_path), "aerial.jpg", inference_size=640, thumbnail_size=160, tile_min_pixels=1_000_000
+        )
+
+        assert processed.inference_path is None
+        assert processed.inference_scale == 1.0
+        assert processed.thumbnail_path is not None
+
+    def test_detections_are_mapped_to_original_pixels(self):
+        """Test boxes from the model-sized copy are scaled back for display."""
+        log = InferenceLogDetections(
+            report_id="r",
+            detections=[{"x1": 32, "y1": 16, "x2": 64, "y2": 32, "confidence": 0.9, "name": "fire", "class": 0}],
+        )
+
+        box = map_detections(log, inference_scale=0.32)["detections"][0]
+
+        assert (box["x1"], box["y1"], box["x2"], box["y2"]) == pytest.approx((100, 50, 200, 100))
+
+    def test_malformed_boxes_are_skipped(self):
+        """Test log entries without numeric coordinates or a name are left out instead of failing."""
+        valid = {"x1": 1, "y1": 2, "x2": 3, "y2": 4, "confidence": 0.5, "name": "smoke", "class": 1}
+        log = InferenceLogDetections(
+            report_id="r",
+            detections=[
+                {**valid, "x1": None},
+                {key: value for key, value in valid.items() if key != "y2"},
+                {**valid, "confidence": "high"},
+                {key: value for key, value in valid.items() if key != "name"},
+                valid,
+            ],
+        )
+
+        assert [box["class_name"] for box in map_detections(log, inference_scale=0.5)["detections"]] == ["smoke"]
+
+
+@pytest.mark.asyncio
+class TestUploadProcessing:
+    """Test suite for image processing on the upload endpoint."""
+
+    async def test_upload_uses_processed_copy(
+        self,
+        authenticated_client: AsyncClient,
+        db_session: AsyncSession
+    ):
+        """Test the trigger points at the model-sized copy and EXIF GPS fills coordinates."""
+        content = jpeg_bytes(gps=(((10, 30, 0), "N"), ((20, 15, 0), "E")))
+        response = await authenticated_client.post(
+            "/files/upload",
+            files={"file": ("aerial.jpg", BytesIO(content), "image/jpeg")},
+        )
+
+        assert response.status_code == 202
+        data = response.json()
+        assert data["latitude"] == pytest.approx(10.5)
+        assert data["longitude"] == pytest.approx(20.25)
+        assert data["image_width"] == 2000
+        assert os.path.exists(os.path.join(UPLOAD_DIR, data["thumbnail_path"]))
+
+        result = await db_session.execute(select(FlowTrigger).where(FlowTrigger.report_id == data["id"]))
+        assert result.scalar_one().file_path.startswith(images.INFERENCE_DIR + "/")
+
+    async def test_upload_is_rejected_when_metadata_cannot_be_removed(
+        self,
+        authenticated_client: AsyncClient,
+        monkeypatch
+    ):
+        """Test an image whose GPS cannot be stripped is not stored, alone or in a batch."""
+        def fail(path):
+            raise images.MetadataStripError("rewrite failed")
+        monkeypatch.setattr(images, "strip_metadata", fail)
+        stored = set(os.listdir(UPLOAD_DIR))
+        content = jpeg_bytes(size=(300, 200), gps=(((10, 0, 0), "N"), ((20, 0, 0), "E")))
+
+        single = await authenticated_client.post(
+            "/files/upload", files={"file": ("geo.jpg", BytesIO(content), "image/jpeg")}
+        )
+        batch = await authenticated_client.post(
+            "/files/upload/batch",
+            files=[
+                ("files", ("geo.jpg", BytesIO(content), "image/jpeg")),
+                ("files", ("copy.jpg", BytesIO(content), "image/jpeg")),
+                ("files", ("other.png", BytesIO(b"not decodable"), "image/png")),
+            ],
+        )
+
+        assert single.status_code == 400
+        assert batch.status_code == 202
+        assert sorted(e["filename"] for e in batch.json()["errors"]) == ["copy.jpg", "geo.jpg"]
+        [report] = batch.json()["reports"]
+        assert set(os.listdir(UPLOAD_DIR)) - stored == {report["file_path"]}
+
+    async def test_client_coordinates_take_precedence(self, authenticated_client: AsyncClient):
+        """Test EXIF GPS does not override coordinates sent with the upload."""
+        content = jpeg_bytes(size=(800, 600), gps=(((10, 0, 0), "N"), ((20, 0, 0), "E")))
+        response = await authenticated_client.post(
+            "/files/upload",
+            files={"file": ("tower.jpg", BytesIO(content), "image/jpeg")},
+            data={"latitude": -15.8, "longitude": -47.9},
+        )
+
+        assert response.status_code == 202
+        assert response.json()["latitude"] == -15.8
+
@@ -0,0 +1,74 @@
+import json
+import logging
+import sys
+
+import pytest
+from httpx import AsyncClient
+
+from app.core.logs import ContextFilter, JsonFormatter, log_context
+
+
+def _record(message: str, **extra) -> logging.LogRecord:
+    record = logging.LogRecord("app.test", logging.INFO, __file__, 1, message, (), None)
+    for key, value in extra.items():
+        setattr(record, key, value)
+    ContextFilter().filter(record)
+    return record
+
+
+class TestJsonFormatter:
+    """Test suite for the structured log format."""
+
+    def test_includes_bound_context_and_extra_fields(self):
+        """Test that log_context fields and extra= fields end up in the JSON line."""
+        with log_context(request_id="req-1"), log_context(report_id=42):
+            record = _record("Upload accepted", total_ms=12.5)
+
+        entry = json.loads(JsonFormatter().format(record))
+
+        assert entry["msg"] == "Upload accepted"
+        assert entry["level"] == "INFO"
+        assert entry["logger"] == "app.test"
+        assert entry["request_id"] == "req-1"
+        assert entry["report_id"] == 42
+        assert entry["total_ms"] == 12.5
+
+    def test_context_is_unbound_after_the_block(self):
+        """Test that fields do not leak outside the log_context block."""
+        with log_context(request_id="req-1"):
+            pass
+
+        entry = json.loads(JsonFormatter().format(_record("later")))
+
+        assert "request_id" not in entry
+
+    def test_includes_traceback(self):
+        """Test that exceptions are rendered into exc_info."""
+        try:
+            raise RuntimeError("boom")
+        except RuntimeError:
+            record = logging.LogRecord("app.test", logging.ERROR, __file__, 1, "failed", (), None)
+            record.exc_info = sys.exc_info()
+
+        entry = json.loads(JsonFormatter().format(record))
+
+        assert "RuntimeError: boom" in entry["exc_info"]
+
+
+@pytest.mark.asyncio
+class TestRequestId:
+    """Test suite for the X-Request-ID header."""
+
+    async def test_echoes_caller_request_id(self, client: AsyncClient):
+        """Test that a caller-supplied id is returned unchanged."""
+        response = await client.get("/", headers={"X-Request-ID": "abc123"})
+
+        assert response.headers["X-Request-ID"] == "abc123"
+
+    async def test_generates_request_id(self, client: AsyncClient):
+        """Test that requests without an id get a fresh one."""
+        first = await client.get("/")
+        second = await client.get("/")
+
+        assert first.headers["X-Request-ID"]
+        assert first.headers["X-Request-ID"] != second.headers["X-Request-ID"]
@@ -0,0 +1,74 @@
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.endpoints import metrics as metrics_endpoint
+from app.core import metrics
+from app.core.config import settings
+from app.models.sql import Report, ReportStatus
+
+
+class TestPrometheusRendering:
+    """Test suite for the Prometheus text exposition."""
+
+    def test_renders_counters_and_histograms(self):
+        """Test label escaping, histogram buckets and unlabeled samples."""
+        registry = metrics.Registry()
+        counter = metrics.Counter("render_test_total", "Rendered counter", ["path"])
+        histogram = metrics.Histogram("render_test_seconds", "Rendered histogram", buckets=(0.1, 1.0))
+        registry.register(counter)
+        registry.register(histogram)
+        counter.inc(2, path='a"b')
+        histogram.observe(0.5)
+
+        text = metrics.render(registry)
+
+        assert "# TYPE render_test_total counter" in text
+        assert 'render_test_total{path="a\\"b"} 2' in text
+        assert 'render_test_seconds_bucket{le="0.1"} 0' in text
+        assert 'render_test_seconds_bucket{le="1.0"} 1' in text
+        assert 'render_test_seconds_bucket{le="+Inf"} 1' in text
+        assert "render_test_seconds_sum 0.5" in text
+
+
+@pytest.mark.asyncio
+class TestMetricsEndpoint:
+    """Test suite for GET /metrics."""
+
+    async def test_exposes_route_latency_and_report_statuses(
+        self,
+        authenticated_client: AsyncClient,
+        test_user,
+        db_session: AsyncSession,
+        monkeypatch
+    ):
+        """Test requests are labeled by route template and PROCESSING reports are counted."""
+        monkeypatch.setattr(metrics_endpoint, "_status_refreshed_at", 0.0)
+        monkeypatch.setattr(settings, "INTERNAL_API_TOKEN", "scrape-token")
+        db_session.add_all([
+            Report(id="m-1", user_id=test_user.id, file_path="1.png", status=ReportStatus.PROCESSING.value),
+            Report(id="m-2", user_id=test_user.id, file_path="2.png", status=ReportStatus.PROCESSING.value),
+            Report(id="m-3", user_id=test_user.id, file_path="3.png", status=ReportStatus.DONE.value),
+        ])
+        await db_session.commit()
+        await authenticated_client.get("/reports/does-not-exist")
+
+        response = await authenticated_client.get("/metrics", headers={"X-Internal-Token": "scrape-token"})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert (
+            'http_request_duration_seconds_count{method="GET",route="/reports/{report_id}",status="404"}'
+            in response.text
+        )
+        assert 'reports{status="PROCESSING"} 2' in response.text
+        assert 'reports{status="DONE"} 1' in response.text
+
+    async def test_requires_the_internal_token(self, client: AsyncClient, monkeypatch):
+        """Test metrics are not served without the internal token, nor while it is unset."""
+        monkeypatch.setattr(settings, "INTERNAL_API_TOKEN", "scrape-token")
+        assert (await client.get("/metrics")).status_code == 401
+        assert (await client.get("/metrics", headers={"X-Internal-Token": "wrong"})).status_code == 401
+
+        monkeypatch.setattr(settings, "INTERNAL_API_TOKEN", None)
+        assert (await client.get("/metrics")).status_code == 403
@@ -0,0 +1,166 @@
+import pytest
+import httpx
+from datetime import datetime, timedelta
+from io import BytesIO
+from httpx import AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import kestra_client, metrics, outbox
+from app.core.config import settings
+from app.models.sql import FlowTrigger, FlowTriggerStatus, Report, ReportStatus, User
+
+
+async def _create_report_with_trigger(db_session: AsyncSession, user: User, report_id: str) -> FlowTrigger:
+    db_session.add(Report(
+        id=report_id,
+        user_id=user.id,
+        file_path=f"{report_id}.png",
+        status=ReportStatus.PROCESSING.value
+    ))
+    trigger = outbox.enqueue_flow_trigger(db_session, report_id=report_id, file_path=f"{report_id}.png")
+    await db_session.commit()
+    return trigger
+
+
+@pytest.mark.asyncio
+class TestOutbox:
+    """Test suite for the Kestra trigger outbox."""
+
+    async def test_upload_enqueues_trigger(
+        self,
+        authenticated_client: AsyncClient,
+        db_session: AsyncSession
+    ):
+        """Test upload persists a pending trigger instead of calling Kestra inline."""
+        response = await authenticated_client.post(
+            "/files/upload",
+            files={"file": ("fire.png", BytesIO(b"fake image"), "image/png")}
+        )
+        assert response.status_code == 202
+
+        result = await db_session.execute(
+            select(FlowTrigger).where(FlowTrigger.report_id == response.json()["id"])
+        )
+        trigger = result.scalars().first()
+        assert trigger.status == FlowTriggerStatus.PENDING.value
+        assert trigger.file_path == response.json()["file_path"]
+
+    async def test_dispatch_success_marks_sent(
+        self,
+        db_session: AsyncSession,
+        test_user: User,
+        mock_kestra_trigger
+    ):
+        """Test successful dispatch stores the execution id."""
+        trigger = await _create_report_with_trigger(db_session, test_user, "outbox-ok")
+
+        processed = await outbox.dispatch_due_triggers(db_session)
+
+        assert processed == 1
+        assert trigger.status == FlowTriggerStatus.SENT.value
+        assert trigger.execution_id == "mock-execution-outbox-ok"
+        assert trigger.attempts == 1
+        assert trigger.sent_at is not None
+
+    async def test_dispatch_failure_backs_off(
+        self,
+        db_session: AsyncSession,
+        test_user: User,
+        monkeypatch
+    ):
+        """Test failed triggers are rescheduled and skipped until due."""
+        async def failing_trigger(file_path: str, report_id: str):
+            return None
+        monkeypatch.setattr(kestra_client, "trigger_fire_detection_flow", failing_trigger)
+        trigger = await _create_report_with_trigger(db_session, test_user, "outbox-retry")
+        now = datetime.utcnow()
+
+        await outbox.dispatch_due_triggers(db_session, now=now)
+
+        assert trigger.status == FlowTriggerStatus.PENDING.value
+        assert trigger.attempts == 1
+        assert trigger.next_attempt_at == now + timedelta(seconds=outbox.backoff_delay(1))
+        # Not due yet
+        assert await outbox.dispatch_due_triggers(db_session, now=now) == 0
+
+    async def test_dispatch_gives_up_and_marks_report_error(
+        self,
+        db_session: AsyncSession,
+        test_user: User,
+        monkeypatch
+    ):
+        """Test exhausted triggers fail the report instead of leaving it PROCESSING."""
+        async def failing_trigger(file_path: str, report_id: str):
+            return None
+        monkeypatch.setattr(kestra_client, "trigger_fire_detection_flow", failing_trigger)
+        monkeypatch.setattr(settings, "OUTBOX_MAX_ATTEMPTS", 1)
+        trigger = await _create_report_with_trigger(db_session, test_user, "outbox-dead")
+
+        await outbox.dispatch_due_triggers(db_session)
+
+        assert trigger.status == FlowTriggerStatus.FAILED.value
+        result = await db_session.execute(select(Report.status).where(Report.id == "outbox-dead"))
+        assert result.scalar_one() == ReportStatus.ERROR.value
+
+    async def test_batch_triggers_dispatched_as_groups(
+        self,
+        db_session: AsyncSession,
+        test_user: User,
+        mock_kestra_trigger,
+        monkeypatch
+    ):
+        """Test triggers sharing a batch go out as grouped executions."""
+        calls = []
+        async def batch_trigger(items):
+            calls.append(items)
+            return f"mock-batch-{len(calls)}"
+        monkeypatch.setattr(kestra_client, "trigger_fire_detection_batch_flow", batch_trigger)
+        monkeypatch.setattr(settings, "INFERENCE_GROUP_SIZE", 2)
+
+        batched = [
+            outbox.enqueue_flow_trigger(db_session, report_id=f"b-{i}", file_path=f"b-{i}.png", batch_id="batch-1")
+            for i in range(3)
+        ]
+        single = await _create_report_with_trigger(db_session, test_user, "single")
+
+        assert await outbox.dispatch_due_triggers(db_session) == 4
+        # 3 batched items split by group size: one grouped execution + one single trigger
+        assert [len(items) for items in calls] == [2]
+        assert batched[2].execution_id == "mock-execution-b-2"
+        assert all(t.status == FlowTriggerStatus.SENT.value for t in batched)
+        assert single.execution_id == "mock-execution-single"
+
+    def test_backoff_is_capped(self):
+        """Test backoff grows exponentially up to the configured maximum."""
+        assert outbox.backoff_delay(2) == 2 * outbox.backoff_delay(1)
+        assert outbox.backoff_delay(50) == settings.OUTBOX_BACKOFF_MAX_SECONDS
+
+
+@pytest.mark.asyncio
+class TestKestraClient:
+    """Test suite for the pooled async Kestra client."""
+
+    async def test_trigger_returns_execution_id(self, monkeypatch):
+        """Test the client posts inputs and returns the execution id."""
+        def handler(request: httpx.Request):
+            assert b"report-1" in request.content
+            return httpx.Response(200, json={"id": "exec-123"})
+        monkeypatch.setattr(kestra_client, "_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+
+        assert await kestra_client.trigger_fire_detection_flow("a.png", "report-1") == "exec-123"
+        await kestra_client.close_client()
+
+    async def test_trigger_failure_returns_none(self, monkeypatch):
+        """Test HTTP errors are swallowed so the outbox can retry."""
+        def handler(request: httpx.Request):
+            return httpx.Response(503)
+        monkeypatch.setattr(kestra_client, "_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+
+        failures = metrics.KESTRA_TRIGGERS.get(flow="single", result="failed")
+        timed = metrics.KESTRA_TRIGGER_DURATION.get_count(flow="single")
+
+        assert await kestra_client.trigger_fire_detection_flow("a.png", "report-1") is None
+        assert metrics.KESTRA_TRIGGERS.get(flow="single", result="failed") == failures + 1
+        assert metrics.KESTRA_TRIGGER_DURATION.get_count(flow="single") == timed + 1
+        await kestra_client.close_client()
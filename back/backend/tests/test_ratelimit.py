@@ -0,0 +1,158 @@
+import httpx
+import pytest
+from httpx import AsyncClient
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import metrics, worker_client
+from app.core.config import Settings, settings
+from app.core.ratelimit import MemoryRateLimitBackend
+from app.models.sql import Report, ReportStatus
+
+
+def _image(name: str = "test.png"):
+    return {"file": (name, b"fake image content " + name.encode(), "image/png")}
+
+
+@pytest.mark.asyncio
+class TestTokenBucket:
+    """Test suite for the in-memory token bucket."""
+
+    async def test_burst_then_refill(self):
+        """Test that a bucket allows `burst` requests, then refills at `rate`."""
+        now = [0.0]
+        backend = MemoryRateLimitBackend(clock=lambda: now[0])
+
+        assert await backend.acquire("k", rate=1.0, burst=2) == 0
+        assert await backend.acquire("k", rate=1.0, burst=2) == 0
+        assert await backend.acquire("k", rate=1.0, burst=2) == pytest.approx(1.0)
+
+        now[0] = 1.5
+        assert await backend.acquire("k", rate=1.0, burst=2) == 0
+        assert await backend.acquire("k", rate=1.0, burst=2) == pytest.approx(0.5)
+
+    async def test_buckets_are_independent_and_bounded(self):
+        """Test that keys do not share tokens and the LRU bound holds."""
+        backend = MemoryRateLimitBackend(maxsize=2, clock=lambda: 0.0)
+
+        assert await backend.acquire("a", rate=1.0, burst=1) == 0
+        assert await backend.acquire("b", rate=1.0, burst=1) == 0
+        assert await backend.acquire("a", rate=1.0, burst=1) > 0
+        assert await backend.acquire("c", rate=1.0, burst=1) == 0
+
+        # "b" was least recently used and evicted, so it starts full again
+        assert await backend.acquire("b", rate=1.0, burst=1) == 0
+
+    @pytest.mark.parametrize("limit", [(0, 5), (-1, 5), (60, 0)])
+    async def test_invalid_limits_are_rejected_at_startup(self, limit):
+        """Test a zero rate (division by zero in the buckets) or an empty burst fails config parsing."""
+        with pytest.raises(ValidationError, match="RATE_LIMITS"):
+            Settings(RATE_LIMITS={"upload": limit})
+
+
+@pytest.mark.asyncio
+class TestUploadRateLimit:
+    """Test suite for per-user rate limiting on uploads."""
+
+    async def test_returns_429_after_burst(
+        self, authenticated_client: AsyncClient, mock_kestra_trigger, monkeypatch
+    ):
+        """Test that uploads past the burst are refused with Retry-After."""
+        monkeypatch.setattr(settings, "RATE_LIMITS", {"upload": (6, 2)})
+        limited = metrics.RATE_LIMITED.get(route="upload")
+
+        statuses = [
+            (await authenticated_client.post("/files/upload", files=_image(f"{i}.png"))).status_code
+            for i in range(2)
+        ]
+        response = await authenticated_client.post("/files/upload", files=_image("2.png"))
+
+        assert statuses == [202, 202]
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "10"
+        assert metrics.RATE_LIMITED.get(route="upload") == limited + 1
+
+    async def test_routes_have_separate_buckets(
+        self, authenticated_client: AsyncClient, mock_kestra_trigger, monkeypatch
+    ):
+        """Test that exhausting one route's bucket does not limit another route."""
+        monkeypatch.setattr(settings, "RATE_LIMITS", {"upload": (6, 1), "upload_batch": (6, 1)})
+
+        assert (await authenticated_client.post("/files/upload", files=_image("a.png"))).status_code == 202
+        assert (await authenticated_client.post("/files/upload", files=_image("b.png"))).status_code == 429
+        batch = await authenticated_client.post(
+            "/files/upload/batch", files=[("files", ("c.png", b"batch image", "image/png"))]
+        )
+        assert batch.status_code == 202
+
+    async def test_disabled(self, authenticated_client: AsyncClient, mock_kestra_trigger, monkeypatch):
+        """Test that RATE_LIMIT_ENABLED=false lets every request through."""
+        monkeypatch.setattr(settings, "RATE_LIMITS", {"upload": (6, 1)})
+        monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+
+        for i in range(3):
+            assert (await authenticated_client.post("/files/upload", files=_image(f"{i}.png"))).status_code == 202
+
+
+@pytest.mark.asyncio
+class TestAdmissionControl:
+    """Test suite for backlog-based admission control on uploads."""
+
+    async def test_too_many_processing_reports(
+        self,
+        authenticated_client: AsyncClient,
+        db_session: AsyncSession,
+        test_user,
+        mock_kestra_trigger,
+        monkeypatch,
+    ):
+        """Test that uploads get 503 while PROCESSING reports are over the limit."""
+        monkeypatch.setattr(settings, "ADMISSION_MAX_PROCESSING", 2)
+        db_session.add_all([
+            Report(id=f"busy-{i}", user_id=test_user.id, file_path="x.jpg", status=ReportStatus.PROCESSING.value)
+            for i in range(2)
+        ])
+        await db_session.commit()
+
+        response = await authenticated_client.post("/files/upload", files=_image())
+
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == str(settings.ADMISSION_RETRY_AFTER_SECONDS)
+
+    async def test_worker_queue_depth(
+        self, authenticated_client: AsyncClient, mock_kestra_trigger, monkeypatch
+    ):
+        """Test that the worker's reported queue depth counts towards the limit."""
+        monkeypatch.setattr(settings, "ADMISSION_MAX_QUEUE_DEPTH", 100)
+        monkeypatch.setattr(worker_client, "last_queue_depth", 100)
+
+        response = await authenticated_client.post("/files/upload", files=_image())
+
+        assert response.status_code == 503
+
+    async def test_admits_under_limits(self, authenticated_client: AsyncClient, mock_kestra_trigger):
+        """Test that uploads pass with the default limits and an idle backlog."""
+        response = await authenticated_client.post("/files/upload", files=_image())
+
+        assert response.status_code == 202
+
+
+@pytest.mark.asyncio
+class TestWorkerQueueDepth:
+    """Test suite for the worker queue depth seen by admission control."""
+
+    async def test_records_reported_depth_and_full_queue(self, monkeypatch):
+        """Test that accepted batches update the depth and a 503 marks the queue full."""
+        replies = [
+            httpx.Response(202, json={"accepted": 1, "queue_depth": 7}),
+            httpx.Response(503, json={"detail": "Inference queue is full"}),
+        ]
+        client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: replies.pop(0)))
+        monkeypatch.setattr(worker_client, "_client", client)
+        monkeypatch.setattr(worker_client, "last_queue_depth", None)
+
+        assert await worker_client.submit_inference_jobs([{"report_id": "r1", "file_path": "a.jpg"}])
+        assert worker_client.last_queue_depth == 7
+        assert await worker_client.submit_inference_jobs([{"report_id": "r2", "file_path": "b.jpg"}]) is None
+        assert worker_client.last_queue_depth == settings.WORKER_MAX_QUEUE_SIZE
+        await client.aclose()
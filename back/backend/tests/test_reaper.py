@@ -0,0 +1,302 @@
+import pytest
+import httpx
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Union
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import kestra_client, metrics, outbox, reaper, worker_client
+from app.core.config import settings
+from app.models.sql import FlowTrigger, FlowTriggerStatus, Report, ReportStatus, User
+
+
+def _stub_kestra(monkeypatch, states: Dict[str, Union[int, str]]) -> list:
+    """Kestra executions API stand-in: execution id -> state, or an HTTP status code."""
+    requested = []
+
+    def handler(request: httpx.Request):
+        execution_id = request.url.path.rsplit("/", 1)[-1]
+        requested.append(execution_id)
+        state = states.get(execution_id, 404)
+        if isinstance(state, int):
+            return httpx.Response(state)
+        return httpx.Response(200, json={"id": execution_id, "state": {"current": state}})
+    monkeypatch.setattr(kestra_client, "_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    return requested
+
+
+def _stub_worker(monkeypatch, health: Union[dict, int]) -> list:
+    """Inference worker /health stand-in: its reply, or an HTTP status code."""
+    requested = []
+
+    def handler(request: httpx.Request):
+        requested.append(request.url.path)
+        if isinstance(health, int):
+            return httpx.Response(health)
+        return httpx.Response(200, json=health)
+    monkeypatch.setattr(worker_client, "_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    return requested
+
+
+async def _dispatched_report(
+    db_session: AsyncSession, user: User, report_id: str, execution_id: Optional[str]
+) -> Report:
+    report = Report(
+        id=report_id,
+        user_id=user.id,
+        file_path=f"{report_id}.png",
+        status=ReportStatus.PROCESSING.value,
+        execution_id=execution_id,
+    )
+    db_session.add(report)
+    trigger = outbox.enqueue_flow_trigger(db_session, report_id=report_id, file_path=f"{report_id}.png", user_id=user.id)
+    trigger.status = FlowTriggerStatus.SENT.value
+    trigger.execution_id = execution_id
+    trigger.sent_at = trigger.created_at
+    trigger.attempts = 1
+    await db_session.commit()
+    return report
+
+
+def _stuck_now() -> datetime:
+    return datetime.utcnow() + timedelta(seconds=settings.REAPER_STUCK_AFTER_SECONDS + 60)
+
+
+async def _triggers(db_session: AsyncSession, report_id: str) -> list:
+    result = await db_session.execute(
+        select(FlowTrigger).where(FlowTrigger.report_id == report_id).order_by(FlowTrigger.id)
+    )
+    return result.scalars().all()
+
+
+@pytest.mark.asyncio
+class TestReaper:
+    """Test suite for the stuck PROCESSING report reconciler."""
+
+    async def test_dispatch_stores_execution_id_on_report(
+        self,
+        db_session: AsyncSession,
+        test_user: User,
+        mock_kestra_trigger
+    ):
+        """Test the outbox records the execution id on the report it dispatched."""
+        report = await _dispatched_report(db_session, test_user, "reap-exec-id", None)
+        trigger = (await _triggers(db_session, report.id))[0]
+        trigger.status = FlowTriggerStatus.PENDING.value
+        await db_session.commit()
+
+        await outbox.dispatch_due_triggers(db_session)
+        await db_session.refresh(report)
+
+        assert report.execution_id == "mock-execution-reap-exec-id"
+
+    async def test_failed_execution_is_redispatched(
+        self,
+        db_session: AsyncSession,
+        test_user: User,
+        monkeypatch
+    ):
+        """Test a report whose execution failed gets a new pending trigger."""
+        requested = _stub_kestra(monkeypatch, {"exec-failed": "FAILED"})
+        report = await _dispatched_report(db_session, test_user, "reap-failed", "exec-failed")
+        before = metrics.REAPER_ACTIONS.get(action="redispatched")
+
+        actions = await reaper.reconcile_stuck_reports(db_session, now=_stuck_now())
+
+        assert actions == {"redispatched": 1, "failed": 0}
+        assert requested == ["exec-failed"]
+        assert report.status == ReportStatus.PROCESSING.value
+        assert report.execution_id is None
+        triggers = await _triggers(db_session, report.id)
+        assert [t.status for t in triggers] == [FlowTriggerStatus.SENT.value, FlowTriggerStatus.PENDING.value]
+        assert triggers[1].user_id == test_user.id
+        assert metrics.REAPER_ACTIONS.get(action="redispatched") == before + 1
+        await kestra_client.close_client()
+
+    async def test_redispatched_report_waits_for_its_new_trigger(
+        self,
+        db_session: AsyncSession,
+        test_user: User,
+        monkeypatch
+    ):
+        """Test the next round does not re-dispatch again while the new trigger is recent."""
+        _stub_kestra(monkeypatch, {})
+        await _dispatched_report(db_session, test_user, "reap-again", "exec-gone")
+        now = _stuck_now()
+
+        first = await reaper.reconcile_stuck_reports(db_session, now=now)
+        second = await reaper.reconcile_stuck_reports(db_session, now=now)
+
+        assert first == {"redispatched": 1, "failed": 0}
+        assert second == {}
+        await kestra_client.close_client()
+
+    async def test_active_or_unknown_executions_are_left_alone(
+        self,
+        db_session: AsyncSession,
+        test_user: User,
+        monkeypatch
+    ):
+        """Test running executions, and ones Kestra could not report on, are not touched."""
+        _stub_kestra(monkeypatch, {"exec-running": "RUNNING", "exec-error": 503})
+        running = await _dispatched_report(db_session, test_user, "reap-running", "exec-running")
+        unknown = await _dispatched_report(db_session, test_user, "reap-unknown", "exec-error")
+
+        actions = await reaper.reconcile_stuck_reports(db_session, now=_stuck_now())
+
+        assert actions == {"redispatched": 0, "failed": 0}
+        for report in (running, unknown):
+            assert report.status == ReportStatus.PROCESSING.value
+            assert len(await _triggers(db_session, report.id)) == 1
+        await kestra_client.close_client()
+
+    async def test_recent_reports_are_not_scanned(
+        self,
+        db_session: AsyncSession,
+        test_user: User,
+        monkeypatch
+    ):
+        """Test reports younger than REAPER_STUCK_AFTER_SECONDS are not checked at all."""
+        requested = _stub_kestra(monkeypatch, {})
+        await _dispatched_report(db_session, test_user, "reap-recent", "exec-recent")
+
+        assert await reaper.reconcile_stuck_reports(db_session) == {}
+        assert requested == []
+        await kestra_client.close_client()
+
+    async def test_worker_jobs_lost_in_a_restart_are_redispatched(
+        self,
+        db_session: AsyncSession,
+        test_user: User,
+        monkeypatch
+    ):
+        """Test resident worker jobs sent before the worker restarted are re-dispatched without querying Kestra."""
+        requested = _stub_kestra(monkeypatch, {})
+        now = _stuck_now()
+        _stub_worker(monkeypatch, {"queue_depth": 40, "in_flight": 16, "started_at": now.isoformat()})
+        await _dispatched_report(db_session, test_user, "reap-worker", "worker:reap-worker")
+
+        actions = await reaper.reconcile_stuck_reports(db_session, now=now)
+
+        assert actions == {"redispatched": 1, "failed": 0}
+        assert requested == []
+        await kestra_client.close_client()
+        await worker_client.close_client()
+
+    async def test_worker_jobs_still_queued_are_left_alone(
+        self,
+        db_session: AsyncSession,
+        test_user: User,
+        monkeypatch
+    ):
+        """Test jobs sent since the worker started wait while it has work queued, or cannot be reached."""
+        started_at = (datetime.utcnow() - timedelta(hours=1)).isoformat()
+        report = await _dispatched_report(db_session, test_user, "reap-queued", "worker:reap-queued")
+
+        for health in ({"queue_depth": 9000, "in_flight": 16, "started_at": started_at}, 503):
+            requested = _stub_worker(monkeypatch, health)
+            assert await reaper.reconcile_stuck_reports(db_session, now=_stuck_now()) == {"redispatched": 0, "failed": 0}
+            assert requested == ["/health"]
+            assert len(await _triggers(db_session, report.id)) == 1
+
+        _stub_worker(monkeypatch, {"queue_depth": 0, "in_flight": 0, "started_at": started_at})
+        assert await reaper.reconcile_stuck_reports(db_session, now=_stuck_now()) == {"redispatched": 1, "failed": 0}
+        await worker_client.close_client()
+
+    async def test_exhausted_dispatches_mark_error(
+        self,
+        db_session: AsyncSession,
+        test_user: User,
+        monkeypatch
+    ):
+        """Test a report is marked ERROR once REAPER_MAX_DISPATCHES triggers were used, duplicates included."""
+        monkeypatch.setattr(settings, "REAPER_MAX_DISPATCHES", 1)
+        _stub_kestra(monkeypatch, {"exec-killed": "KILLED"})
+        report = await _dispatched_report(db_session, test_user, "reap-exhausted", "exec-killed")
+        duplicate = Report(
+            id="reap-duplicate",
+            user_id=test_user.id,
+            file_path="reap-duplicate.png",
+            status=ReportStatus.PROCESSING.value,
+            duplicate_of=report.id,
+        )
+        db_session.add(duplicate)
+        await db_session.commit()
+        before = metrics.REAPER_ACTIONS.get(action="failed")
+
+        actions = await reaper.reconcile_stuck_reports(db_session, now=_stuck_now())
+        await db_session.refresh(duplicate)
+
+        assert actions == {"redispatched": 0, "failed": 1}
+        assert report.status == ReportStatus.ERROR.value
+        assert report.completed_at is not None
+        assert duplicate.status == ReportStatus.ERROR.value
+        assert len(await _triggers(db_session, report.id)) == 1
+        assert metrics.REAPER_ACTIONS.get(action="failed") == before + 1
+        await kestra_client.close_client()
+
+    async def test_give_up_marks_error_even_while_running(
+        self,
+        db_session: AsyncSession,
+        test_user: User,
+        monkeypatch
+    ):
+        """Test reports PROCESSING past REAPER_GIVE_UP_SECONDS are marked ERROR without a lookup."""
+        requested = _stub_kestra(monkeypatch, {"exec-hung": "RUNNING"})
+        report = await _dispatched_report(db_session, test_user, "reap-hung", "exec-hung")
+        now = datetime.utcnow() + timedelta(seconds=settings.REAPER_GIVE_UP_SECONDS + 60)
+
+        actions = await reaper.reconcile_stuck_reports(db_session, now=now)
+
+        assert actions == {"redispatched": 0, "failed": 1}
+        assert report.status == ReportStatus.ERROR.value
+        assert requested == []
+        await kestra_client.close_client()
+
+    async def test_pending_triggers_are_left_to_the_outbox(
+        self,
+        db_session: AsyncSession,
+        test_user: User,
+        monkeypatch
+    ):
+        """Test reports whose trigger is still being retried by the outbox are skipped."""
+        _stub_kestra(monkeypatch, {})
+        report = await _dispatched_report(db_session, test_user, "reap-pending", None)
+        trigger = (await _triggers(db_session, report.id))[0]
+        trigger.status = FlowTriggerStatus.PENDING.value
+        await db_session.commit()
+
+        assert await reaper.reconcile_stuck_reports(db_session, now=_stuck_now()) == {}
+
+    async def test_stuck_time_counts_from_dispatch(
+        self,
+        db_session: AsyncSession,
+        test_user: User,
+        monkeypatch
+    ):
+        """Test a trigger held in the outbox (e.g. bulk class) is not reaped right after it was sent."""
+        requested = _stub_kestra(monkeypatch, {})
+        report = await _dispatched_report(db_session, test_user, "reap-held", "worker:reap-held")
+        now = _stuck_now()
+        trigger = (await _triggers(db_session, report.id))[0]
+        trigger.sent_at = now - timedelta(seconds=10)
+        await db_session.commit()
+
+        assert await reaper.reconcile_stuck_reports(db_session, now=now) == {}
+        assert requested == []
+        await kestra_client.close_client()
+
+
+@pytest.mark.asyncio
+class TestExecutionStates:
+    """Test suite for the Kestra execution state lookup."""
+
+    async def test_states_by_execution(self, monkeypatch):
+        """Test states are fetched once per execution, with 404 as not found and errors left out."""
+        requested = _stub_kestra(monkeypatch, {"a": "SUCCESS", "b": "RUNNING", "c": 500})
+
+        states = await kestra_client.get_execution_states(["a", "b", "a", "c", "d"])
+
+        assert states == {"a": "SUCCESS", "b": "RUNNING", "d": kestra_client.EXECUTION_NOT_FOUND}
+        assert sorted(requested) == ["a", "b", "c", "d"]
+        await kestra_client.close_client()
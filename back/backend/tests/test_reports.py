@@ -2,6 +2,7 @@ import pytest
 from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.sql import Report, ReportStatus, User
+from app.schemas.report import ReportResponse
 
 
 @pytest.mark.asyncio
@@ -119,6 +120,167 @@ class TestReports:
         data = response.json()
         assert len(data) == 5  # Only 5 remaining after skipping 10
     
+    async def test_list_reports_cursor_pagination(
+        self,
+        authenticated_client: AsyncClient,
+        test_user: User,
+        db_session: AsyncSession
+    ):
+        """Test walking pages with the opaque cursor returns every report once, newest first."""
+        from datetime import datetime, timedelta
+        
+        base = datetime(2026, 1, 1)
+        # Pairs share a timestamp (as bulk inserts do) so the id tie-breaker is exercised
+        reports = [
+            Report(
+                id=f"cursor-{i:02d}",
+                user_id=test_user.id,
+                file_path=f"c{i}.png",
+                status=ReportStatus.DONE.value,
+                created_at=base + timedelta(minutes=i // 2)
+            )
+            for i in range(11)
+        ]
+        db_session.add_all(reports)
+        await db_session.commit()
+        
+        seen = []
+        cursor = None
+        while True:
+            url = "/reports?limit=4" + (f"&cursor={cursor}" if cursor else "")
+            response = await authenticated_client.get(url)
+            assert response.status_code == 200
+            seen.extend(r["id"] for r in response.json())
+            cursor = response.headers.get("x-next-cursor")
+            if not cursor:
+                break
+        
+        assert seen == [f"cursor-{i:02d}" for i in reversed(range(11))]
+    
+    async def test_list_reports_invalid_cursor(
+        self,
+        authenticated_client: AsyncClient
+    ):
+        """Test a malformed cursor is rejected."""
+        response = await authenticated_client.get("/reports?cursor=not-a-cursor")
+        assert response.status_code == 400
+    
+    async def test_list_reports_include_detections(
+        self,
+        authenticated_client: AsyncClient,
+        test_user: User,
+        db_session: AsyncSession
+    ):
+        """Test include=detections joins logs from one batched Mongo query."""
+        from unittest.mock import patch, AsyncMock, MagicMock
+        
+        db_session.add_all([
+            Report(id="with-log", user_id=test_user.id, file_path="a.png", status=ReportStatus.DONE.value),
+            Report(id="no-log", user_id=test_user.id, file_path="b.png", status=ReportStatus.PROCESSING.value),
+        ])
+        await db_session.commit()
+        
+        log = {
+            "_id": "log-1",
+            "report_id": "with-log",
+            "detections": [{"x1": 1, "y1": 2, "x2": 3, "y2": 4, "confidence": 0.9, "name": "fire", "class": 0}],
+            "processing_time_ms": 12.5,
+        }
+        cursor = MagicMock()
+        cursor.to_list = AsyncMock(return_value=[log])
+        collection = MagicMock()
+        collection.find.return_value = cursor
+        with patch("app.api.endpoints.reports.listing_logs_collection", return_value=collection):
+            response = await authenticated_client.get("/reports?include=detections")
+        mock_find = collection.find
+        
+        assert response.status_code == 200
+        mock_find.assert_called_once()
+        assert set(mock_find.call_args.args[0]["report_id"]["$in"]) == {"with-log", "no-log"}
+        by_id = {r["id"]: r for r in response.json()}
+        assert by_id["with-log"]["detections"][0]["class_name"] == "fire"
+        assert by_id["with-log"]["processing_time_ms"] == 12.5
+        assert by_id["no-log"]["detections"] == []
+    
+    async def test_list_reports_without_include_has_no_detections(
+        self,
+        authenticated_client: AsyncClient,
+        test_user: User,
+        db_session: AsyncSession
+    ):
+        """Test the plain listing keeps the compact ReportResponse shape."""
+        db_session.add(Report(id="plain", user_id=test_user.id, file_path="p.png", status=ReportStatus.DONE.value))
+        await db_session.commit()
+        
+        response = await authenticated_client.get("/reports")
+        
+        assert response.status_code == 200
+        assert set(response.json()[0]) == set(ReportResponse.model_fields)
+    
+    async def test_list_reports_filter_by_fire_confidence(
+        self,
+        authenticated_client: AsyncClient,
+        test_user: User,
+        db_session: AsyncSession
+    ):
+        """Test fire filters are answered from the summary columns."""
+        db_session.add_all([
+            Report(id="hot", user_id=test_user.id, file_path="h.png", status=ReportStatus.DONE.value,
+                   fire_confidence=0.92, smoke_confidence=0.4, detection_count=3),
+            Report(id="faint", user_id=test_user.id, file_path="f.png", status=ReportStatus.DONE.value,
+                   fire_confidence=0.3, smoke_confidence=0.8, detection_count=1),
+            Report(id="clear", user_id=test_user.id, file_path="c.png", status=ReportStatus.DONE.value,
+                   fire_confidence=0.0, smoke_confidence=0.0, detection_count=0),
+            Report(id="pending", user_id=test_user.id, file_path="p.png", status=ReportStatus.PROCESSING.value),
+        ])
+        await db_session.commit()
+        
+        response = await authenticated_client.get("/reports?fire_detected=true")
+        assert {r["id"] for r in response.json()} == {"hot", "faint"}
+        
+        response = await authenticated_client.get("/reports?fire_detected=false")
+        assert {r["id"] for r in response.json()} == {"clear"}
+        
+        response = await authenticated_client.get("/reports?min_fire_confidence=0.5")
+        data = response.json()
+        assert [r["id"] for r in data] == ["hot"]
+        assert data[0]["detection_count"] == 3
+        
+        response = await authenticated_client.get("/reports?min_smoke_confidence=0.5")
+        assert [r["id"] for r in response.json()] == ["faint"]
+    
+    async def test_list_reports_sorted_by_fire_confidence(
+        self,
+        authenticated_client: AsyncClient,
+        test_user: User,
+        db_session: AsyncSession
+    ):
+        """Test sort=fire_confidence pages highest first and skips unfinished reports."""
+        db_session.add_all([
+            Report(id=f"conf-{i}", user_id=test_user.id, file_path=f"{i}.png", status=ReportStatus.DONE.value,
+                   fire_confidence=round(0.1 * (i % 3), 1), detection_count=1)
+            for i in range(6)
+        ] + [Report(id="conf-pending", user_id=test_user.id, file_path="x.png", status=ReportStatus.PROCESSING.value)])
+        await db_session.commit()
+        
+        seen = []
+        cursor = None
+        while True:
+            url = "/reports?sort=fire_confidence&limit=4" + (f"&cursor={cursor}" if cursor else "")
+            response = await authenticated_client.get(url)
+            assert response.status_code == 200
+            seen.extend(r["id"] for r in response.json())
+            cursor = response.headers.get("x-next-cursor")
+            if not cursor:
+                break
+        
+        assert seen == ["conf-5", "conf-2", "conf-4", "conf-1", "conf-3", "conf-0"]
+        
+        # A cursor issued for one sort order is not valid for another
+        first = await authenticated_client.get("/reports?sort=fire_confidence&limit=1")
+        response = await authenticated_client.get(f"/reports?cursor={first.headers['x-next-cursor']}")
+        assert response.status_code == 400
+    
     async def test_get_report_detail_success(
         self,
         authenticated_client: AsyncClient,
@@ -0,0 +1,117 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+from httpx import AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.sql import Report, ReportStatus
+
+TOKEN = "test-internal-token"
+
+
+def result(report_id: str, status: str = "DONE", **fields) -> dict:
+    return {"report_id": report_id, "status": status, **fields}
+
+
+@pytest.mark.asyncio
+class TestResultIngestion:
+    """Test suite for POST /internal/results:bulk."""
+
+    @pytest.fixture(autouse=True)
+    def internal_token(self, monkeypatch):
+        monkeypatch.setattr(settings, "INTERNAL_API_TOKEN", TOKEN)
+
+    async def post(self, client: AsyncClient, items, token: str = TOKEN):
+        return await client.post(
+            "/internal/results:bulk",
+            json={"items": items},
+            headers={"X-Internal-Token": token},
+        )
+
+    async def test_requires_internal_token(self, client: AsyncClient, monkeypatch):
+        """Test wrong tokens are rejected and the endpoint is off without a configured token."""
+        assert (await self.post(client, [], token="wrong")).status_code == 401
+
+        monkeypatch.setattr(settings, "INTERNAL_API_TOKEN", None)
+        assert (await self.post(client, [])).status_code == 403
+
+    async def test_applies_batch_in_bulk(
+        self,
+        client: AsyncClient,
+        test_user,
+        db_session: AsyncSession
+    ):
+        """Test one request finishes many reports and writes detections in one call."""
+        db_session.add_all([
+            Report(id=f"r-{i}", user_id=test_user.id, file_path=f"{i}.jpg", status=ReportStatus.PROCESSING.value)
+            for i in range(3)
+        ])
+        await db_session.commit()
+
+        items = [
+            result("r-0", detections=[{"name": "fire", "confidence": 0.8}], processing_time_ms=40.0),
+            result("r-1", detections=[]),
+            result("r-2", status="ERROR", error="unreadable image"),
+        ]
+        with patch("app.core.results.replace_inference_logs", new_callable=AsyncMock) as write_logs:
+            response = await self.post(client, items)
+
+        assert response.status_code == 200
+        assert response.json() == {"applied": 3, "skipped": []}
+        write_logs.assert_awaited_once()
+        report_ids, logs = write_logs.await_args.args
+        assert report_ids == ["r-0", "r-1", "r-2"]
+        assert [log["report_id"] for log in logs] == ["r-0", "r-1"]
+        assert logs[0]["fire_confidence"] == 0.8
+
+        reports = {
+            r.id: r for r in (await db_session.execute(select(Report).where(Report.id.like("r-%")))).scalars()
+        }
+        assert reports["r-0"].status == ReportStatus.DONE.value
+        assert reports["r-0"].fire_confidence == 0.8
+        assert reports["r-0"].detection_count == 1
+        assert reports["r-1"].fire_confidence == 0.0
+        assert reports["r-2"].status == ReportStatus.ERROR.value
+        assert reports["r-2"].fire_confidence is None
+
+    async def test_redelivery_is_skipped(
+        self,
+        client: AsyncClient,
+        test_user,
+        db_session: AsyncSession
+    ):
+        """Test a retried request does not rewrite finished reports or their logs."""
+        db_session.add(Report(id="once", user_id=test_user.id, file_path="o.jpg", status=ReportStatus.PROCESSING.value))
+        await db_session.commit()
+        items = [result("once", detections=[{"name": "smoke", "confidence": 0.6}]), result("unknown")]
+
+        with patch("app.core.results.replace_inference_logs", new_callable=AsyncMock) as write_logs:
+            first = await self.post(client, items)
+            second = await self.post(client, items)
+
+        assert first.json() == {"applied": 1, "skipped": ["unknown"]}
+        assert second.json() == {"applied": 0, "skipped": ["once", "unknown"]}
+        assert write_logs.await_count == 1
+
+    async def test_completes_in_flight_duplicates(
+        self,
+        client: AsyncClient,
+        test_user,
+        db_session: AsyncSession
+    ):
+        """Test uploads deduplicated onto a report get its outcome."""
+        db_session.add_all([
+            Report(id="origin", user_id=test_user.id, file_path="o.jpg", status=ReportStatus.PROCESSING.value),
+            Report(id="copy", user_id=test_user.id, file_path="o.jpg", status=ReportStatus.PROCESSING.value,
+                   duplicate_of="origin"),
+        ])
+        await db_session.commit()
+
+        with patch("app.core.results.replace_inference_logs", new_callable=AsyncMock):
+            await self.post(client, [result("origin", detections=[{"name": "fire", "confidence": 0.9}])])
+
+        copy = (await db_session.execute(select(Report).where(Report.id == "copy"))).scalar_one()
+        await db_session.refresh(copy)
+        assert copy.status == ReportStatus.DONE.value
+        assert copy.fire_confidence == 0.9
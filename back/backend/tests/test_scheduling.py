@@ -0,0 +1,173 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import geo, metrics, outbox, scheduling
+from app.core.config import settings
+from app.models.sql import FlowTrigger, FlowTriggerStatus, InferencePriority, Report, ReportStatus, User
+from app.worker.batcher import MicroBatcher
+
+
+def _trigger(id: int, user_id: int, scheduled_at: datetime, priority: str = "normal") -> FlowTrigger:
+    return FlowTrigger(
+        id=id, report_id=f"r{id}", file_path=f"r{id}.png", user_id=user_id,
+        scheduled_at=scheduled_at, priority=priority,
+    )
+
+
+class TestResolvePriority:
+    """Test suite for picking an upload's priority class."""
+
+    def test_role_default_and_ceiling(self):
+        """Test that roles set the default class and users cannot request above it."""
+        assert scheduling.resolve_priority("user") == InferencePriority.NORMAL
+        assert scheduling.resolve_priority("sensor") == InferencePriority.HIGH
+        assert scheduling.resolve_priority("user", InferencePriority.CRITICAL) == InferencePriority.NORMAL
+        assert scheduling.resolve_priority("sensor", InferencePriority.BULK) == InferencePriority.BULK
+
+    def test_default_applies_only_without_request(self):
+        """Test that an explicit default (batch uploads) is used when nothing was requested."""
+        assert scheduling.resolve_priority("user", default=InferencePriority.BULK) == InferencePriority.BULK
+        assert scheduling.resolve_priority(
+            "user", InferencePriority.NORMAL, default=InferencePriority.BULK
+        ) == InferencePriority.NORMAL
+
+    def test_risk_zone_moves_up_one_class(self, monkeypatch):
+        """Test that uploads inside a risk zone geohash get one class more urgent."""
+        zone = geo.encode(-15.79, -47.88)
+        monkeypatch.setattr(settings, "PRIORITY_RISK_GEOHASHES", [zone[:4]])
+
+        assert scheduling.resolve_priority("user", geohash=zone) == InferencePriority.HIGH
+        assert scheduling.resolve_priority("admin", geohash=zone) == InferencePriority.CRITICAL
+        assert scheduling.resolve_priority("user", geohash=geo.encode(48.85, 2.35)) == InferencePriority.NORMAL
+
+
+class TestSchedule:
+    """Test suite for picking a dispatch round."""
+
+    def test_fair_share_between_users(self, monkeypatch):
+        """Test that a user's backlog does not fill the round ahead of other users."""
+        monkeypatch.setattr(settings, "SCHEDULER_FAIR_SHARE_SECONDS", 10.0)
+        start = datetime(2026, 1, 1)
+        backlog = [_trigger(i, user_id=1, scheduled_at=start + timedelta(seconds=i)) for i in range(1, 6)]
+        other = _trigger(10, user_id=2, scheduled_at=start + timedelta(seconds=8))
+
+        chosen = scheduling.schedule(backlog + [other], limit=3)
+
+        assert [t.id for t in chosen] == [1, 10, 2]
+
+    def test_class_delay_orders_and_prevents_starvation(self):
+        """Test that urgent classes overtake newer work, but old bulk work eventually wins."""
+        now = datetime(2026, 1, 1, 12, 0)
+        critical = _trigger(1, 1, scheduling.scheduled_at("critical", now))
+        normal = _trigger(2, 2, scheduling.scheduled_at("normal", now - timedelta(seconds=60)))
+        old_bulk = _trigger(3, 3, scheduling.scheduled_at("bulk", now - timedelta(hours=1)))
+        new_bulk = _trigger(4, 4, scheduling.scheduled_at("bulk", now))
+
+        chosen = scheduling.schedule([new_bulk, normal, critical, old_bulk], limit=4)
+
+        assert [t.id for t in chosen] == [3, 1, 2, 4]
+
+    def test_lower_classes_wait_for_urgent_ones(self):
+        """Test that early triggers of a less urgent class are held back, overdue ones are not."""
+        now = datetime(2026, 1, 1, 12, 0)
+        high = _trigger(1, 1, scheduling.scheduled_at("high", now), "high")
+        normal = _trigger(2, 2, scheduling.scheduled_at("normal", now), "normal")
+        overdue_bulk = _trigger(3, 3, scheduling.scheduled_at("bulk", now - timedelta(hours=1)), "bulk")
+
+        assert [t.id for t in scheduling.eligible([high, normal, overdue_bulk], now)] == [1, 3]
+        assert [t.id for t in scheduling.eligible([normal], now)] == [2]
+
+
+@pytest.mark.asyncio
+class TestPriorityDispatch:
+    """Test suite for priority-aware outbox dispatch."""
+
+    async def test_urgent_trigger_dispatched_first(
+        self, db_session: AsyncSession, test_user: User, mock_kestra_trigger, monkeypatch
+    ):
+        """Test that a critical trigger enqueued later is sent before a bulk backlog."""
+        monkeypatch.setattr(settings, "OUTBOX_BATCH_SIZE", 1)
+        for report_id, priority in [("bulk-1", "bulk"), ("bulk-2", "bulk"), ("alert", "critical")]:
+            db_session.add(Report(
+                id=report_id, user_id=test_user.id, file_path=f"{report_id}.png",
+                status=ReportStatus.PROCESSING.value,
+            ))
+            outbox.enqueue_flow_trigger(
+                db_session, report_id=report_id, file_path=f"{report_id}.png",
+                user_id=test_user.id, priority=priority,
+            )
+        await db_session.commit()
+        waits = metrics.INFERENCE_QUEUE_WAIT.get_count(priority="critical")
+
+        assert await outbox.dispatch_due_triggers(db_session) == 1
+
+        sent = (await db_session.execute(
+            select(FlowTrigger.report_id).where(FlowTrigger.status == FlowTriggerStatus.SENT.value)
+        )).scalars().all()
+        assert sent == ["alert"]
+        assert metrics.INFERENCE_QUEUE_WAIT.get_count(priority="critical") == waits + 1
+
+    async def test_bulk_waits_while_urgent_work_is_pending(
+        self, db_session: AsyncSession, test_user: User, mock_kestra_trigger
+    ):
+        """Test that bulk triggers stay pending in a round with high triggers, and go in the next one."""
+        for report_id, priority in [("bulk-held", "bulk"), ("sensor-1", "high"), ("sensor-2", "high")]:
+            db_session.add(Report(
+                id=report_id, user_id=test_user.id, file_path=f"{report_id}.png",
+                status=ReportStatus.PROCESSING.value,
+            ))
+            outbox.enqueue_flow_trigger(
+                db_session, report_id=report_id, file_path=f"{report_id}.png",
+                user_id=test_user.id, priority=priority,
+            )
+        await db_session.commit()
+
+        async def statuses() -> dict:
+            return dict((await db_session.execute(select(FlowTrigger.report_id, FlowTrigger.status))).all())
+
+        assert await outbox.dispatch_due_triggers(db_session) == 2
+        assert (await statuses())["bulk-held"] == FlowTriggerStatus.PENDING.value
+
+        assert await outbox.dispatch_due_triggers(db_session) == 1
+        assert (await statuses())["bulk-held"] == FlowTriggerStatus.SENT.value
+
+    async def test_uploads_record_priority(
+        self, authenticated_client: AsyncClient, db_session: AsyncSession, mock_kestra_trigger
+    ):
+        """Test that single uploads default to normal, requested classes and batches to bulk."""
+        single = await authenticated_client.post(
+            "/files/upload", files={"file": ("a.png", b"single upload", "image/png")}
+        )
+        archival = await authenticated_client.post(
+            "/files/upload",
+            files={"file": ("b.png", b"archival upload", "image/png")},
+            data={"priority": "bulk"},
+        )
+        batch = await authenticated_client.post(
+            "/files/upload/batch", files=[("files", ("c.png", b"batch upload", "image/png"))]
+        )
+
+        priorities = dict((await db_session.execute(select(FlowTrigger.report_id, FlowTrigger.priority))).all())
+        assert priorities[single.json()["id"]] == "normal"
+        assert priorities[archival.json()["id"]] == "bulk"
+        assert priorities[batch.json()["reports"][0]["id"]] == "bulk"
+
+
+@pytest.mark.asyncio
+class TestWorkerPriorityQueue:
+    """Test suite for priority ordering in the worker's micro-batcher."""
+
+    async def test_dequeues_by_priority_then_fifo(self):
+        """Test that urgent jobs are batched first, in arrival order within a priority."""
+        batcher = MicroBatcher(handler=None, max_batch_size=4, max_wait_s=10, priority=lambda job: job[0])
+        for job in [(3, "bulk-a"), (2, "normal"), (0, "critical"), (3, "bulk-b")]:
+            batcher.submit_nowait(job)
+
+        batch = await asyncio.wait_for(batcher.next_batch(), timeout=1)
+
+        assert [name for _, name in batch] == ["critical", "normal", "bulk-a", "bulk-b"]
@@ -1,7 +1,16 @@
+import hashlib
+import os
 import pytest
 from httpx import AsyncClient
 from io import BytesIO
-from unittest.mock import patch, mock_open, MagicMock
+from unittest.mock import patch
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.endpoints.upload import UPLOAD_DIR
+from app.core import outbox
+from app.core.config import settings
+from app.models.sql import FlowTrigger, FlowTriggerStatus, Report
 
 
 @pytest.mark.asyncio
@@ -13,30 +22,26 @@ class TestUpload:
         authenticated_client: AsyncClient,
         mock_kestra_trigger
     ):
-        """Test successful image upload with mocked filesystem."""
+        """Test successful image upload is streamed to the shared volume."""
         # Create fake image file
         fake_image = BytesIO(b"fake image content")
         fake_image.name = "test.png"
         
-        with patch("builtins.open", mock_open()) as mock_file, \
-             patch("shutil.copyfileobj") as mock_copy, \
-             patch("os.path.join", return_value="/shared-data/uploads/test.png"):
-            
-            response = await authenticated_client.post(
-                "/files/upload",
-                files={"file": ("test.png", fake_image, "image/png")},
-                data={"latitude": 40.7128, "longitude": -74.0060}
-            )
-            
-            assert response.status_code == 202
-            data = response.json()
-            assert data["status"] == "PROCESSING"
-            assert "id" in data
-            assert data["file_path"].endswith(".png")
-            
-            # Verify file operations were called
-            mock_file.assert_called_once()
-            mock_copy.assert_called_once()
+        response = await authenticated_client.post(
+            "/files/upload",
+            files={"file": ("test.png", fake_image, "image/png")},
+            data={"latitude": 40.7128, "longitude": -74.0060}
+        )
+        
+        assert response.status_code == 202
+        data = response.json()
+        assert data["status"] == "PROCESSING"
+        assert "id" in data
+        assert data["file_path"].endswith(".png")
+        
+        # Verify the file landed on disk intact
+        with open(os.path.join(UPLOAD_DIR, data["file_path"]), "rb") as saved:
+            assert saved.read() == b"fake image content"
     
     async def test_upload_non_image_fails(
         self,
@@ -78,47 +83,46 @@ class TestUpload:
         fake_image = BytesIO(b"fake image content")
         fake_image.name = "test.jpg"
         
-        with patch("builtins.open", mock_open()), \
-             patch("shutil.copyfileobj"), \
-             patch("os.path.join", return_value="/shared-data/uploads/test.jpg"):
-            
-            response = await authenticated_client.post(
-                "/files/upload",
-                files={"file": ("test.jpg", fake_image, "image/jpeg")},
-                data={
-                    "latitude": -23.5505,
-                    "longitude": -46.6333
-                }
-            )
-            
-            assert response.status_code == 202
-            data = response.json()
-            assert data["latitude"] == -23.5505
-            assert data["longitude"] == -46.6333
+        response = await authenticated_client.post(
+            "/files/upload",
+            files={"file": ("test.jpg", fake_image, "image/jpeg")},
+            data={
+                "latitude": -23.5505,
+                "longitude": -46.6333
+            }
+        )
+        
+        assert response.status_code == 202
+        data = response.json()
+        assert data["latitude"] == -23.5505
+        assert data["longitude"] == -46.6333
     
     async def test_upload_triggers_kestra(
         self,
         authenticated_client: AsyncClient,
+        db_session: AsyncSession,
         mock_kestra_trigger
     ):
-        """Test that upload triggers Kestra flow."""
+        """Test that upload queues a Kestra trigger in the outbox, which the dispatcher sends."""
         fake_image = BytesIO(b"fake image")
         fake_image.name = "fire.png"
         
-        with patch("builtins.open", mock_open()), \
-             patch("shutil.copyfileobj"), \
-             patch("os.path.join", return_value="/shared-data/uploads/fire.png"):
-            
-            response = await authenticated_client.post(
-                "/files/upload",
-                files={"file": ("fire.png", fake_image, "image/png")}
-            )
-            
-            assert response.status_code == 202
-            # Kestra trigger is mocked in conftest.py
-            # The mock returns "mock-execution-{report_id}"
-            # We verify it was called by checking the response exists
-            assert "id" in response.json()
+        response = await authenticated_client.post(
+            "/files/upload",
+            files={"file": ("fire.png", fake_image, "image/png")}
+        )
+        
+        assert response.status_code == 202
+        report_id = response.json()["id"]
+        # The upload only writes a PENDING FlowTrigger; Kestra is called by the outbox
+        result = await db_session.execute(select(FlowTrigger).where(FlowTrigger.report_id == report_id))
+        trigger = result.scalar_one()
+        assert trigger.status == FlowTriggerStatus.PENDING.value
+        
+        # Kestra trigger is mocked in conftest.py ("mock-execution-{report_id}")
+        await outbox.dispatch_due_triggers(db_session)
+        assert trigger.status == FlowTriggerStatus.SENT.value
+        assert trigger.execution_id == f"mock-execution-{report_id}"
     
     async def test_upload_filesystem_error_handling(
         self,
@@ -128,7 +132,7 @@ class TestUpload:
         fake_image = BytesIO(b"fake image")
         fake_image.name = "test.png"
         
-        with patch("builtins.open", side_effect=PermissionError("No write access")):
+        with patch("app.core.storage.aiofiles.open", side_effect=PermissionError("No write access")):
             response = await authenticated_client.post(
                 "/files/upload",
                 files={"file": ("test.png", fake_image, "image/png")}
@@ -136,3 +140,135 @@ class TestUpload:
             
             assert response.status_code == 500
             assert "Could not save file" in response.json()["detail"]
+
+    async def test_upload_records_content_hash(
+        self,
+        authenticated_client: AsyncClient,
+        db_session: AsyncSession,
+        mock_kestra_trigger
+    ):
+        """Test the SHA-256 digest and size are computed while streaming."""
+        content = b"frame bytes" * 1000
+        
+        response = await authenticated_client.post(
+            "/files/upload",
+            files={"file": ("frame.jpg", BytesIO(content), "image/jpeg")}
+        )
+        
+        assert response.status_code == 202
+        result = await db_session.execute(select(Report).where(Report.id == response.json()["id"]))
+        report = result.scalars().first()
+        assert report.content_hash == hashlib.sha256(content).hexdigest()
+        assert report.size_bytes == len(content)
+    
+    async def test_upload_too_large_rejected(
+        self,
+        authenticated_client: AsyncClient,
+        monkeypatch
+    ):
+        """Test uploads over the size limit are rejected without leaving partial files."""
+        monkeypatch.setattr(settings, "MAX_UPLOAD_SIZE_MB", 1)
+        monkeypatch.setattr(settings, "UPLOAD_CHUNK_SIZE_KB", 64)
+        files_before = set(os.listdir(UPLOAD_DIR))
+        
+        response = await authenticated_client.post(
+            "/files/upload",
+            files={"file": ("huge.png", BytesIO(b"0" * (1024 * 1024 + 1)), "image/png")}
+        )
+        
+        assert response.status_code == 413
+        assert set(os.listdir(UPLOAD_DIR)) == files_before
+    
+    async def test_batch_upload_success(
+        self,
+        authenticated_client: AsyncClient,
+        db_session: AsyncSession
+    ):
+        """Test batch upload creates one report and one grouped trigger per image."""
+        from app.models.sql import FlowTrigger
+        
+        files = [
+            ("files", (f"frame{i}.jpg", BytesIO(f"frame {i}".encode()), "image/jpeg"))
+            for i in range(5)
+        ]
+        response = await authenticated_client.post(
+            "/files/upload/batch",
+            files=files,
+            data={"latitude": -15.8, "longitude": -47.9}
+        )
+        
+        assert response.status_code == 202
+        data = response.json()
+        assert len(data["reports"]) == 5
+        assert data["errors"] == []
+        assert all(r["status"] == "PROCESSING" for r in data["reports"])
+        assert all(r["latitude"] == -15.8 for r in data["reports"])
+        
+        report_ids = {r["id"] for r in data["reports"]}
+        result = await db_session.execute(select(FlowTrigger).where(FlowTrigger.report_id.in_(report_ids)))
+        triggers = result.scalars().all()
+        assert len(triggers) == 5
+        assert {t.batch_id for t in triggers} == {data["batch_id"]}
+    
+    async def test_batch_upload_reports_invalid_files(
+        self,
+        authenticated_client: AsyncClient
+    ):
+        """Test invalid files are reported per file without failing the batch."""
+        files = [
+            ("files", ("ok.png", BytesIO(b"image"), "image/png")),
+            ("files", ("notes.txt", BytesIO(b"text"), "text/plain")),
+        ]
+        response = await authenticated_client.post("/files/upload/batch", files=files)
+        
+        assert response.status_code == 202
+        data = response.json()
+        assert len(data["reports"]) == 1
+        assert data["errors"] == [{"filename": "notes.txt", "detail": "File must be an image"}]
+    
+    async def test_batch_upload_too_many_files(
+        self,
+        authenticated_client: AsyncClient,
+        monkeypatch
+    ):
+        """Test the batch size limit is enforced."""
+        monkeypatch.setattr(settings, "MAX_BATCH_UPLOAD_FILES", 2)
+        files = [("files", (f"{i}.png", BytesIO(b"x"), "image/png")) for i in range(3)]
+        
+        response = await authenticated_client.post("/files/upload/batch", files=files)
+        
+        assert response.status_code == 400
+    
+    async def test_video_upload_creates_one_report(
+        self,
+        authenticated_client: AsyncClient,
+        db_session: AsyncSession
+    ):
+        """Test a video gets one report and a video trigger carrying its sampling options."""
+        from app.models.sql import FlowTrigger, MediaType
+        
+        response = await authenticated_client.post(
+            "/files/upload/video",
+            files={"file": ("tower.mp4", BytesIO(b"fake video"), "video/mp4")},
+            data={"sampling": "scene", "interval_s": 2.5},
+        )
+        
+        assert response.status_code == 202
+        data = response.json()
+        assert data["media_type"] == MediaType.VIDEO.value
+        assert data["file_path"].endswith(".mp4")
+        
+        result = await db_session.execute(select(FlowTrigger).where(FlowTrigger.report_id == data["id"]))
+        trigger = result.scalar_one()
+        assert trigger.media_type == MediaType.VIDEO.value
+        assert trigger.options == {"mode": "scene", "interval_s": 2.5}
+    
+    async def test_video_upload_rejects_images(self, authenticated_client: AsyncClient):
+        """Test the video endpoint only accepts video content types."""
+        response = await authenticated_client.post(
+            "/files/upload/video",
+            files={"file": ("photo.png", BytesIO(b"x"), "image/png")},
+        )
+        
+        assert response.status_code == 400
+        assert "must be a video" in response.json()["detail"]
@@ -0,0 +1,352 @@
+import asyncio
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+from app.core import outbox, worker_client
+from app.core.config import settings
+from app.models.sql import FlowTriggerStatus, ReportStatus
+from app.schemas.inference import InferenceJob
+from app.worker import main as worker_main
+from app.worker.batcher import MicroBatcher
+from app.worker.detector import DetectionResult
+
+
+@pytest.mark.asyncio
+class TestMicroBatcher:
+    """Test suite for the worker micro-batcher."""
+
+    async def test_flushes_at_max_batch_size(self):
+        """Test a full batch is returned without waiting for the timeout."""
+        batcher = MicroBatcher(handler=None, max_batch_size=3, max_wait_s=10)
+        for i in range(5):
+            batcher.submit_nowait(i)
+
+        batch = await asyncio.wait_for(batcher.next_batch(), timeout=1)
+
+        assert batch == [0, 1, 2]
+        assert batcher.qsize() == 2
+
+    async def test_flushes_after_max_wait(self):
+        """Test a partial batch is flushed once max_wait elapses."""
+        batcher = MicroBatcher(handler=None, max_batch_size=10, max_wait_s=0.05)
+        batcher.submit_nowait("a")
+
+        batch = await asyncio.wait_for(batcher.next_batch(), timeout=1)
+
+        assert batch == ["a"]
+
+    async def test_queue_capacity(self):
+        """Test capacity checks respect the bounded queue."""
+        batcher = MicroBatcher(handler=None, max_batch_size=2, max_wait_s=0, max_queue_size=2)
+        batcher.submit_nowait(1)
+
+        assert batcher.has_capacity(1)
+        assert not batcher.has_capacity(2)
+
+    async def test_in_flight_counts_the_batch_being_handled(self):
+        """Test the batch being handled is counted until its handler returns, failed or not."""
+        seen = []
+
+        async def handler(batch):
+            seen.append(batcher.in_flight)
+            raise RuntimeError("model failed")
+        batcher = MicroBatcher(handler=handler, max_batch_size=4, max_wait_s=0)
+        for i in range(3):
+            batcher.submit_nowait(i)
+
+        consumer = asyncio.create_task(batcher.run())
+        await asyncio.sleep(0.05)
+        consumer.cancel()
+
+        assert seen == [3]
+        assert batcher.in_flight == 0
+
+
+@pytest.mark.asyncio
+class TestInferenceWorker:
+    """Test suite for the resident inference worker service."""
+
+    async def test_submit_jobs_queues_items(self, monkeypatch):
+        """Test the /jobs endpoint enqueues jobs and rejects when full."""
+        batcher = MicroBatcher(handler=None, max_batch_size=4, max_wait_s=0, max_queue_size=3)
+        monkeypatch.setattr(worker_main, "batcher", batcher)
+        transport = ASGITransport(app=worker_main.app)
+
+        async with AsyncClient(transport=transport, base_url="http://worker") as client:
+            items = [{"report_id": f"r{i}", "file_path": f"r{i}.png"} for i in range(2)]
+            response = await client.post("/jobs", json={"items": items})
+            assert response.status_code == 202
+            assert response.json() == {"accepted": 2, "queue_depth": 2}
+
+            response = await client.post("/jobs", json={"items": items})
+            assert response.status_code == 503
+            assert batcher.qsize() == 2
+
+    async def test_process_batch_runs_model_once(self, monkeypatch):
+        """Test a micro-batch goes through one predict call and one store call."""
+        calls = []
+
+        def fake_predict(report_ids, image_paths):
+            calls.append(image_paths)
+            return [DetectionResult(report_id=r, status=ReportStatus.DONE.value) for r in report_ids]
+
+        stored = []
+
+        async def fake_store(results):
+            stored.extend(results)
+
+        monkeypatch.setattr(worker_main.detector, "predict_batch", fake_predict)
+        monkeypatch.setattr(worker_main, "store_results", fake_store)
+
+        await worker_main.process_batch([
+            InferenceJob(report_id="a", file_path="a.png"),
+            InferenceJob(report_id="b", file_path="b.png"),
+        ])
+
+        assert len(calls) == 1
+        assert calls[0][1].endswith("b.png")
+        assert [r.report_id for r in stored] == ["a", "b"]
+
+
+@pytest.mark.asyncio
+class TestWorkerDispatch:
+    """Test suite for dispatching outbox triggers to the worker."""
+
+    async def test_outbox_dispatches_to_worker(self, db_session, monkeypatch):
+        """Test INFERENCE_BACKEND=worker sends all due triggers in one request."""
+        submitted = []
+
+        async def fake_submit(items):
+            submitted.append(items)
+            return f"worker:{items[0]['report_id']}"
+
+        monkeypatch.setattr(settings, "INFERENCE_BACKEND", "worker")
+        monkeypatch.setattr(worker_client, "submit_inference_jobs", fake_submit)
+        triggers = [
+            outbox.enqueue_flow_trigger(db_session, report_id=f"w-{i}", file_path=f"w-{i}.png")
+            for i in range(3)
+        ]
+        await db_session.commit()
+
+        assert await outbox.dispatch_due_triggers(db_session) == 3
+        assert len(submitted) == 1
+        assert len(submitted[0]) == 3
+        assert all(t.status == FlowTriggerStatus.SENT.value for t in triggers)
+
+
+    async def test_video_triggers_go_to_worker_with_kestra_backend(self, db_session, monkeypatch):
+        """Test video triggers are queued on the worker even when Kestra handles images."""
+        from app.core import kestra_client
+        from app.models.sql import MediaType
+
+        submitted = []
+
+        async def fake_submit(items):
+            submitted.append(items)
+            return f"worker:{items[0]['report_id']}"
+
+        async def fail_kestra(*args, **kwargs):
+            raise AssertionError("videos must not be sent to Kestra")
+
+        monkeypatch.setattr(settings, "INFERENCE_BACKEND", "kestra")
+        monkeypatch.setattr(worker_client, "submit_inference_jobs", fake_submit)
+        monkeypatch.setattr(kestra_client, "trigger_fire_detection_flow", fail_kestra)
+        outbox.enqueue_flow_trigger(
+            db_session, report_id="v-1", file_path="v-1.mp4",
+            media_type=MediaType.VIDEO.value, options={"mode": "scene"},
+        )
+        await db_session.commit()
+
+        assert await outbox.dispatch_due_triggers(db_session) == 1
+        assert submitted == [[
+            {"report_id": "v-1", "file_path": "v-1.mp4", "priority": 2, "media_type": "video", "options": {"mode": "scene"}}
+        ]]
+
+
+class TestDetectionSummary:
+    """Test suite for the denormalized detection summary."""
+
+    def test_summary_takes_max_confidence_per_class(self):
+        """Test fire/smoke confidences are per-class maxima."""
+        from app.core.detections import summarize_detections
+
+        summary = summarize_detections(
+            [
+                {"name": "fire", "confidence": 0.4},
+                {"name": "Fire", "confidence": 0.9},
+                {"name": "smoke", "confidence": 0.7},
+                {"name": "person", "confidence": 0.99},
+            ],
+            processing_time_ms=12.0,
+        )
+
+        assert summary == {
+            "fire_confidence": 0.9,
+            "smoke_confidence": 0.7,
+            "detection_count": 4,
+            "processing_time_ms": 12.0,
+        }
+
+    def test_summary_of_no_detections(self):
+        """Test an empty result summarizes to zero confidences."""
+        from app.core.detections import summarize_detections
+
+        summary = summarize_detections([])
+
+        assert summary["fire_confidence"] == 0.0
+        assert summary["detection_count"] == 0
+
+
+class TestTiledInference:
+    """Test suite for tiled inference of very large images."""
+
+    def test_tiles_cover_image_with_overlap(self):
+        """Test the grid covers every pixel and neighbours overlap."""
+        from app.worker.tiling import tile_grid, tile_origins
+
+        assert tile_origins(1500, 640, 128) == [0, 512, 860]
+        assert tile_origins(500, 640, 128) == [0]
+
+        tiles = tile_grid(1500, 700, 640, 128)
+        assert len(tiles) == 6
+        assert max(x + w for x, _, w, _ in tiles) == 1500
+        assert max(y + h for _, y, _, h in tiles) == 700
+
+    def test_merge_keeps_one_box_across_tile_border(self):
+        """Test a plume seen by two overlapping tiles is reported once."""
+        from app.worker.tiling import merge_detections, offset_detections
+
+        left = offset_detections([{"x1": 500, "y1": 10, "x2": 600, "y2": 60, "confidence": 0.7, "class": 1}], 0, 0)
+        right = offset_detections([{"x1": -10, "y1": 12, "x2": 88, "y2": 61, "confidence": 0.9, "class": 1}], 512, 0)
+        other_class = [{"x1": 505, "y1": 10, "x2": 600, "y2": 60, "confidence": 0.5, "class": 0}]
+
+        merged = merge_detections(left + right + other_class, iou_threshold=0.5)
+
+        assert [(d["class"], d["confidence"]) for d in merged] == [(1, 0.9), (0, 0.5)]
+        assert merged[0]["x1"] == 502
+
+    def test_decode_is_reduced_under_the_memory_cap(self):
+        """Test frames over the cap are decoded at the smallest JPEG scale that fits, boxes scaled back."""
+        from io import BytesIO
+        from PIL import Image
+        from app.worker.tiling import decode_reduction, scale_detections
+
+        assert decode_reduction(8000, 6000, 0) == 1
+        assert decode_reduction(8000, 6000, 48_000_000) == 1
+        assert decode_reduction(8000, 6000, 20_000_000) == 2
+        assert decode_reduction(8000, 6000, 1_000_000) == 8
+        assert decode_reduction(8000, 6000, 500_000) is None
+
+        buffer = BytesIO()
+        Image.new("RGB", (3000, 2001)).save(buffer, "JPEG")
+        with Image.open(buffer) as image:
+            reduction = decode_reduction(3000, 2001, 1_000_000)
+            image.draft("RGB", (3000 // reduction, 2001 // reduction))
+            assert reduction == 4
+            assert image.width * image.height <= 1_000_000
+
+        box = {"x1": 10, "y1": 20, "x2": 30, "y2": 40, "confidence": 0.9}
+        assert scale_detections([box], 4)[0] == {"x1": 40, "y1": 80, "x2": 120, "y2": 160, "confidence": 0.9}
+
+    def test_large_images_are_routed_to_tiled_mode(self, monkeypatch):
+        """Test predict_batch sends oversized images through predict_tiled, in order."""
+        from app.worker.detector import FireDetector
+
+        detector = FireDetector("missing.pt", tile_min_pixels=1)
+        monkeypatch.setattr(detector, "needs_tiling", lambda path: path.startswith("big"))
+        monkeypatch.setattr(
+            detector, "predict_tiled",
+            lambda report_id, path: DetectionResult(report_id=report_id, status="TILED"),
+        )
+        detector.model = lambda paths, verbose=False: [type("R", (), {"boxes": []})() for _ in paths]
+
+        results = detector.predict_batch(["a", "b", "c"], ["small-a.png", "big-b.png", "small-c.png"])
+
+        assert [(r.report_id, r.status) for r in results] == [
+            ("a", ReportStatus.DONE.value),
+            ("b", "TILED"),
+            ("c", ReportStatus.DONE.value),
+        ]
+
+
+class TestVideoSampling:
+    """Test suite for video frame sampling and per-frame inference."""
+
+    def test_interval_mode_skips_near_duplicates(self):
+        """Test one candidate per interval, and static frames are dropped."""
+        from app.worker.video import FrameSampler
+
+        sampler = FrameSampler(interval_s=1.0, dedup_threshold=4)
+        kept = []
+        for i in range(50):  # 10 fps for 5 s: static scene, then a change at 3 s
+            t = i / 10
+            if sampler.wants(t) and sampler.offer(t, 0 if t < 3 else 0xFFFF):
+                kept.append(t)
+
+        assert kept == [0.0, 3.0]
+        assert sampler.skipped_duplicates == 3
+
+    def test_scene_mode_keeps_only_scene_changes(self):
+        """Test small changes are ignored until the hash moves past the scene threshold."""
+        from app.worker.video import SCENE, FrameSampler
+
+        sampler = FrameSampler(mode=SCENE, check_interval_s=0.0, scene_threshold=12, dedup_threshold=2)
+        hashes = [0, 0b111, 0b1111111, 0xFFFF, 0xFFFF]
+
+        assert [sampler.offer(t, h) for t, h in enumerate(hashes)] == [True, False, False, True, False]
+        assert sampler.kept == 2
+
+    def test_sampler_stops_at_max_frames(self):
+        """Test no more frames are requested once max_frames are kept."""
+        from app.worker.video import FrameSampler
+
+        sampler = FrameSampler(interval_s=0.0, dedup_threshold=-1, max_frames=2)
+        sampler.offer(0.0, 1)
+        sampler.offer(1.0, 2)
+
+        assert sampler.done
+        assert not sampler.wants(2.0)
+
+    def test_dhash_compares_horizontal_gradients(self):
+        """Test the hash has one bit per neighbouring pixel pair."""
+        from app.worker.video import dhash, hamming
+
+        falling = [[9 - x for x in range(9)] for _ in range(8)]
+        rising = [list(range(9)) for _ in range(8)]
+
+        assert dhash(falling) == 2 ** 64 - 1
+        assert dhash(rising) == 0
+        assert hamming(dhash(falling), dhash(rising)) == 64
+
+    def test_predict_video_batches_frames_and_summarizes(self, monkeypatch):
+        """Test sampled frames are inferred in batches and summarized over time."""
+        from app.worker import detector as detector_module
+        from app.worker.detector import FireDetector
+        from app.worker.video import FrameSampler
+
+        samples = [(i * 25, float(i), f"frame-{i}") for i in range(5)]
+        monkeypatch.setattr(detector_module, "iter_sampled_frames", lambda path, sampler: iter(samples))
+
+        batches = []
+
+        def fake_model(frames, verbose=False):
+            batches.append(frames)
+            return frames
+
+        detector = FireDetector("missing.pt", video_batch_size=2)
+        detector.model = fake_model
+        fire = {"2": 0.4, "3": 0.8}
+        monkeypatch.setattr(
+            detector, "_to_detections",
+            lambda frame: [{"name": "fire", "confidence": fire[frame[-1]]}] if frame[-1] in fire else [],
+        )
+
+        result = detector.predict_video("v", "v.mp4", FrameSampler(), fire_threshold=0.25)
+
+        assert [len(b) for b in batches] == [2, 2, 1]
+        assert [f["frame_index"] for f in result.frames] == [0, 25, 50, 75, 100]
+        assert result.detections == [{"name": "fire", "confidence": 0.8}]
+        assert result.video_summary["fire_frames"] == 2
+        assert result.video_summary["first_fire_s"] == 2.0
+        assert result.video_summary["last_fire_s"] == 3.0
+        assert result.video_summary["peak_fire_s"] == 3.0
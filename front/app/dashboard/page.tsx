@@ -3,7 +3,7 @@
 import { useState, useEffect } from 'react';
 import { useRouter } from 'next/navigation';
 import Link from 'next/link';
-import { apiClient, Report } from '@/lib/api';
+import { apiClient, Report, thumbnailUrl } from '@/lib/api';
 import StatsChart from '@/app/components/StatsChart';
 
 export default function Dashboard() {
@@ -19,6 +19,15 @@ export default function Dashboard() {
             return;
         }
         loadReports();
+
+        // Status changes are pushed by the server instead of re-polling the list
+        return apiClient.subscribeToReportEvents((event) => {
+            setReports((current) =>
+                current.map((report) =>
+                    report.id === event.report_id ? { ...report, status: event.status, ...event.summary } : report
+                )
+            );
+        });
     }, [router]);
 
     const loadReports = async () => {
@@ -137,6 +146,14 @@ export default function Dashboard() {
                                     href={`/dashboard/report/${report.id}`}
                                     className="flex items-center justify-between p-4 border border-gray-200 rounded-lg hover:bg-gray-50 transition-colors cursor-pointer"
                                 >
+                                    {thumbnailUrl(report) && (
+                                        <img
+                                            src={thumbnailUrl(report)!}
+                                            alt=""
+                                            loading="lazy"
+                                            className="w-16 h-16 object-cover rounded mr-4"
+                                        />
+                                    )}
                                     <div className="flex-1">
                                         <div className="flex items-center gap-3">
                                             <span className="font-mono text-sm text-gray-600">#{report.id.slice(0, 8)}</span>
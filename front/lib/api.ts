@@ -4,6 +4,11 @@
 
 const API_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000';
 
+// Thumbnail for list views (falls back to nothing when the upload was not processed)
+export function thumbnailUrl(report: Report): string | null {
+    return report.thumbnail_path ? `${API_URL}/static/uploads/${report.thumbnail_path}` : null;
+}
+
 export interface LoginRequest {
     username: string;
     password: string;
@@ -12,6 +17,8 @@ export interface LoginRequest {
 export interface TokenResponse {
     access_token: string;
     token_type: string;
+    refresh_token?: string;
+    expires_in?: number;
 }
 
 export interface Report {
@@ -22,6 +29,18 @@ export interface Report {
     created_at: string;
     latitude?: number;
     longitude?: number;
+    fire_confidence?: number | null;
+    smoke_confidence?: number | null;
+    detection_count?: number | null;
+    processing_time_ms?: number | null;
+    completed_at?: string | null;
+    duplicate_of?: string | null;
+    thumbnail_path?: string | null;
+    image_width?: number | null;
+    image_height?: number | null;
+    media_type?: 'image' | 'video';
+    frame_count?: number | null;
+    first_fire_s?: number | null;
 }
 
 export interface BoundingBox {
@@ -33,28 +52,126 @@ export interface BoundingBox {
     class_name: string;
 }
 
+export interface FrameDetections {
+    frame_index: number;
+    timestamp_s: number;
+    detections: BoundingBox[];
+}
+
+export interface VideoSummary {
+    sampled_frames: number;
+    skipped_duplicates: number;
+    fire_frames: number;
+    first_fire_s: number | null;
+    last_fire_s: number | null;
+    peak_fire_s: number | null;
+    duration_s: number;
+}
+
 export interface ReportDetail extends Report {
     detections: BoundingBox[];
     model_version?: string;
-    processing_time_ms?: number;
+    frames?: FrameDetections[];
+    video_summary?: VideoSummary | null;
+}
+
+export interface MapBounds {
+    min_lat: number;
+    min_lon: number;
+    max_lat: number;
+    max_lon: number;
+}
+
+export interface ReportTile {
+    cell: string;
+    latitude: number;
+    longitude: number;
+    count: number;
+    max_fire_confidence: number | null;
+}
+
+export interface ReportEvent {
+    report_id: string;
+    user_id: number;
+    status: Report['status'];
+    summary?: {
+        fire_confidence: number | null;
+        smoke_confidence: number | null;
+        detection_count: number;
+    };
 }
 
 class ApiClient {
     private baseUrl: string;
     private token: string | null = null;
+    private refreshToken: string | null = null;
+    private refreshing: Promise<boolean> | null = null;
 
     constructor(baseUrl: string) {
         this.baseUrl = baseUrl;
 
-        // Load token from localStorage if available
+        // Load tokens from localStorage if available
         if (typeof window !== 'undefined') {
             this.token = localStorage.getItem('access_token');
+            this.refreshToken = localStorage.getItem('refresh_token');
         }
     }
 
+    private storeTokens(data: TokenResponse): void {
+        this.token = data.access_token;
+        this.refreshToken = data.refresh_token ?? null;
+
+        if (typeof window !== 'undefined') {
+            localStorage.setItem('access_token', data.access_token);
+            if (data.refresh_token) {
+                localStorage.setItem('refresh_token', data.refresh_token);
+            } else {
+                localStorage.removeItem('refresh_token');
+            }
+        }
+    }
+
+    private clearTokens(): void {
+        this.token = null;
+        this.refreshToken = null;
+        if (typeof window !== 'undefined') {
+            localStorage.removeItem('access_token');
+            localStorage.removeItem('refresh_token');
+        }
+    }
+
+    // Exchanges the refresh token for a new pair (single use, so concurrent
+    // callers share one request). Returns false when the session is over.
+    private refreshAccessToken(): Promise<boolean> {
+        if (!this.refreshToken) {
+            return Promise.resolve(false);
+        }
+        if (!this.refreshing) {
+            this.refreshing = fetch(`${this.baseUrl}/auth/refresh`, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ refresh_token: this.refreshToken }),
+            })
+                .then(async (response) => {
+                    if (!response.ok) {
+                        this.clearTokens();
+                        return false;
+                    }
+                    this.storeTokens(await response.json());
+                    return true;
+                })
+                .catch(() => false)
+                .finally(() => {
+                    this.refreshing = null;
+                });
+        }
+        return this.refreshing;
+    }
+
     private async request<T>(
         endpoint: string,
-        options: RequestInit = {}
+        options: RequestInit = {},
+        retry = true
     ): Promise<T> {
         const headers: Record<string, string> = {
             'Content-Type': 'application/json',
@@ -70,6 +187,11 @@ class ApiClient {
             headers,
         });
 
+        // Expired access token: renew it once and replay the request
+        if (response.status === 401 && retry && (await this.refreshAccessToken())) {
+            return this.request<T>(endpoint, options, false);
+        }
+
         if (!response.ok) {
             const error = await response.json().catch(() => ({ detail: 'Unknown error' }));
             throw new Error(error.detail || `HTTP ${response.status}`);
@@ -97,11 +219,7 @@ class ApiClient {
         }
 
         const data: TokenResponse = await response.json();
-        this.token = data.access_token;
-
-        if (typeof window !== 'undefined') {
-            localStorage.setItem('access_token', data.access_token);
-        }
+        this.storeTokens(data);
 
         return data;
     }
@@ -114,10 +232,15 @@ class ApiClient {
     }
 
     logout(): void {
-        this.token = null;
-        if (typeof window !== 'undefined') {
-            localStorage.removeItem('access_token');
+        // Revoke the session server-side too (its access tokens stop working)
+        if (this.refreshToken) {
+            fetch(`${this.baseUrl}/auth/logout`, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ refresh_token: this.refreshToken }),
+            }).catch(() => {});
         }
+        this.clearTokens();
     }
 
     // File Upload
@@ -149,6 +272,38 @@ class ApiClient {
         return response.json();
     }
 
+    async uploadVideo(
+        file: File,
+        sampling: 'interval' | 'scene' = 'interval',
+        intervalSeconds?: number,
+        latitude?: number,
+        longitude?: number
+    ): Promise<Report> {
+        const formData = new FormData();
+        formData.append('file', file);
+        formData.append('sampling', sampling);
+        if (intervalSeconds !== undefined) formData.append('interval_s', intervalSeconds.toString());
+        if (latitude !== undefined) formData.append('latitude', latitude.toString());
+        if (longitude !== undefined) formData.append('longitude', longitude.toString());
+
+        const headers: HeadersInit = {};
+        if (this.token) {
+            headers['Authorization'] = `Bearer ${this.token}`;
+        }
+
+        const response = await fetch(`${this.baseUrl}/files/upload/video`, {
+            method: 'POST',
+            headers,
+            body: formData,
+        });
+
+        if (!response.ok) {
+            throw new Error('Upload failed');
+        }
+
+        return response.json();
+    }
+
     // Reports
     async getReports(skip = 0, limit = 10): Promise<Report[]> {
         return this.request(`/reports?skip=${skip}&limit=${limit}`);
@@ -158,6 +313,37 @@ class ApiClient {
         return this.request(`/reports/${id}`);
     }
 
+    // Map views: individual reports when zoomed in, per-cell aggregates when zoomed out
+    async getReportsInBounds(bounds: MapBounds, since?: string): Promise<Report[]> {
+        const params = new URLSearchParams(Object.entries(bounds).map(([k, v]) => [k, String(v)]));
+        if (since) params.append('since', since);
+        return this.request(`/reports/map?${params}`);
+    }
+
+    async getReportTiles(bounds: MapBounds, since?: string, precision?: number): Promise<ReportTile[]> {
+        const params = new URLSearchParams(Object.entries(bounds).map(([k, v]) => [k, String(v)]));
+        if (since) params.append('since', since);
+        if (precision !== undefined) params.append('precision', precision.toString());
+        return this.request(`/reports/map/tiles?${params}`);
+    }
+
+    // Live status updates (server-sent events). Returns an unsubscribe function.
+    subscribeToReportEvents(onEvent: (event: ReportEvent) => void): () => void {
+        if (!this.token || typeof EventSource === 'undefined') {
+            return () => {};
+        }
+
+        // EventSource cannot send headers, so the token goes in the query string
+        const source = new EventSource(
+            `${this.baseUrl}/reports/events?token=${encodeURIComponent(this.token)}`
+        );
+        source.addEventListener('report_status', (e) => {
+            onEvent(JSON.parse((e as MessageEvent).data));
+        });
+
+        return () => source.close();
+    }
+
     // Health Check
     async healthCheck(): Promise<{ status: string; service: string }> {
         const response = await fetch(`${this.baseUrl}/`);